@@ -1,7 +1,7 @@
 import argparse
 import configparser
 import logging
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Tuple
 
 
 def set_logging(log_level: str = "info") -> int:
@@ -14,7 +14,7 @@ def set_logging(log_level: str = "info") -> int:
     return log
 
 
-def _argument_parser() -> argparse.Namespace:
+def _argument_parser(multihost: bool = False) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         formatter_class=argparse.RawDescriptionHelpFormatter,
         description=r"""
@@ -38,8 +38,9 @@ def _argument_parser() -> argparse.Namespace:
     parser.add_argument(
         "-a",
         "--action",
-        choices=["create", "remove"],
-        help="Create or Remove DisTRaX Storage System",
+        choices=["create", "remove", "plan", "reclaim"],
+        help="Create or Remove DisTRaX Storage System, Plan the devices or Reclaim "
+        "the memory of devices that hold no OSD",
         required=True,
     )
     parser.add_argument(
@@ -50,6 +51,21 @@ def _argument_parser() -> argparse.Namespace:
         help="Logging Level",
         required=False,
     )
+    if multihost:
+        parser.add_argument(
+            "--coordinator",
+            type=str,
+            default=None,
+            help="Coordinate the hosts over TCP rather than MPI, the host:port of "
+            "the leader, the host of that name leads unless --leader is given",
+            required=False,
+        )
+        parser.add_argument(
+            "--leader",
+            action="store_true",
+            help="Lead the hosts coordinated over TCP",
+            required=False,
+        )
     return parser.parse_args()
 
 
@@ -74,12 +90,41 @@ def _read_config_file(
     return header_config
 
 
-def _config_parser(config_file: str) -> Dict[str, Any]:
+def _flag(value: str) -> bool:
+    return value.lower() in ["true", "yes", "1"]
+
+
+# The optional options of a section, each named with its key in the configs and the
+# conversion of its value
+RAM_OPTIONS: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    "memory_fraction": ("ram_memory_fraction", float),
+    "compression": ("ram_compression", str.lower),
+    "streams": ("ram_streams", int),
+    "backing": ("ram_backing", str),
+    "queue": ("ram_queue", str.lower),
+    "prefault": ("ram_prefault", _flag),
+}
+OSD_OPTIONS: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    "workers": ("osd_workers", int),
+    "type": ("osd_type", str.lower),
+    "mode": ("osd_mode", str),
+    "teardown": ("osd_teardown", str.lower),
+    "numa": ("osd_numa", _flag),
+}
+
+
+def _optional_options(
+    section: Dict[str, str], options: Dict[str, Tuple[str, Callable[[str], Any]]]
+) -> Dict[str, Any]:
+    return {
+        key: convert(section[name])
+        for name, (key, convert) in options.items()
+        if section.get(name) is not None
+    }
+
+
+def _setup_options(config_dict: Dict[str, Any]) -> Dict[str, Any]:
     configs = {}
-    config = configparser.ConfigParser()
-    config.read(config_file)
-    # convert keys to lowercase
-    config_dict = {k.lower(): v for k, v in config.items()}
     setup_config_keys = ["backend", "folder", "interface", "number_of_hosts", "service"]
     setup_config_dict = _read_config_file(config_dict, "setup", setup_config_keys)
 
@@ -95,13 +140,55 @@ def _config_parser(config_file: str) -> Dict[str, Any]:
         print(setup_config_dict.keys())
         logging.error("SETUP ERROR")
         return {}
+    return configs
+
+
+def _ram_options(config_dict: Dict[str, Any]) -> Dict[str, Any]:
+    configs: Dict[str, Any] = {}
     ram_config_keys = ["type", "number", "size_in_gb"]
     ram_config = _read_config_file(config_dict, "ram", ram_config_keys)
-    if set(ram_config.keys()).difference(ram_config_keys) == set():
-        configs["ram_type"] = ram_config["type"]
-        configs["ram_number"] = int(ram_config["number"])
-        configs["ram_size"] = int(ram_config["size_in_gb"])
-    else:
+    if set(ram_config.keys()).difference(ram_config_keys + list(RAM_OPTIONS)):
         return {}
+    configs["ram_type"] = ram_config["type"]
+    # auto leaves the number or size to the device planner
+    for key, name in [("ram_number", "number"), ("ram_size", "size_in_gb")]:
+        value = ram_config[name].lower()
+        configs[key] = value if value == "auto" else int(value)
+    configs.update(_optional_options(ram_config, RAM_OPTIONS))
+    return configs
+
+
+def _osd_options(config_dict: Dict[str, Any]) -> Dict[str, Any]:
+    # The osd section is optional
+    if config_dict.get("osd") is None:
+        return {}
+    osd_config = {k.lower(): v for k, v in config_dict["osd"].items()}
+    return _optional_options(osd_config, OSD_OPTIONS)
+
+
+def _tuning_options(config_dict: Dict[str, Any]) -> Dict[str, Any]:
+    # The tuning section is optional, options other than the profile override it
+    if config_dict.get("tuning") is None:
+        return {}
+    tuning_config = {k.lower(): v for k, v in config_dict["tuning"].items()}
+    return {
+        "tuning_profile": tuning_config.pop("profile", "default"),
+        "tuning_overrides": tuning_config,
+    }
+
 
+def _config_parser(config_file: str) -> Dict[str, Any]:
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    # convert keys to lowercase
+    config_dict = {k.lower(): v for k, v in config.items()}
+    configs = _setup_options(config_dict)
+    if not configs:
+        return {}
+    ram_configs = _ram_options(config_dict)
+    if not ram_configs:
+        return {}
+    configs.update(ram_configs)
+    configs.update(_osd_options(config_dict))
+    configs.update(_tuning_options(config_dict))
     return configs
@@ -5,7 +5,7 @@ from typing import NamedTuple, Optional, Union
 from . import abstract_device
 
 log = logging.getLogger(__name__)
-AVAILABLE = ["brd"]
+AVAILABLE = ["brd", "zram", "loop"]
 """Devices that are supported and can be used."""
 
 
@@ -18,8 +18,7 @@ class AbstractDevice(Protocol):
         """
         ...
 
-    @staticmethod
-    def get_paths(number: int) -> List[str]:
+    def get_paths(self, number: int) -> List[str]:
         """Get the paths of the devices created.
 
         Args:
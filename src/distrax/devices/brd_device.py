@@ -4,7 +4,7 @@ from typing import List
 
 from distrax.devices import DEVICE
 from distrax.exceptions.exceptions import DeviceCreationError, NotEnoughMemoryError
-from distrax.utils.system import free_memory
+from distrax.utils.system import available_memory
 
 
 class BRDDevice:
@@ -40,7 +40,7 @@ class BRDDevice:
             # Creates 10 1Gib block devices using system memory
         """
         size = size * 1024**2  # for BRD the size needs to be in KiB
-        free_mem = free_memory()
+        free_mem = available_memory()
         if size * number > free_mem:
             raise NotEnoughMemoryError(
                 f"{number} Devices of {size}KiB totaling {number * size}KiB requested "
@@ -0,0 +1,200 @@
+import logging
+import os
+import re
+import subprocess
+from typing import List, Tuple
+
+from distrax.devices import DEVICE
+from distrax.exceptions.exceptions import DeviceCreationError, NotEnoughMemoryError
+from distrax.utils.state import read_state, remove_state, state_file, write_state
+from distrax.utils.system import available_memory
+
+logger = logging.getLogger(__name__)
+BACKING = "/dev/shm"
+"""The tmpfs the backing files are created in by default."""
+SYS_BLOCK = "/sys/block"
+STATE_FILE = state_file("loop")
+"""Holds the loop devices created and their backing files, such that only they are
+detached on removal."""
+BACKING_FILE = r"distrax-loop[0-9]+\.img"
+"""The pattern of the names of the backing files, only these are removed."""
+
+
+class LoopDevice:
+    """LoopDevice class this allows for the creation and removal of loop devices.
+
+    Each device is a sparse file on a memory backed filesystem, i.e. tmpfs,
+    attached as a loop device with direct I/O, such that the pages are not cached
+    twice. This needs no kernel module beyond loop, so can be used where brd
+    cannot be loaded or is already in use.
+
+    hugetlbfs cannot back a loop device as it does not support writing files,
+    to use huge pages mount a tmpfs with huge=always and use it as the backing.
+
+    Examples:
+        >>> device = LoopDevice()
+
+        >>> device = LoopDevice(backing="/mnt/distrax")
+    """
+
+    def __init__(self, backing: str = BACKING, state_file: str = STATE_FILE):
+        """Initialise the LoopDevice object.
+
+        Args:
+            backing: The folder on a memory backed filesystem for the backing files.
+            state_file: The file to record the devices created in.
+        """
+        self.backing = backing
+        self.state_file = state_file
+
+    def create_device(self, size: int, number: int = 1) -> None:
+        """Create loop Block Devices.
+
+        Args:
+            size: number representing a GiB, i.e 4 would mean 4GiB
+            number: Number of block devices to create, i.e. 4 will create 4 devices
+                        of the size stated
+
+        Raises:
+            NotEnoughMemoryError(): If the amount of memory requested is higher
+                                than the memory available or the space of the
+                                backing filesystem.
+            DeviceCreationError(): If the devices already exist or any device
+                                could not be created, the devices created are
+                                removed.
+
+        Examples:
+            >>> device.create_device(1, 10)
+            # Creates 10 1Gib block devices using system memory
+        """
+        created = self._load()
+        if any(self._backing_file(device) == path for device, path in created):
+            raise DeviceCreationError(
+                "Loop devices already exists therefore new block devices cannot be "
+                "created, please remove previous loop devices before continuing"
+            )
+        # Clear the backing files of devices that are no longer attached
+        self.remove_device()
+        size = size * 1024**3
+        free_mem = available_memory() * 1024
+        stat = os.statvfs(self.backing)
+        free_backing = stat.f_bavail * stat.f_frsize
+        if size * number > min(free_mem, free_backing):
+            raise NotEnoughMemoryError(
+                f"{number} Devices of {size}B totaling {number * size}B requested "
+                f"when only {free_mem}B available and {free_backing}B free in "
+                f"{self.backing}, please reduce the number of devices or the size "
+                f"of the device"
+            )
+        created = []
+        try:
+            for i in range(number):
+                backing_file = f"{self.backing}/distrax-loop{i}.img"
+                # The file is sparse, the memory is used as the device is written
+                with open(backing_file, "x") as file:
+                    file.truncate(size)
+                try:
+                    device = self._attach(backing_file)
+                except DeviceCreationError:
+                    os.remove(backing_file)
+                    raise
+                created.append((device, backing_file))
+                self._save(created)
+        except (OSError, DeviceCreationError) as error:
+            self._save(created)
+            self.remove_device()
+            raise DeviceCreationError(f"Device creation failed: {error}") from error
+
+    def get_paths(self, number: int) -> List[str]:
+        """Get the paths of the devices created.
+
+        Args:
+            number: number of devices created
+
+        Returns:
+            List of Device Paths, i.e. /dev/loop3,/dev/loop4
+        """
+        return [device for device, _ in self._load()[:number]]
+
+    def remove_device(self) -> None:
+        """Detaches the loop devices created and frees the backing files.
+
+        A device is only detached if it is still attached to its backing file, as
+        the loop device may have been reused.
+
+        Examples:
+            >>> device.remove_device()
+            # Removes the loop block devices created by DisTRaX from the system.
+        """
+        for device, backing_file in self._load():
+            if self._backing_file(device) == backing_file:
+                process = subprocess.run(
+                    ["sudo", "losetup", "--detach", device],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                )
+                if process.returncode != 0:
+                    logger.error(
+                        f"Failed to detach {device}: {process.stderr.decode().strip()}"
+                    )
+            if not re.fullmatch(BACKING_FILE, os.path.basename(backing_file)):
+                logger.warning(f"Not removing {backing_file}, it is not a backing file")
+            elif os.path.exists(backing_file):
+                os.remove(backing_file)
+        remove_state(self.state_file)
+
+    @staticmethod
+    def _attach(backing_file: str) -> str:
+        """Attach a file to the first free loop device with direct I/O.
+
+        Args:
+            backing_file: The file to attach.
+
+        Returns:
+            The path of the loop device.
+        """
+        process = subprocess.run(
+            ["sudo", "losetup", "--find", "--show", "--direct-io=on", backing_file],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        if process.returncode != 0:
+            raise DeviceCreationError(
+                f"Failed to attach {backing_file}: {process.stderr.decode().strip()}"
+            )
+        device = process.stdout.decode().strip()
+        dio = f"{SYS_BLOCK}/{os.path.basename(device)}/loop/dio"
+        if os.path.exists(dio):
+            with open(dio) as file:
+                if file.read().strip() != "1":
+                    logger.warning(f"{device} is not using direct I/O")
+        return device
+
+    @staticmethod
+    def _backing_file(device: str) -> str:
+        """Get the file a loop device is attached to, empty if it is not attached."""
+        path = f"{SYS_BLOCK}/{os.path.basename(device)}/loop/backing_file"
+        try:
+            with open(path) as file:
+                return file.read().strip()
+        except OSError:
+            return ""
+
+    def _save(self, created: List[Tuple[str, str]]) -> None:
+        """Record the devices created and their backing files."""
+        write_state(
+            self.state_file, "".join(f"{device} {path}\n" for device, path in created)
+        )
+
+    def _load(self) -> List[Tuple[str, str]]:
+        """Read the devices created and their backing files."""
+        try:
+            lines = [
+                line.split(" ", 1) for line in read_state(self.state_file).split("\n")
+            ]
+        except OSError:
+            return []
+        return [(line[0], line[1]) for line in lines if len(line) == 2]
+
+
+_device = DEVICE("loop", LoopDevice)
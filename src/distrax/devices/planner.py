@@ -0,0 +1,169 @@
+"""Device planner.
+
+Chooses the number and size of the RAM devices from the resources of the host,
+such that the devices, and the OSD daemons serving them, fit within the memory
+that can be used without being killed for running out of memory. Each OSD daemon
+uses the osd_memory_target of the tuning profile on top of its device, the ceph
+default of 4GiB when the profile does not set it.
+"""
+
+from typing import Dict, NamedTuple, Optional
+
+from distrax.exceptions.exceptions import NotEnoughMemoryError
+from distrax.osds.tuning import (
+    MAX_OSD_MEMORY_TARGET,
+    HostResources,
+    osd_memory_target,
+)
+from distrax.utils.resources import Resources
+
+GiB_IN_KiB = 1024**2
+CPUS_PER_OSD = 2
+"""The number of CPUs each OSD should have to itself."""
+MEMORY_FRACTION = 0.5
+"""The fraction of usable memory given to the storage when it is not stated."""
+
+
+class DevicePlan(NamedTuple):
+    """Structure for the number and size of the devices planned for a host."""
+
+    number: int
+    size: int
+    """The size of each device in GiB."""
+    budget: int
+    """The memory given to the storage in KiB."""
+    osd_overhead: int
+    """The memory each OSD daemon uses on top of its device in KiB."""
+    resources: Resources
+
+    @property
+    def total(self) -> int:
+        """The memory the devices and OSDs use in KiB."""
+        return self.number * (self.size * GiB_IN_KiB + self.osd_overhead)
+
+    def describe(self) -> str:
+        """Describe the plan in a human-readable form.
+
+        Returns:
+            The resources of the host followed by the devices planned.
+
+        Examples:
+            >>> print(plan.describe())
+            Host: 62.8GiB total, 58.1GiB usable, 16 CPUs, 2 NUMA nodes
+            Storage budget: 29.0GiB
+            Devices: 8 x 2GiB, 24.0GiB with OSD overhead
+        """
+        resources = self.resources
+        limit = ""
+        if resources.cgroup_limit is not None:
+            limit = f", cgroup limit {resources.cgroup_limit / GiB_IN_KiB:.1f}GiB"
+        return (
+            f"Host: {resources.memory / GiB_IN_KiB:.1f}GiB total, "
+            f"{resources.usable / GiB_IN_KiB:.1f}GiB usable{limit}, "
+            f"{len(resources.cpus)} CPUs, "
+            f"{max(len(resources.numa_nodes), 1)} NUMA nodes\n"
+            f"Storage budget: {self.budget / GiB_IN_KiB:.1f}GiB\n"
+            f"Devices: {self.number} x {self.size}GiB, "
+            f"{self.total / GiB_IN_KiB:.1f}GiB with OSD overhead"
+        )
+
+
+def _auto_number(
+    resources: Resources, budget: int, size: Optional[int], osd_overhead: int
+) -> int:
+    """Choose the number of devices the CPUs and budget hold.
+
+    There is an OSD for every CPUS_PER_OSD CPUs that the budget can hold, rounded
+    down to a multiple of the NUMA nodes such that each node holds the same number.
+    """
+    per_osd = (size or 1) * GiB_IN_KiB + osd_overhead
+    number = min(max(len(resources.cpus) // CPUS_PER_OSD, 1), budget // per_osd)
+    nodes = len(resources.numa_nodes)
+    if nodes > 1 and number >= nodes:
+        number -= number % nodes
+    return number
+
+
+def _plan(
+    resources: Resources,
+    budget: int,
+    number: Optional[int],
+    size: Optional[int],
+    osd_overhead: int,
+) -> DevicePlan:
+    """Plan the devices within a budget for an overhead of each OSD in KiB."""
+    if number is None:
+        number = _auto_number(resources, budget, size, osd_overhead)
+    if number >= 1 and size is None:
+        size = (budget // number - osd_overhead) // GiB_IN_KiB
+    if number < 1 or size is None or size < 1:
+        raise NotEnoughMemoryError(
+            f"{budget}KiB of memory is not enough for a device of at least 1GiB "
+            f"with an OSD overhead of {osd_overhead}KiB, please increase the memory "
+            f"fraction or free memory"
+        )
+    plan = DevicePlan(number, size, budget, osd_overhead, resources)
+    if plan.total > budget:
+        raise NotEnoughMemoryError(
+            f"{number} Devices of {size}GiB totaling {plan.total}KiB with OSD "
+            f"overhead requested when only {budget}KiB is available, please reduce "
+            f"the number of devices or the size of the device"
+        )
+    return plan
+
+
+def plan_devices(
+    resources: Resources,
+    memory_fraction: float = MEMORY_FRACTION,
+    number: Optional[int] = None,
+    size: Optional[int] = None,
+    profile: str = "default",
+    overrides: Optional[Dict[str, str]] = None,
+) -> DevicePlan:
+    """Plan the number and size of the devices for a host.
+
+    The budget is the fraction of the usable memory, that is MemAvailable capped by
+    the cgroup limit. When the number is not stated there is an OSD for every
+    CPUS_PER_OSD CPUs that the budget can hold, rounded down to a multiple of the
+    NUMA nodes such that each node holds the same number. When the size is not
+    stated the budget is shared equally between the devices.
+
+    The overhead of each OSD is the osd_memory_target the tuning profile sets for
+    the devices planned, which the ram profile lowers as the devices grow. So when
+    the number or size is chosen, the devices are planned for the largest target
+    first, then again for the target of that plan, keeping the second plan when it
+    still fits within the budget.
+
+    Args:
+        resources: The resources of the host.
+        memory_fraction: The fraction of usable memory given to the storage.
+        number: The number of devices, chosen when None.
+        size: The size of each device in GiB, chosen when None.
+        profile: The tuning profile of the OSDs, i.e. default or ram.
+        overrides: The options that override those of the tuning profile.
+
+    Returns:
+        The plan of devices.
+
+    Raises:
+        NotEnoughMemoryError: If the devices do not fit within the budget.
+        ValueError: If the tuning profile is not available.
+
+    Examples:
+        >>> plan_devices(host_resources(), memory_fraction=0.5, profile="ram")
+            DevicePlan(number=6, size=1, ...)
+    """
+
+    def overhead(number: int, size: int) -> int:
+        host = HostResources(size, number, resources.memory)
+        return osd_memory_target(profile, host, overrides) // 1024
+
+    budget = int(resources.usable * memory_fraction)
+    if number is not None and size is not None:
+        return _plan(resources, budget, number, size, overhead(number, size))
+    largest = max(overhead(1, 0), MAX_OSD_MEMORY_TARGET // 1024)
+    first = _plan(resources, budget, number, size, largest)
+    first = first._replace(osd_overhead=overhead(first.number, first.size))
+    second = _plan(resources, budget, number, size, first.osd_overhead)
+    second = second._replace(osd_overhead=overhead(second.number, second.size))
+    return second if second.total <= budget else first
@@ -0,0 +1,136 @@
+"""Prefault the pages of RAM devices.
+
+RAM devices such as brd allocate and zero a page the first time it is written, so
+the first pass over a new device is slower than the passes after it. Prefaulting
+writes the whole of each device once before the OSDs are created, moving that cost
+to the creation of the cluster. Each device is written by its own worker with
+large direct writes, bound to the NUMA node of the device when it is known, such
+that the pages are allocated on that node. The writes are run by the privileged
+helper, which checks the device and writes the whole of it, see
+distrax.utils.privileged.prefault_command.
+
+zram does not allocate memory for pages of zeros, so prefaulting has no effect on
+zram devices.
+"""
+
+import logging
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+from distrax.exceptions.exceptions import DeviceCreationError
+from distrax.utils.privileged import HELPER_COMMAND
+from distrax.utils.resources import NUMANode
+
+logger = logging.getLogger(__name__)
+SYS_BLOCK = "/sys/block"
+
+
+class PrefaultResult(NamedTuple):
+    """Structure for the outcome of prefaulting a device."""
+
+    device: str
+    returncode: int
+    size: int
+    """The bytes written."""
+    duration: float
+    error: str
+
+    @property
+    def rate(self) -> float:
+        """The rate the device was written at in GiB/s."""
+        return self.size / 1024**3 / self.duration if self.duration else 0.0
+
+
+def device_size(device: str) -> int:
+    """Get the size of a device.
+
+    Args:
+        device: The device, i.e. /dev/ram0
+
+    Returns:
+        The size of the device in bytes, 0 if the device does not exist.
+    """
+    try:
+        with open(f"{SYS_BLOCK}/{os.path.basename(device)}/size") as file:
+            # The size is reported in 512 byte sectors whatever the block size
+            return int(file.read()) * 512
+    except (OSError, ValueError):
+        return 0
+
+
+def _prefault(device: str, node: Optional[NUMANode]) -> PrefaultResult:
+    """Write the whole of a device once.
+
+    Args:
+        device: The device to write.
+        node: The NUMA node to write from, None to leave it to the kernel.
+
+    Returns:
+        The outcome of writing the device.
+    """
+    start = time.monotonic()
+    size = device_size(device)
+    command = HELPER_COMMAND + ["prefault", os.path.basename(device)]
+    if node is not None:
+        command.append(str(node.id))
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    duration = time.monotonic() - start
+    if process.returncode != 0:
+        lines = process.stderr.decode("utf-8").strip().splitlines()
+        error = lines[-1] if lines else f"exit code {process.returncode}"
+        logger.error(f"Failed to prefault {device}: {error}")
+        return PrefaultResult(device, process.returncode, size, duration, error)
+    return PrefaultResult(device, 0, size, duration, "")
+
+
+def prefault_devices(
+    devices: List[str], placement: Optional[Dict[str, NUMANode]] = None
+) -> List[PrefaultResult]:
+    """Write the whole of each device once, all devices at the same time.
+
+    Args:
+        devices: The devices to prefault, i.e. /dev/ram0
+        placement: The NUMA node of each device, i.e. from
+            distrax.osds.placement.place_devices.
+
+    Returns:
+        The outcome of each device.
+
+    Raises:
+        DeviceCreationError: If any of the devices could not be written.
+
+    Examples:
+        >>> results = prefault_devices(["/dev/ram0", "/dev/ram1"])
+        >>> results[0]
+            PrefaultResult(device='/dev/ram0', returncode=0, size=4294967296,
+            duration=1.6, error='')
+    """
+    if not devices:
+        return []
+    nodes = placement or {}
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(devices)) as executor:
+        results = list(
+            executor.map(lambda device: _prefault(device, nodes.get(device)), devices)
+        )
+    duration = time.monotonic() - start
+    for result in results:
+        if result.returncode == 0:
+            logger.info(
+                f"Prefaulted {result.device} {result.size / 1024**3:.1f}GiB in "
+                f"{result.duration:.1f}s at {result.rate:.1f}GiB/s"
+            )
+    total = sum(result.size for result in results) / 1024**3
+    logger.info(
+        f"Prefaulted {total:.1f}GiB across {len(devices)} devices in {duration:.1f}s"
+    )
+    failed = [result for result in results if result.returncode != 0]
+    if failed:
+        raise DeviceCreationError(
+            "Failed to prefault devices: "
+            + ", ".join(f"{result.device}: {result.error}" for result in failed)
+        )
+    return results
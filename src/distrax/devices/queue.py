@@ -0,0 +1,153 @@
+"""Block queue tuning of the devices.
+
+Applies a profile of block queue settings to the devices once they are created,
+whichever device plugin created them, verifies the settings took and records the
+previous settings such that they are restored when the devices are removed. The
+settings are written by the privileged helper, which only writes the settings of
+the devices distrax creates, see distrax.utils.privileged.SETTINGS.
+
+To read more about the queue settings please see:
+https://docs.kernel.org/block/queue-sysfs.html
+"""
+
+import json
+import logging
+import os
+import re
+from typing import Dict, List
+
+import distrax.utils.fileio as fileio
+from distrax.exceptions.exceptions import DeviceCreationError
+from distrax.utils.privileged import BLOCK_DEVICE
+from distrax.utils.state import read_state, remove_state, state_file, write_state
+
+logger = logging.getLogger(__name__)
+SYS_BLOCK = "/sys/block"
+STATE_FILE = state_file("queue")
+"""Holds the settings of the devices before they were tuned."""
+
+PROFILES: Dict[str, Dict[str, str]] = {
+    "default": {},
+    # RAM has no seek cost, so merging, read-ahead, accounting and scheduling
+    # only cost CPU, completions are run on the CPU that submitted the I/O
+    "ram": {
+        "scheduler": "none",
+        "nomerges": "2",
+        "read_ahead_kb": "0",
+        "iostats": "0",
+        "rq_affinity": "2",
+    },
+}
+"""The queue settings of each profile."""
+
+
+def _queue(device: str) -> str:
+    """Get the queue folder of a device, i.e. /dev/ram0 is /sys/block/ram0/queue."""
+    return f"{SYS_BLOCK}/{os.path.basename(device)}/queue"
+
+
+def read_setting(device: str, name: str) -> str:
+    """Read a queue setting of a device.
+
+    The scheduler is reported as the one in use, i.e. `[none] mq-deadline` is none.
+
+    Args:
+        device: The device, i.e. /dev/ram0
+        name: The name of the setting, i.e. nomerges
+
+    Returns:
+        The value of the setting, empty if the device does not have the setting.
+
+    Examples:
+        >>> read_setting("/dev/ram0", "scheduler")
+            'none'
+    """
+    try:
+        with open(f"{_queue(device)}/{name}") as file:
+            value = file.read().strip()
+    except OSError:
+        return ""
+    selected = re.search(r"\[(.+?)\]", value)
+    return selected.group(1) if selected else value
+
+
+def _write_setting(device: str, name: str, value: str) -> None:
+    """Write a queue setting of a device, it is verified by reading it back."""
+    fileio.write_setting(os.path.basename(device), f"queue/{name}", value, admin=True)
+
+
+def tune_devices(devices: List[str], profile: str = "ram") -> None:
+    """Apply a queue profile to the devices and verify it.
+
+    Settings a device does not have are skipped, i.e. bio based devices such as
+    brd have no scheduler to change.
+
+    Args:
+        devices: The devices to tune, i.e. /dev/ram0
+        profile: The profile to apply, one of PROFILES
+
+    Raises:
+        ValueError: If the profile is not one of PROFILES.
+        DeviceCreationError: If a setting did not take.
+
+    Examples:
+        >>> tune_devices(["/dev/ram0", "/dev/ram1"], "ram")
+    """
+    if profile not in PROFILES:
+        raise ValueError(
+            f"Queue profile `{profile}` is not available! Choose from: "
+            f"{list(PROFILES)}"
+        )
+    previous: Dict[str, Dict[str, str]] = {}
+    failed = []
+    for device in devices:
+        previous[device] = {}
+        for name, value in PROFILES[profile].items():
+            current = read_setting(device, name)
+            if current == "":
+                logger.debug(f"{device} has no queue setting {name}")
+                continue
+            previous[device][name] = current
+            if current != value:
+                _write_setting(device, name, value)
+            if read_setting(device, name) != value:
+                failed.append(f"{device} {name}={value}")
+    write_state(STATE_FILE, json.dumps(previous))
+    if failed:
+        raise DeviceCreationError(f"Failed to tune queue: {', '.join(failed)}")
+
+
+def _recorded(previous: object) -> Dict[str, Dict[str, str]]:
+    """Keep the settings recorded of the devices and queue settings distrax tunes."""
+    names = {name for settings in PROFILES.values() for name in settings}
+    recorded: Dict[str, Dict[str, str]] = {}
+    for device, settings in (previous if isinstance(previous, dict) else {}).items():
+        if not re.fullmatch(f"/dev/{BLOCK_DEVICE}", str(device)):
+            logger.warning(f"Not restoring the queue of {device}")
+            continue
+        if isinstance(settings, dict):
+            recorded[device] = {
+                name: str(value) for name, value in settings.items() if name in names
+            }
+    return recorded
+
+
+def restore_devices() -> None:
+    """Restore the queue settings the devices had before they were tuned.
+
+    Devices that no longer exist are skipped, as are devices and settings that
+    distrax does not tune.
+
+    Examples:
+        >>> restore_devices()
+    """
+    try:
+        previous = _recorded(json.loads(read_state(STATE_FILE)))
+    except (OSError, ValueError):
+        return
+    for device, settings in previous.items():
+        for name, value in settings.items():
+            current = read_setting(device, name)
+            if current != "" and current != value:
+                _write_setting(device, name, value)
+    remove_state(STATE_FILE)
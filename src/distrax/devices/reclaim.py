@@ -0,0 +1,153 @@
+"""Reclaim the memory held by RAM devices.
+
+RAM devices allocate memory as they are written and keep it until the blocks are
+discarded. BlueStore discards the extents it frees when bdev enable discard is set,
+i.e. with the ram tuning profile, which returns the memory of deleted objects while
+the cluster runs. Devices that hold no OSD, i.e. after the OSDs were removed or a
+failed creation, can be discarded whole to return all of their memory. Devices that
+still hold an OSD, such as after the pools are reset, are never discarded, nor are
+devices whose OSDs cannot be listed, and neither are devices that do not support
+discard, such as brd on most kernels.
+
+To read more about discard please see:
+https://man7.org/linux/man-pages/man8/blkdiscard.8.html
+"""
+
+import json
+import logging
+import os
+import subprocess
+from typing import List, NamedTuple
+
+from distrax.utils.resources import meminfo
+
+logger = logging.getLogger(__name__)
+SYS_BLOCK = "/sys/block"
+NOTHING_RECLAIMED = (
+    "Nothing was reclaimed, only devices that hold no OSD and support discard can "
+    "be, the ram tuning profile returns the memory of deleted objects instead"
+)
+
+
+class ReclaimResult(NamedTuple):
+    """Structure for the outcome of reclaiming the memory of devices."""
+
+    discarded: List[str]
+    skipped: List[str]
+    """The devices that were in use or could not be discarded."""
+    freed: int
+    """The memory returned to the host in KiB, from the MemFree of meminfo."""
+
+    def describe(self) -> str:
+        """Describe the result in a human-readable form.
+
+        Returns:
+            The devices discarded and skipped and the memory freed.
+
+        Examples:
+            >>> print(result.describe())
+            Discarded: /dev/ram0, /dev/ram1
+            Skipped: /dev/ram2
+            Freed 4194304KiB
+        """
+        description = (
+            f"Discarded: {', '.join(self.discarded) or 'none'}\n"
+            f"Skipped: {', '.join(self.skipped) or 'none'}\n"
+            f"Freed {self.freed}KiB"
+        )
+        if not self.discarded:
+            description += f"\n{NOTHING_RECLAIMED}"
+        return description
+
+
+def supports_discard(device: str) -> bool:
+    """Check if a device supports discard.
+
+    Args:
+        device: The device to check, i.e. /dev/ram0
+
+    Returns:
+        False if the device reports it cannot discard else True.
+    """
+    limit = f"{SYS_BLOCK}/{os.path.basename(device)}/queue/discard_max_bytes"
+    try:
+        with open(limit) as file:
+            return int(file.read()) > 0
+    except (OSError, ValueError):
+        return True
+
+
+def in_use(device: str) -> bool:
+    """Check if a device holds data that must be kept.
+
+    A device is in use when it is held by another device, i.e. an LVM volume, or
+    holds a raw BlueStore OSD. Discarding destroys the data of the device, so when
+    the OSDs of the device cannot be listed it is taken to be in use.
+
+    Args:
+        device: The device to check, i.e. /dev/ram0
+
+    Returns:
+        True if the device is in use, or it cannot be told, else False.
+    """
+    holders = f"{SYS_BLOCK}/{os.path.basename(device)}/holders"
+    if os.path.isdir(holders) and os.listdir(holders):
+        return True
+    process = subprocess.run(
+        ["sudo", "ceph-volume", "raw", "list", device, "--format", "json"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    if process.returncode != 0:
+        logger.error(
+            f"Failed to list the OSDs of {device}: {process.stderr.decode().strip()}"
+        )
+        return True
+    try:
+        return bool(json.loads(process.stdout.decode("utf-8")))
+    except ValueError:
+        logger.error(f"Failed to read the OSDs of {device}: {process.stdout!r}")
+        return True
+
+
+def reclaim_devices(devices: List[str]) -> ReclaimResult:
+    """Discard the whole of the devices that are not in use and support discard.
+
+    Args:
+        devices: The devices to discard, i.e. /dev/ram0
+
+    Returns:
+        The devices discarded and the memory this freed.
+
+    Examples:
+        >>> reclaim_devices(["/dev/ram0", "/dev/ram1"])
+            ReclaimResult(discarded=['/dev/ram0', '/dev/ram1'], skipped=[],
+            freed=4194304)
+    """
+    before = meminfo()
+    discarded = []
+    skipped = []
+    for device in devices:
+        if not supports_discard(device):
+            logger.warning(f"Skipping {device} as it does not support discard")
+            skipped.append(device)
+            continue
+        if in_use(device):
+            logger.info(f"Skipping {device} as it holds an OSD or may do")
+            skipped.append(device)
+            continue
+        process = subprocess.run(
+            ["sudo", "blkdiscard", device],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        if process.returncode != 0:
+            logger.error(f"Failed to discard {device}: {process.stderr.decode()}")
+            skipped.append(device)
+        else:
+            discarded.append(device)
+    if not discarded:
+        logger.warning(NOTHING_RECLAIMED)
+    after = meminfo()
+    freed = after.get("MemFree", 0) - before.get("MemFree", 0)
+    return ReclaimResult(discarded, skipped, max(freed, 0))
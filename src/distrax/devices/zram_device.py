@@ -0,0 +1,241 @@
+import glob
+import logging
+import os
+import subprocess
+from typing import List, NamedTuple, Optional
+
+import distrax.utils.fileio as fileio
+from distrax.devices import DEVICE
+from distrax.exceptions.exceptions import DeviceCreationError
+from distrax.utils.state import read_state, remove_state, state_file, write_state
+from distrax.utils.system import available_memory
+
+logger = logging.getLogger(__name__)
+ALGORITHMS = ["lz4", "zstd", "lz4hc", "lzo", "lzo-rle", "842"]
+"""Compression algorithms that can be used, if supported by the kernel."""
+ZRAM_CONTROL = "/sys/class/zram-control"
+SYS_BLOCK = "/sys/block"
+STATE_FILE = state_file("zram")
+"""Holds the ids of the devices created, such that devices DisTRaX did not create,
+i.e. zram swap, are left alone on removal."""
+
+
+class ZRAMStats(NamedTuple):
+    """Structure for the memory use of a zram device, from its mm_stat."""
+
+    device: str
+    original: int
+    """The bytes written to the device before compression."""
+    compressed: int
+    """The bytes the written data takes once compressed."""
+    memory_used: int
+    """The bytes of memory used by the device, including fragmentation."""
+
+    @property
+    def ratio(self) -> float:
+        """The compression ratio of the device, 0 when nothing has been written."""
+        return self.original / self.compressed if self.compressed else 0.0
+
+
+class ZRAMDevice:
+    """ZRAMDevice class this allows for the creation and removal of zram devices.
+
+    zram devices are compressed RAM block devices, the data written is compressed
+    before it is held in memory, therefore compressible data can use more than the
+    memory of the system. The devices are added with hot_add so the zram module is
+    not reloaded, and devices already on the system are left untouched.
+
+    To read more about zram please see:
+    https://docs.kernel.org/admin-guide/blockdev/zram.html
+
+    Examples:
+        >>> device = ZRAMDevice()
+
+        >>> device = ZRAMDevice(algorithm="zstd", streams=8)
+    """
+
+    def __init__(
+        self,
+        algorithm: str = "lz4",
+        streams: Optional[int] = None,
+        state_file: str = STATE_FILE,
+    ):
+        """Initialise the ZRAMDevice object.
+
+        Args:
+            algorithm: The compression algorithm, one of ALGORITHMS.
+            streams: The number of compression streams of each device, left to the
+                kernel when None. Kernels since 4.7 use a stream per CPU and
+                ignore this.
+            state_file: The file to record the devices created in.
+
+        Raises:
+            ValueError: If the algorithm is not one of ALGORITHMS.
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(
+                f"Compression `{algorithm}` is not available! Choose from: "
+                f"{ALGORITHMS}"
+            )
+        self.algorithm = algorithm
+        self.streams = streams
+        self.state_file = state_file
+
+    def create_device(self, size: int, number: int = 1) -> None:
+        """Create zram Block Devices.
+
+        Args:
+            size: number representing a GiB, i.e 4 would mean 4GiB, this is the
+                size before compression.
+            number: Number of block devices to create, i.e. 4 will create 4 devices
+                        of the size stated
+
+        Raises:
+            DeviceCreationError(): If the devices already exist or any device
+                                could not be created, the devices created are
+                                removed.
+
+        Examples:
+            >>> device.create_device(4, 10)
+            # Creates 10 4GiB block devices using compressed system memory
+        """
+        if self._existing():
+            raise DeviceCreationError(
+                "zram devices already exists therefore new block devices cannot be "
+                "created, please remove previous zram devices before continuing"
+            )
+        free_mem = available_memory()
+        if size * 1024**2 * number > free_mem:
+            logger.warning(
+                f"{number} zram devices of {size}GiB are larger than the "
+                f"{free_mem}KiB available, the data written must compress to fit"
+            )
+        if subprocess.run(["sudo", "modprobe", "zram", "num_devices=0"]).returncode:
+            raise DeviceCreationError("Failed to load the zram module")
+        ids: List[int] = []
+        try:
+            for _ in range(number):
+                ids.append(self._hot_add())
+                self._save(ids)
+                # The algorithm and streams must be set before the disksize
+                self._write(ids[-1], "comp_algorithm", self.algorithm)
+                if self.streams is not None:
+                    self._write(ids[-1], "max_comp_streams", str(self.streams))
+                self._write(ids[-1], "disksize", f"{size}G")
+        except DeviceCreationError:
+            self.remove_device()
+            raise
+
+    def get_paths(self, number: int) -> List[str]:
+        """Get the paths of the devices created.
+
+        Args:
+            number: number of devices created
+
+        Returns:
+            List of Device Paths, i.e. /dev/zram1,/dev/zram2
+        """
+        return [f"/dev/zram{device_id}" for device_id in self._load()[:number]]
+
+    def stats(self) -> List[ZRAMStats]:
+        """Get the compressed and original bytes of the devices created.
+
+        Returns:
+            The memory use of each device.
+
+        Examples:
+            >>> device.stats()
+                [ZRAMStats(device='/dev/zram1', original=4096000, compressed=1365333,
+                memory_used=1400832)]
+        """
+        stats = []
+        for device_id in self._load():
+            path = f"{SYS_BLOCK}/zram{device_id}/mm_stat"
+            try:
+                with open(path) as file:
+                    fields = [int(field) for field in file.read().split()]
+            except OSError:
+                continue
+            stats.append(
+                ZRAMStats(f"/dev/zram{device_id}", fields[0], fields[1], fields[2])
+            )
+        return stats
+
+    def remove_device(self) -> None:
+        """Removes the zram devices created from the system.
+
+        Examples:
+            >>> device.remove_device()
+            # Removes the zram devices created by DisTRaX from the system.
+        """
+        for stat in self.stats():
+            logger.info(
+                f"{stat.device} held {stat.original} bytes in {stat.compressed} "
+                f"bytes, a ratio of {stat.ratio:.2f}"
+            )
+        for device_id in self._existing():
+            try:
+                self._write(device_id, "reset", "1")
+                self._write(device_id, "hot_remove", str(device_id))
+            except DeviceCreationError as error:
+                logger.error(f"Failed to remove /dev/zram{device_id}: {error}")
+        remove_state(self.state_file)
+        if os.path.exists(ZRAM_CONTROL) and not glob.glob(f"{SYS_BLOCK}/zram*"):
+            subprocess.run(
+                ["sudo", "rmmod", "zram"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+
+    def _hot_add(self) -> int:
+        """Add a zram device.
+
+        Returns:
+            The id of the device added.
+        """
+        process = subprocess.run(
+            ["sudo", "cat", f"{ZRAM_CONTROL}/hot_add"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        if process.returncode != 0:
+            raise DeviceCreationError(
+                f"Failed to add a zram device: {process.stderr.decode().strip()}"
+            )
+        return int(process.stdout.decode())
+
+    @staticmethod
+    def _write(device_id: int, name: str, value: str) -> None:
+        """Write a sysfs setting of a zram device through the privileged helper.
+
+        Args:
+            device_id: The id of the device.
+            name: The setting, i.e. disksize, hot_remove removes the device.
+            value: The value to write.
+        """
+        if not fileio.write_setting(f"zram{device_id}", name, value, admin=True):
+            raise DeviceCreationError(
+                f"Failed to write {value} to {name} of /dev/zram{device_id}"
+            )
+
+    def _save(self, ids: List[int]) -> None:
+        """Record the ids of the devices created."""
+        write_state(self.state_file, "".join(f"{device_id}\n" for device_id in ids))
+
+    def _load(self) -> List[int]:
+        """Read the ids of the devices created."""
+        try:
+            return [int(line) for line in read_state(self.state_file).split()]
+        except (OSError, ValueError):
+            return []
+
+    def _existing(self) -> List[int]:
+        """Get the ids of the devices created that still exist."""
+        return [
+            device_id
+            for device_id in self._load()
+            if os.path.exists(f"{SYS_BLOCK}/zram{device_id}")
+        ]
+
+
+_device = DEVICE("zram", ZRAMDevice)
@@ -80,3 +80,39 @@ class InterfaceDoesNotExistError(Exception):
             message: Message to display
         """
         super().__init__(message)
+
+
+class PoolCreationError(Exception):
+    """When the creation of a Pool fails."""
+
+    def __init__(self, message: str):
+        """Call the base class constructor with the parameters it needs.
+
+        Args:
+            message: Message to display
+        """
+        super().__init__(message)
+
+
+class OSDCreationError(Exception):
+    """When the creation of one or more OSDs fails."""
+
+    def __init__(self, message: str):
+        """Call the base class constructor with the parameters it needs.
+
+        Args:
+            message: Message to display
+        """
+        super().__init__(message)
+
+
+class CoordinationError(Exception):
+    """When the hosts of a multi-host deployment cannot coordinate."""
+
+    def __init__(self, message: str):
+        """Call the base class constructor with the parameters it needs.
+
+        Args:
+            message: Message to display
+        """
+        super().__init__(message)
@@ -5,6 +5,7 @@ import os
 import subprocess
 import time
 
+import distrax.utils.ceph as ceph
 import distrax.utils.fileio as fileio
 from distrax.exceptions.exceptions import MountingFilesystemError
 from distrax.filesystems import FILESYSTEM
@@ -45,9 +46,9 @@ class CephFilesystem:
         # Get user
         user = getpass.getuser()
         # Get admin key
-        admin_key = subprocess.run(
-            ["ceph", "auth", "print-key", "client.admin"], stdout=subprocess.PIPE
-        ).stdout.decode()
+        admin_key = ceph.mon_command(
+            {"prefix": "auth print-key", "entity": "client.admin"}
+        ).output
         # Create Filesystem directory
         fileio.create_dir(self.mount_point, 755, admin=True)
 
@@ -1,15 +1,20 @@
 import configparser
 import json
+import logging
 import subprocess
 import time
 
 import distrax.utils.ceph as ceph
 import distrax.utils.fileio as fileio
 import distrax.utils.network as network
+import distrax.utils.readiness as readiness
 import distrax.utils.system as system
 from distrax.gateways import GATEWAY
+from distrax.pools.abstract_pool import PoolSpec
 from distrax.pools.ceph_pool import CephPool
 
+logger = logging.getLogger(__name__)
+
 
 class CephGateway:
     """Ceph Gateway Class.
@@ -51,39 +56,50 @@ class CephGateway:
         """
         # Create key
         rgw_keyring = self._add_gateway()
-        # Create MGR directory
-        fileio.create_dir(f"{ceph.VAR_RGW}{self.hostname}", 755, admin=True)
-        # Copy the key to the folder
-        fileio.copy_file(
-            f"{self.folder}/{rgw_keyring}",
-            f"{ceph.VAR_RGW}{self.hostname}/keyring",
-            admin=True,
-        )
-        # Change the ownership of the folder to ceph
-        fileio.recursive_change_ownership(
-            f"{ceph.VAR_RGW}{self.hostname}", "ceph", "ceph", admin=True
-        )
+        with fileio.batch():
+            # Create MGR directory
+            fileio.create_dir(f"{ceph.VAR_RGW}{self.hostname}", 755, admin=True)
+            # Copy the key to the folder
+            fileio.copy_file(
+                f"{self.folder}/{rgw_keyring}",
+                f"{ceph.VAR_RGW}{self.hostname}/keyring",
+                admin=True,
+            )
+            # Change the ownership of the folder to ceph
+            fileio.recursive_change_ownership(
+                f"{ceph.VAR_RGW}{self.hostname}", "ceph", "ceph", admin=True
+            )
         # Pools required for the RadosGateway
         pool = CephPool()
-        pool.create_pool(name=".rgw.root", percentage=0.05)
-        pool.create_pool(name="default.rgw.control", percentage=0.02)
-        pool.create_pool(name="default.rgw.meta", percentage=0.02)
-        pool.create_pool(name="default.rgw.log", percentage=0.02)
-        pool.create_pool(name="default.rgw.buckets.index", percentage=0.05)
-        pool.create_pool(name="default.rgw.buckets.data", percentage=0.84)
+        pool.create_pools(
+            [
+                PoolSpec(name=".rgw.root", percentage=0.05),
+                PoolSpec(name="default.rgw.control", percentage=0.02),
+                PoolSpec(name="default.rgw.meta", percentage=0.02),
+                PoolSpec(name="default.rgw.log", percentage=0.02),
+                PoolSpec(name="default.rgw.buckets.index", percentage=0.05),
+                PoolSpec(name="default.rgw.buckets.data", percentage=0.84),
+            ]
+        )
 
         # Start the Daemon
         system.start_service(f"ceph-radosgw@radosgw.{self.hostname}")
-        # Ensure that the service has joined the cluster.
-        gateway_started = False
-        start = time.time()
-        while gateway_started is False:
-            time.sleep(0.1)
-            gateway_started = ceph.rgw_status()
-            if time.time() - start >= self.timeout:
-                raise TimeoutError(
-                    "Gateway Creation Timeout, please read the logs for more detail"
+        # Ensure that the service is up, from its admin socket where it can be used
+        # and otherwise from the servicemap of the cluster.
+        try:
+            try:
+                readiness.wait_for_daemons(
+                    [f"client.radosgw.{self.hostname}"], self.timeout
                 )
+            except PermissionError as error:
+                logger.debug(
+                    f"Admin socket cannot be used, relying on the mons: {error}"
+                )
+                readiness.wait_for([readiness.rgw_in_servicemap()], self.timeout)
+        except TimeoutError as error:
+            raise TimeoutError(
+                "Gateway Creation Timeout, please read the logs for more detail"
+            ) from error
 
     def _add_gateway(self) -> str:
         """Adds the manager keys to the ceph system.
@@ -97,18 +113,10 @@ class CephGateway:
             >>>gateway._add_gateway()
                 ceph.client.radosgw.keyring
         """
-        subprocess.run(
-            [
-                "ceph",
-                "auth",
-                "get-or-create",
-                f"client.radosgw.{self.hostname}",
-                "mon",
-                "allow *",
-                "osd",
-                "allow *",
-                "-o" f"{self.folder}/ceph.client.radosgw.keyring",
-            ]
+        ceph.auth_get_or_create(
+            f"client.radosgw.{self.hostname}",
+            ["mon", "allow *", "osd", "allow *"],
+            f"{self.folder}/ceph.client.radosgw.keyring",
         )
         return "ceph.client.radosgw.keyring"
 
@@ -173,9 +181,8 @@ class CephGateway:
         Examples:
             >>> gateway.remove_gateway()
         """
-        system.stop_service("ceph-radosgw.target")
-        system.disable_service("ceph-radosgw.target")
-        system.stop_service("system-ceph\\x2dradosgw.slice")
+        system.stop_services(["ceph-radosgw.target", "system-ceph\\x2dradosgw.slice"])
+        system.disable_services(["ceph-radosgw.target"])
         fileio.remove_dir(f"{ceph.VAR_RGW}{self.hostname}", admin=True)
 
 
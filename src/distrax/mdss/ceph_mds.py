@@ -1,14 +1,17 @@
-import subprocess
-import time
+import logging
 
 import distrax.utils.ceph as ceph
 import distrax.utils.fileio as fileio
 import distrax.utils.network as network
+import distrax.utils.readiness as readiness
 import distrax.utils.system as system
 from distrax.exceptions.exceptions import DaemonNotStartedError, MDSNotStartedError
 from distrax.mdss import MDS
+from distrax.pools.abstract_pool import PoolSpec
 from distrax.pools.ceph_pool import CephPool
 
+logger = logging.getLogger(__name__)
+
 
 class CephMDS:
     """Ceph Metdata Server Class.
@@ -51,40 +54,54 @@ class CephMDS:
         """
         # Create key
         mds_keyring = self._add_mds()
-        # Create MDS directory
-        fileio.create_dir(f"{ceph.VAR_MDS}{self.hostname}", 755, admin=True)
-        # Copy the key to the folder
-        fileio.copy_file(
-            f"{self.folder}/{mds_keyring}",
-            f"{ceph.VAR_MDS}{self.hostname}/keyring",
-            admin=True,
-        )
-        # Change the ownership of the folder to ceph
-        fileio.recursive_change_ownership(
-            f"{ceph.VAR_MDS}{self.hostname}", "ceph", "ceph", admin=True
-        )
+        with fileio.batch():
+            # Create MDS directory
+            fileio.create_dir(f"{ceph.VAR_MDS}{self.hostname}", 755, admin=True)
+            # Copy the key to the folder
+            fileio.copy_file(
+                f"{self.folder}/{mds_keyring}",
+                f"{ceph.VAR_MDS}{self.hostname}/keyring",
+                admin=True,
+            )
+            # Change the ownership of the folder to ceph
+            fileio.recursive_change_ownership(
+                f"{ceph.VAR_MDS}{self.hostname}", "ceph", "ceph", admin=True
+            )
         # Start the Daemon
-        system.start_service(f"ceph-mds@{self.hostname}")
-        status = system.is_systemd_service_active(f"ceph-mds@{self.hostname}")
+        status = system.start_services([f"ceph-mds@{self.hostname}"])
         if status is False:
             message = "Ceph MDS Daemon Failed to Start, please investigate"
             raise DaemonNotStartedError(message)
         # Pools required for the MDS
         pool = CephPool()
-        pool.create_pool(name="cephfs_data", percentage=0.90)
-        pool.create_pool(name="cephfs_metadata", percentage=0.10)
+        pool.create_pools(
+            [
+                PoolSpec(name="cephfs_data", percentage=0.90),
+                PoolSpec(name="cephfs_metadata", percentage=0.10),
+            ]
+        )
+        # Ensure the MDS has joined as a standby, from its admin socket
+        try:
+            readiness.wait_for_daemons([f"mds.{self.hostname}"], self.timeout)
+        except PermissionError as error:
+            logger.debug(f"Admin socket cannot be used, relying on the mons: {error}")
+        except TimeoutError as error:
+            raise MDSNotStartedError("Ceph MDS failed to start") from error
         # Create the filesystem for the MDS
-        subprocess.run(
-            ["ceph", "fs", "new", "cephfs", "cephfs_metadata", "cephfs_data"]
+        ceph.mon_command(
+            {
+                "prefix": "fs new",
+                "fs_name": "cephfs",
+                "metadata": "cephfs_metadata",
+                "data": "cephfs_data",
+            }
         )
+        ceph.invalidate_status()
         # Ensure that the filesystem has joined the cluster.
-        mds_started = False
-        start = time.time()
-        while mds_started is False:
-            time.sleep(0.1)
-            mds_started = ceph.mds_status()
-            if time.time() - start > self.timeout:
-                raise MDSNotStartedError("Ceph MDS failed to start")
+        try:
+            readiness.wait_for([readiness.fs_rank_active(0)], self.timeout)
+        except TimeoutError as error:
+            raise MDSNotStartedError("Ceph MDS failed to start") from error
 
     def _add_mds(self) -> str:
         """Adds the MDS keys to the ceph system.
@@ -98,20 +115,10 @@ class CephMDS:
             >>>mds._add_mds()
                 ceph.mds.keyring
         """
-        subprocess.run(
-            [
-                "ceph",
-                "auth",
-                "get-or-create",
-                f"mds.{self.hostname}",
-                "osd",
-                "allow rwx",
-                "mds",
-                "allow",
-                "mon",
-                "allow profile mds",
-                "-o" f"{self.folder}/ceph.mds.keyring",
-            ]
+        ceph.auth_get_or_create(
+            f"mds.{self.hostname}",
+            ["osd", "allow rwx", "mds", "allow", "mon", "allow profile mds"],
+            f"{self.folder}/ceph.mds.keyring",
         )
         return "ceph.mds.keyring"
 
@@ -122,23 +129,15 @@ class CephMDS:
             >>> mds.remove_mds()
         """
         # Stop the filesystem
-        subprocess.run(["ceph", "fs", "fail", "cephfs", "--connect-timeout", "5"])
+        ceph.mon_command({"prefix": "fs fail", "fs_name": "cephfs"})
         # Remeove the filesystem
-        subprocess.run(
-            [
-                "ceph",
-                "fs",
-                "rm",
-                "cephfs",
-                "--yes-i-really-mean-it",
-                "--connect-timeout",
-                "5",
-            ]
+        ceph.mon_command(
+            {"prefix": "fs rm", "fs_name": "cephfs", "yes_i_really_mean_it": True}
         )
+        ceph.invalidate_status()
         # Stop the mds
-        system.stop_service("ceph-mds.target")
-        system.disable_service("ceph-mds.target")
-        system.stop_service("system-ceph\\x2dmds.slice")
+        system.stop_services(["ceph-mds.target", "system-ceph\\x2dmds.slice"])
+        system.disable_services(["ceph-mds.target"])
         fileio.remove_dir(f"{ceph.VAR_MDS}{self.hostname}")
 
 
@@ -1,5 +1,3 @@
-import subprocess
-
 import distrax.utils.ceph as ceph
 import distrax.utils.fileio as fileio
 import distrax.utils.network as network
@@ -47,21 +45,21 @@ class CephMGR:
         """
         # Create key
         mgr_keyring = self._add_mgr()
-        # Create MGR directory
-        fileio.create_dir(f"{ceph.VAR_MGR}{self.hostname}", 755, admin=True)
-        # Copy the key to the folder
-        fileio.copy_file(
-            f"{self.folder}/{mgr_keyring}",
-            f"{ceph.VAR_MGR}{self.hostname}/keyring",
-            admin=True,
-        )
-        # Change the ownership of the folder to ceph
-        fileio.recursive_change_ownership(
-            f"{ceph.VAR_MGR}{self.hostname}", "ceph", "ceph", admin=True
-        )
+        with fileio.batch():
+            # Create MGR directory
+            fileio.create_dir(f"{ceph.VAR_MGR}{self.hostname}", 755, admin=True)
+            # Copy the key to the folder
+            fileio.copy_file(
+                f"{self.folder}/{mgr_keyring}",
+                f"{ceph.VAR_MGR}{self.hostname}/keyring",
+                admin=True,
+            )
+            # Change the ownership of the folder to ceph
+            fileio.recursive_change_ownership(
+                f"{ceph.VAR_MGR}{self.hostname}", "ceph", "ceph", admin=True
+            )
         # Start the Daemon
-        system.start_service(f"ceph-mgr@{self.hostname}")
-        status = system.is_systemd_service_active(f"ceph-mgr@{self.hostname}")
+        status = system.start_services([f"ceph-mgr@{self.hostname}"])
         if status is False:
             message = "Ceph Manager Failed to Start, please investigate"
             raise DaemonNotStartedError(message)
@@ -78,20 +76,10 @@ class CephMGR:
             >>>mgr._add_mgr()
                 ceph.mgr.keyring
         """
-        subprocess.run(
-            [
-                "ceph",
-                "auth",
-                "get-or-create",
-                f"mgr.{self.hostname}",
-                "mon",
-                "allow profile mgr",
-                "osd",
-                "allow *",
-                "mds",
-                "allow *",
-                "-o" f"{self.folder}/ceph.mgr.keyring",
-            ]
+        ceph.auth_get_or_create(
+            f"mgr.{self.hostname}",
+            ["mon", "allow profile mgr", "osd", "allow *", "mds", "allow *"],
+            f"{self.folder}/ceph.mgr.keyring",
         )
         return "ceph.mgr.keyring"
 
@@ -101,9 +89,8 @@ class CephMGR:
         Examples:
             >>> mgr.remove_mgr()
         """
-        system.stop_service("ceph-mgr.target")
-        system.disable_service("ceph-mgr.target")
-        system.stop_service("system-ceph\\x2dmgr.slice")
+        system.stop_services(["ceph-mgr.target", "system-ceph\\x2dmgr.slice"])
+        system.disable_services(["ceph-mgr.target"])
         fileio.remove_dir(f"{ceph.VAR_MGR}{self.hostname}", admin=True)
         fileio.remove_file(f"{ceph.VAR_RUN}mgr.{self.hostname}.asok", admin=True)
 
@@ -1,6 +1,7 @@
 import configparser
 import subprocess
 import uuid
+from typing import Dict, Optional
 
 import distrax.utils.ceph as ceph
 import distrax.utils.fileio as fileio
@@ -23,13 +24,19 @@ class CephMON:
 
         >>> mon = CephMON(folder="distrax")
 
+        >>> mon = CephMON(folder="distrax", osd_options={"debug osd": "0/0"})
+
     """
 
-    def __init__(self, folder: str = "ceph") -> None:
+    def __init__(
+        self, folder: str = "ceph", osd_options: Optional[Dict[str, str]] = None
+    ) -> None:
         """Initialise the CephMON object.
 
         Args:
             folder: the location to store the keys of the ceph system
+            osd_options: options for the [osd] section of ceph.conf, i.e. from
+                distrax.osds.tuning.profile_options
 
         Examples:
             >>> mon = CephMON()
@@ -39,6 +46,7 @@ class CephMON:
         self.ip: str = ""
         self.ip_netmask: str = ""
         self.folder = folder
+        self.osd_options = osd_options or {}
 
     def create_mon(self, interface: str) -> None:
         """Create the Ceph Monitor daemon.
@@ -49,15 +57,9 @@ class CephMON:
         Examples:
             >>> mon.create_mon("lo")
         """
-        ceph_state = subprocess.run(
-            ["ceph", "-s", "--connect-timeout", "3"],
-            stderr=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-        )
-        if ceph_state.returncode != 1:
-            raise ClusterExistsError(
-                f"Ceph Cluster Exists: \r\n {ceph_state.stdout.decode('utf-8')}"
-            )
+        ceph_state = ceph.mon_command({"prefix": "status"}, timeout="3")
+        if ceph_state.returncode == 0:
+            raise ClusterExistsError(f"Ceph Cluster Exists: \r\n {ceph_state.output}")
         # Get system details
         self.fsid = str(uuid.uuid4().hex)
         (
@@ -86,28 +88,28 @@ class CephMON:
         self._create_monmap()
         # Create Cluster
         self._create_cluster()
-        # Copy files
-        fileio.copy_file(
-            f"{self.folder}/{ceph.MON_KEYRING}",
-            f"{ceph.VAR_MON}{self.hostname}/keyring",
-            admin=True,
-        )
-        fileio.recursive_change_ownership(
-            f"{ceph.VAR_MON}{self.hostname}", "ceph", "ceph", admin=True
-        )
-        fileio.copy_file(
-            f"{self.folder}/{ceph.ADMIN_KEYRING}",
-            f"{ceph.ETC_CEPH}/{ceph.ADMIN_KEYRING}",
-            admin=True,
-        )
+        with fileio.batch():
+            # Copy files
+            fileio.copy_file(
+                f"{self.folder}/{ceph.MON_KEYRING}",
+                f"{ceph.VAR_MON}{self.hostname}/keyring",
+                admin=True,
+            )
+            fileio.recursive_change_ownership(
+                f"{ceph.VAR_MON}{self.hostname}", "ceph", "ceph", admin=True
+            )
+            fileio.copy_file(
+                f"{self.folder}/{ceph.ADMIN_KEYRING}",
+                f"{ceph.ETC_CEPH}/{ceph.ADMIN_KEYRING}",
+                admin=True,
+            )
 
         # Start Monitor
-        system.start_service(f"ceph-mon@{self.hostname}")
-        status = system.is_systemd_service_active(f"ceph-mon@{self.hostname}")
+        status = system.start_services([f"ceph-mon@{self.hostname}"])
         if status is False:
             message = "Ceph Monitor Failed to Start, please investigate"
             raise DaemonNotStartedError(message)
-        subprocess.run(["ceph", "mon", "enable-msgr2", "--connect-timeout", "3"])
+        ceph.mon_command({"prefix": "mon enable-msgr2"}, timeout="3")
 
     def _create_cluster(self) -> None:
         """Create the Ceph Cluster with the monitor node."""
@@ -170,6 +172,8 @@ class CephMON:
             "mon cluster log": "/dev/null",  # Sets logging to /dev/null
             "mon allow pool delete": "true",  # Allows deletion of pools
         }
+        if self.osd_options:
+            config["osd"] = self.osd_options
         with open(f"{self.folder}/{ceph.CONFIG_FILE}", "w") as configfile:
             config.write(configfile)
 
@@ -179,10 +183,10 @@ class CephMON:
         Examples:
             >>> mon.remove_mon()
         """
-        system.stop_service("ceph-mon.target")
-        system.disable_service("ceph-mon.target")
-        system.stop_service("system-ceph\\x2dmon.slice")
-        system.stop_service("ceph.target")
+        system.stop_services(
+            ["ceph-mon.target", "system-ceph\\x2dmon.slice", "ceph.target"]
+        )
+        system.disable_services(["ceph-mon.target"])
         fileio.remove_dir(f"{ceph.VAR_MON}{self.hostname}", admin=True)
         fileio.remove_file(f"{ceph.VAR_RUN}mon.{self.hostname}.asok")
         fileio.remove_dir(self.folder)
@@ -5,7 +5,7 @@ from typing import NamedTuple, Optional, Union
 from . import abstract_osd
 
 log = logging.getLogger(__name__)
-AVAILABLE = ["ceph"]
+AVAILABLE = ["ceph", "memstore"]
 """OSDs that are supported and can be used."""
 
 
@@ -20,7 +20,7 @@ def set_osd(osd: str) -> None:
     """Sets the OSD to use.
 
     Args:
-        osd: the osd to get, i.e. ceph
+        osd: the osd to get, i.e. ceph or memstore
 
     Examples:
         >>> distrax.osds as osd
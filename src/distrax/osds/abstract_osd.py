@@ -1,4 +1,15 @@
-from typing import List, Protocol, runtime_checkable
+from typing import Dict, List, NamedTuple, Optional, Protocol, runtime_checkable
+
+from distrax.utils.resources import NUMANode
+
+
+class OSDResult(NamedTuple):
+    """Structure for the outcome of creating an OSD on a device."""
+
+    device: str
+    returncode: int
+    duration: float
+    error: str
 
 
 @runtime_checkable
@@ -9,12 +20,19 @@ class AbstractOSD(Protocol):
     it must implement `create_osds` and `remove_osds` in the method stated here.
     """
 
-    def create_osds(self, devices: List[str]) -> None:
+    def create_osds(
+        self,
+        devices: List[str],
+        workers: int = 1,
+        placement: Optional[Dict[str, NUMANode]] = None,
+    ) -> None:
         """Create the OSD devices.
 
         Args:
             devices: A list of block devices files names,
                 e.g. /dev/nvme0n1p1 or /dev/ram0
+            workers: The number of OSDs to create at the same time.
+            placement: The NUMA node to bind the OSD of each device to.
         """
         ...
 
@@ -34,6 +52,29 @@ class AbstractOSD(Protocol):
         """
         ...
 
+    def wait_for_osds(self, num_up_and_in: int, timeout: float = 60) -> bool:
+        """Wait for the OSDs to be ready.
+
+        Args:
+            num_up_and_in: The number of OSDS expected to be up and running
+            timeout: The amount of time to wait for the OSDs
+
+        Returns:
+            True when the OSDs are ready before the timeout else False
+        """
+        ...
+
+    def wait_for_local_osds(self, timeout: float = 60) -> bool:
+        """Wait for the OSDs on this host to be ready, without the monitors.
+
+        Args:
+            timeout: The amount of time to wait for the OSDs
+
+        Returns:
+            True when the OSDs are ready before the timeout else False
+        """
+        ...
+
     def remove_osds(self) -> None:
         """Remove the OSDs created."""
         ...
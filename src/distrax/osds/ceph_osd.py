@@ -1,16 +1,35 @@
 import glob
 import json
 import logging
+import os
 import subprocess
 import time
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
+import distrax.osds.placement as numa
 import distrax.utils.ceph as ceph
 import distrax.utils.fileio as fileio
+import distrax.utils.readiness as readiness
 import distrax.utils.system as system
+from distrax.exceptions.exceptions import OSDCreationError
 from distrax.osds import OSD
+from distrax.osds.abstract_osd import OSDResult
+from distrax.utils.resources import NUMANode
 
 logger = logging.getLogger(__name__)
+MODES = ["lvm", "raw"]
+"""The ceph-volume modes the OSDs can be created with."""
+TEARDOWNS = ["safe", "fast"]
+"""How the OSDs are removed, fast removes the volumes without zapping them."""
+RETRIES = 5
+"""The number of times a removal command is retried."""
+OSD_UNITS = [
+    "ceph-osd.target",
+    "system-ceph\\x2dosd.slice",
+    "system-ceph\\x2dvolume.slice",
+]
+"""The units stopped once the OSDs are stopped."""
 
 
 class CephOSD:
@@ -23,10 +42,19 @@ class CephOSD:
         >>> osd = CephOSD()
 
         >>> osd = CephOSD(folder="distrax")
+
+        >>> osd = CephOSD(folder="distrax", mode="raw")
+
+        >>> osd = CephOSD(folder="distrax", teardown="fast")
     """
 
     def __init__(
-        self, folder: str = "ceph", system_timeout: int = 60, ceph_timeout: int = 5
+        self,
+        folder: str = "ceph",
+        system_timeout: int = 60,
+        ceph_timeout: int = 5,
+        mode: str = "lvm",
+        teardown: str = "safe",
     ):
         """Initialise the CephOSD object.
 
@@ -35,53 +63,185 @@ class CephOSD:
             system_timeout: The amount of time before a timeout for system actions,
             this defaulted to 60 seconds.
             ceph_timeout: The amount of time a ceph command can run before timeout.
+            mode: The ceph-volume mode, lvm places BlueStore within an LVM volume
+                whereas raw places BlueStore directly on the device.
+            teardown: How the OSDs are removed, safe marks the OSDs out one at a
+                time and zaps each volume, fast marks them out and stops them
+                together and removes the volumes in bulk, for ephemeral clusters
+                whose devices are removed afterwards.
+
+        Raises:
+            ValueError: If the mode is not one of MODES or the teardown is not one
+                of TEARDOWNS.
         """
+        if mode not in MODES:
+            raise ValueError(
+                f"OSD mode `{mode}` is not available! Choose from: {MODES}"
+            )
+        if teardown not in TEARDOWNS:
+            raise ValueError(
+                f"OSD teardown `{teardown}` is not available! Choose from: "
+                f"{TEARDOWNS}"
+            )
         self.folder = folder
+        self.mode = mode
+        self.teardown = teardown
         self.system_timeout = system_timeout
         self.ceph_timeout = str(ceph_timeout)
+        self.results: List[OSDResult] = []
+        self.placement: Dict[str, NUMANode] = {}
 
-    def create_osds(self, devices: List[str]) -> None:
+    def create_osds(
+        self,
+        devices: List[str],
+        workers: int = 1,
+        placement: Optional[Dict[str, NUMANode]] = None,
+    ) -> None:
         """Create the OSDs devices.
 
+        The outcome and duration of each device is stored in `results`.
+
         Args:
             devices: The device names to turn into OSDs.
+            workers: The number of OSDs to create at the same time.
+            placement: The NUMA node to bind the OSD of each device to, i.e. from
+                distrax.osds.placement.place_devices.
+
+        Raises:
+            OSDCreationError: If any of the devices could not be made into an OSD.
 
         Examples:
             >>> osd.create_osds(["/dev/ram0", "/dev/ram1"])
+
+            >>> osd.create_osds(["/dev/ram0", "/dev/ram1"], workers=2)
+            >>> osd.results
+                [OSDResult(device='/dev/ram0', returncode=0, duration=6.1, error=''),
+                OSDResult(device='/dev/ram1', returncode=0, duration=6.3, error='')]
+
+            >>> osd.create_osds(paths, placement=placement.place_devices(paths))
         """
-        # Create needed directories for OSDs to run on the system
-        fileio.create_dir(ceph.VAR_BOOTSTRAP_OSD, 755, admin=True)
-        fileio.create_dir(ceph.VAR_OSD, 755, admin=True)
-
-        # Copy OSDs files to ETC Ceph
-        fileio.copy_file(
-            f"{self.folder}/{ceph.CONFIG_FILE}",
-            f"{ceph.ETC_CEPH}/{ceph.CONFIG_FILE}",
-            admin=True,
-        )
-        fileio.copy_file(
-            f"{self.folder}/{ceph.ADMIN_KEYRING}",
-            f"{ceph.ETC_CEPH}/{ceph.ADMIN_KEYRING}",
-            admin=True,
-        )
+        self.placement = placement or {}
+        with fileio.batch():
+            # Create needed directories for OSDs to run on the system
+            fileio.create_dir(ceph.VAR_BOOTSTRAP_OSD, 755, admin=True)
+            fileio.create_dir(ceph.VAR_OSD, 755, admin=True)
 
-        fileio.copy_file(
-            f"{self.folder}/{ceph.OSD_KEYRING}",
-            f"{ceph.ETC_CEPH}/ceph.keyring",
-            admin=True,
-        )
-        # Copy OSDs files to VAR Ceph
-        fileio.copy_file(
-            f"{self.folder}/{ceph.OSD_KEYRING}",
-            f"{ceph.VAR_BOOTSTRAP_OSD}/ceph.keyring",
-            admin=True,
-        )
+            # Copy OSDs files to ETC Ceph
+            fileio.copy_file(
+                f"{self.folder}/{ceph.CONFIG_FILE}",
+                f"{ceph.ETC_CEPH}/{ceph.CONFIG_FILE}",
+                admin=True,
+            )
+            fileio.copy_file(
+                f"{self.folder}/{ceph.ADMIN_KEYRING}",
+                f"{ceph.ETC_CEPH}/{ceph.ADMIN_KEYRING}",
+                admin=True,
+            )
+
+            fileio.copy_file(
+                f"{self.folder}/{ceph.OSD_KEYRING}",
+                f"{ceph.ETC_CEPH}/ceph.keyring",
+                admin=True,
+            )
+            # Copy OSDs files to VAR Ceph
+            fileio.copy_file(
+                f"{self.folder}/{ceph.OSD_KEYRING}",
+                f"{ceph.VAR_BOOTSTRAP_OSD}/ceph.keyring",
+                admin=True,
+            )
         # Create the OSDs using ceph-volume
-        for device in devices:
-            subprocess.run(
-                ["sudo", "ceph-volume", "lvm", "create", "--data", device],
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            self.results = list(executor.map(self._create_osd, devices))
+        failed = [result for result in self.results if result.returncode != 0]
+        if failed:
+            raise OSDCreationError(
+                "Failed to create OSDs: "
+                + ", ".join(f"{result.device}: {result.error}" for result in failed)
             )
-            logger.info(f"Created {device} OSD")
+
+    @staticmethod
+    def _ceph_volume(args: List[str]) -> Tuple[int, str]:
+        """Run ceph-volume.
+
+        Args:
+            args: The arguments to pass to ceph-volume.
+
+        Returns:
+            The returncode and the output, or the error if it failed.
+        """
+        process = subprocess.run(
+            ["sudo", "ceph-volume"] + args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            # ceph-volume refuses loop devices unless allowed, kept through sudo
+            env={**os.environ, "CEPH_VOLUME_ALLOW_LOOP_DEVICES": "1"},
+        )
+        if process.returncode != 0:
+            # ceph-volume reports the cause on the last line of stderr
+            lines = process.stderr.decode("utf-8").strip().splitlines()
+            return process.returncode, (
+                lines[-1] if lines else f"exit code {process.returncode}"
+            )
+        return 0, process.stdout.decode("utf-8")
+
+    def _volume_steps(self, device: str) -> List[List[str]]:
+        """Get the ceph-volume commands that create an OSD on a device.
+
+        The last step lists the OSD when its id is needed to start or bind it.
+        """
+        if self.mode == "raw":
+            # raw activate does not set up systemd, the OSD is started below
+            return [
+                ["raw", "prepare", "--bluestore", "--data", device],
+                ["raw", "activate", "--device", device, "--no-systemd"],
+                ["raw", "list", device, "--format", "json"],
+            ]
+        steps = [["lvm", "create", "--data", device]]
+        if device in self.placement:
+            steps.append(["lvm", "list", device, "--format", "json"])
+        return steps
+
+    def _start_osd(self, device: str, osd_id: str) -> None:
+        """Bind an OSD to the NUMA node of its device, then start it."""
+        if device in self.placement:
+            node = self.placement[device]
+            if numa.bind_osd(osd_id, node):
+                logger.info(f"Bound osd.{osd_id} on {device} to NUMA node {node.id}")
+            else:
+                logger.warning(f"Could not bind osd.{osd_id} to NUMA node {node.id}")
+        if self.mode == "raw":
+            system.start_service(f"ceph-osd@{osd_id}")
+        else:
+            # lvm create has started the OSD so it is restarted once bound
+            system.restart_service(f"ceph-osd@{osd_id}")
+
+    def _create_osd(self, device: str) -> OSDResult:
+        """Create an OSD on a device using ceph-volume.
+
+        Args:
+            device: The device name to turn into an OSD.
+
+        Returns:
+            The outcome of creating the OSD.
+        """
+        start = time.monotonic()
+        output = ""
+        for step in self._volume_steps(device):
+            returncode, output = self._ceph_volume(step)
+            if returncode != 0:
+                logger.error(f"Failed to create {device} OSD: {output}")
+                return OSDResult(device, returncode, time.monotonic() - start, output)
+        if self.mode == "raw":
+            osd_ids = [str(osd["osd_id"]) for osd in json.loads(output).values()]
+        elif device in self.placement:
+            osd_ids = list(json.loads(output).keys())
+        else:
+            osd_ids = []
+        for osd_id in osd_ids:
+            self._start_osd(device, osd_id)
+        duration = time.monotonic() - start
+        logger.info(f"Created {device} OSD in {duration:.1f}s")
+        return OSDResult(device, 0, duration, "")
 
     def is_osd_ready(self, num_up_and_in: int) -> bool:
         """Check if the OSDs are ready.
@@ -97,20 +257,7 @@ class CephOSD:
                 True
 
         """
-        status_process = subprocess.run(
-            [
-                "ceph",
-                "osd",
-                "stat",
-                "--format=json",
-                "--connect-timeout",
-                self.ceph_timeout,
-            ],
-            stdout=subprocess.PIPE,
-        )
-        status = dict(json.loads(status_process.stdout))
-        """{'epoch': 1, 'num_osds': 5, 'num_up_osds': 5, 'osd_up_since': 1,
-            'num_in_osds': 5, 'osd_in_since': 1, 'num_remapped_pgs': 0}"""
+        status = ceph.osd_status(self.ceph_timeout, refresh=True)
         if (
             status["num_up_osds"] == num_up_and_in
             and status["num_in_osds"] == num_up_and_in
@@ -118,26 +265,78 @@ class CephOSD:
             return True
         return False
 
-    def remove_osds(self) -> None:
-        """Remove the OSDs devices from the system.
+    def wait_for_osds(self, num_up_and_in: int, timeout: float = 60) -> bool:
+        """Wait for the OSDs to be ready.
+
+        Args:
+            num_up_and_in: The number of OSDS expected to be up and running
+            timeout: The amount of time to wait for the OSDs
+
+        Returns:
+            True when the OSDs are ready before the timeout else False
 
         Examples:
-            >>> osd.remove_osds()
+            >>> osd.wait_for_osds(4, timeout=60)
+                True
         """
-        # Get OSD_ids from the host system
-        osd_ids = glob.glob(f"{ceph.VAR_OSD_ID}*")
+        engine = readiness.ReadinessEngine(timeout, ceph_timeout=self.ceph_timeout)
+        try:
+            engine.wait_for([readiness.osds_up_and_in(num_up_and_in)])
+        except TimeoutError as error:
+            logger.error(error)
+            return False
+        return True
+
+    def wait_for_local_osds(self, timeout: float = 60) -> bool:
+        """Wait for the OSDs on this host to be ready, through their admin sockets.
+
+        This does not go through the monitors, so can be run on every host at once.
+
+        Args:
+            timeout: The amount of time to wait for the OSDs
+
+        Returns:
+            True when the OSDs are ready before the timeout, or when their admin
+            sockets cannot be used, else False
+
+        Examples:
+            >>> osd.wait_for_local_osds(timeout=60)
+                True
+        """
+        osd_ids = [
+            osd_dir.replace(ceph.VAR_OSD_ID, "")
+            for osd_dir in glob.glob(f"{ceph.VAR_OSD_ID}*")
+        ]
+        try:
+            readiness.wait_for_daemons([f"osd.{osd_id}" for osd_id in osd_ids], timeout)
+        except PermissionError as error:
+            logger.debug(f"Admin sockets cannot be used, relying on the mons: {error}")
+        except TimeoutError as error:
+            logger.error(error)
+            return False
+        return True
+
+    def _stop_osds(self, osd_ids: List[str]) -> None:
+        """Mark the OSDs out and stop them, one at a time unless the teardown is fast.
+
+        Args:
+            osd_ids: The ids of the OSDs on this host.
+        """
+        if self.teardown == "fast":
+            if osd_ids:
+                ceph.mon_command(
+                    {"prefix": "osd out", "ids": osd_ids}, self.ceph_timeout
+                )
+            system.stop_services(
+                [f"ceph-osd@{osd_id}" for osd_id in osd_ids]
+                + [f"var-lib-ceph-osd-ceph\\x2d{osd_id}.mount" for osd_id in osd_ids]
+                + OSD_UNITS
+            )
+            return
         # Set OSDs to out to ensure safe removal
         for osd_id in osd_ids:
-            osd_id = osd_id.strip(ceph.VAR_OSD_ID)
-            subprocess.run(
-                [
-                    "ceph",
-                    "osd",
-                    "out",
-                    str(osd_id),
-                    "--connect-timeout",
-                    self.ceph_timeout,
-                ]
+            ceph.mon_command(
+                {"prefix": "osd out", "ids": [str(osd_id)]}, self.ceph_timeout
             )
             # Wait for the osd to be set to out
             time.sleep(1)
@@ -145,9 +344,40 @@ class CephOSD:
             system.stop_service(f"ceph-osd@{osd_id}")
             system.stop_service(f"var-lib-ceph-osd-ceph\\x2d{osd_id}.mount")
         # Stop OSDs service
-        system.stop_service("ceph-osd.target")
-        system.disable_service("ceph-osd.target")
-        # Remove ceph and clean devices
+        system.stop_services(OSD_UNITS)
+
+    def remove_osds(self) -> None:
+        """Remove the OSDs devices from the system.
+
+        Examples:
+            >>> osd.remove_osds()
+        """
+        # Get OSD_ids from the host system
+        osd_ids = [
+            osd_dir.replace(ceph.VAR_OSD_ID, "")
+            for osd_dir in glob.glob(f"{ceph.VAR_OSD_ID}*")
+        ]
+        self._stop_osds(osd_ids)
+        system.disable_services(["ceph-osd.target"])
+        numa.unbind_osds()
+        # Raw OSDs have no volumes to remove, the device is wiped when removed
+        if self.mode == "lvm" and self.teardown == "fast":
+            self._remove_volumes()
+        elif self.mode == "lvm":
+            self._zap_volumes()
+        with fileio.batch():
+            for osd_id in osd_ids:
+                fileio.remove_file(f"{ceph.VAR_RUN}osd.{osd_id}.asok", admin=True)
+        fileio.remove_dir(ceph.VAR_BOOTSTRAP_OSD, admin=True)
+        fileio.remove_dir(ceph.VAR_OSD, admin=True)
+
+    @staticmethod
+    def _ceph_volumes() -> List[Tuple[str, str]]:
+        """Get the physical volumes of the ceph volume groups.
+
+        Returns:
+            The physical volume and volume group of each ceph volume.
+        """
         pvs_process = subprocess.run(
             ["sudo", "pvs", "--separator", ",", "-o", "pv_name,vg_name"],
             stdout=subprocess.PIPE,
@@ -155,32 +385,83 @@ class CephOSD:
         )
         pvs_output = pvs_process.stdout.decode("utf-8")
         pvs_output_lst = pvs_output.replace(" ", "").splitlines()
+        volumes = []
         for pv in pvs_output_lst:
             pvs = pv.split(",")  # PV, VG
-            if pvs[1][:4] == "ceph":
-                remove_osd_process = subprocess.run(
-                    ["sudo", "ceph-volume", "lvm", "zap", "--destroy", pvs[0]],
+            if len(pvs) == 2 and pvs[1][:4] == "ceph":
+                volumes.append((pvs[0], pvs[1]))
+        return volumes
+
+    @staticmethod
+    def _zap_volumes() -> None:
+        """Destroy the ceph LVM volumes and their ceph-volume services."""
+        for pv, _ in CephOSD._ceph_volumes():
+            CephOSD._retry(["sudo", "ceph-volume", "lvm", "zap", "--destroy", pv])
+        CephOSD._remove_volume_services()
+
+    @staticmethod
+    def _remove_volumes() -> None:
+        """Remove the ceph LVM volumes in bulk without zapping them.
+
+        The volume groups and physical volumes are removed with one command each,
+        if the volume groups are held open their device mapper tables are removed
+        first.
+        """
+        volumes = CephOSD._ceph_volumes()
+        if volumes:
+            pvs = [pv for pv, _ in volumes]
+            vgs = sorted({vg for _, vg in volumes})
+            vgremove = ["sudo", "vgremove", "--force", "--yes"] + vgs
+            if not CephOSD._retry(vgremove, retries=1):
+                dmsetup_process = subprocess.run(
+                    ["sudo", "dmsetup", "ls"],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
                 )
-                while remove_osd_process.returncode != 0:
-                    time.sleep(1)
-                    remove_osd_process = subprocess.run(
-                        ["sudo", "ceph-volume", "lvm", "zap", "--destroy", pvs[0]],
-                    )
+                maps = [
+                    line.split()[0]
+                    for line in dmsetup_process.stdout.decode("utf-8").splitlines()
+                    if line.startswith("ceph--")
+                ]
+                if maps:
+                    CephOSD._retry(["sudo", "dmsetup", "remove", "--force"] + maps)
+                CephOSD._retry(vgremove)
+            CephOSD._retry(["sudo", "pvremove", "--force", "--yes"] + pvs)
+        CephOSD._remove_volume_services()
 
+    @staticmethod
+    def _remove_volume_services() -> None:
+        """Remove the ceph-volume services of the LVM volumes."""
         # Get ceph-volume services
         osd_services = glob.glob(
             "/etc/systemd/system/multi-user.target.wants/ceph-volume@lvm-*"
         )
         # remove ceph-volume services
-        for osd_service in osd_services:
-            fileio.remove_file(osd_service, admin=True)
-        for osd_id in osd_ids:
-            osd_id = osd_id.strip(ceph.VAR_OSD_ID)
-            fileio.remove_file(f"{ceph.VAR_RUN}osd.{osd_id}.asok", admin=True)
-        system.stop_service("system-ceph\\x2dosd.slice")
-        system.stop_service("system-ceph\\x2dvolume.slice")
-        fileio.remove_dir(ceph.VAR_BOOTSTRAP_OSD, admin=True)
-        fileio.remove_dir(ceph.VAR_OSD, admin=True)
+        with fileio.batch():
+            for osd_service in osd_services:
+                fileio.remove_file(osd_service, admin=True)
+
+    @staticmethod
+    def _retry(command: List[str], retries: int = RETRIES) -> bool:
+        """Run a command until it succeeds, a second apart.
+
+        Args:
+            command: The command to run.
+            retries: The number of times to run the command.
+
+        Returns:
+            True if the command succeeded else False.
+        """
+        for attempt in range(retries):
+            if attempt:
+                time.sleep(1)
+            process = subprocess.run(
+                command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+            if process.returncode == 0:
+                return True
+        logger.error(f"{' '.join(command)} failed after {retries} attempts")
+        return False
 
 
 _osd = OSD("ceph", CephOSD)
@@ -0,0 +1,314 @@
+import glob
+import json
+import logging
+import subprocess
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import distrax.osds.placement as numa
+import distrax.utils.ceph as ceph
+import distrax.utils.fileio as fileio
+import distrax.utils.readiness as readiness
+import distrax.utils.system as system
+from distrax.exceptions.exceptions import NotEnoughMemoryError, OSDCreationError
+from distrax.osds import OSD
+from distrax.osds.abstract_osd import OSDResult
+from distrax.utils.resources import NUMANode
+
+logger = logging.getLogger(__name__)
+
+
+class MemstoreOSD:
+    """Class for the creation and removal of Ceph OSDs using the memstore objectstore.
+
+    Memstore OSDs hold their data within the memory of the OSD process, therefore
+    no block devices, LVM or BlueStore are needed and creating and removing the
+    OSDs is mostly starting and stopping the OSD processes. Stopping is not free,
+    memstore writes every object it holds to the data folder of the OSD as it
+    unmounts, such that stopping a full OSD takes as long as writing its memory to
+    /var/lib/ceph and needs as much space there, before the folder is removed.
+
+    To read more about the Ceph OSD please see:
+    https://docs.ceph.com/en/latest/glossary/#term-Ceph-OSD
+
+    Examples:
+        >>> osd = MemstoreOSD()
+
+        >>> osd = MemstoreOSD(folder="distrax", size=4)
+    """
+
+    def __init__(
+        self,
+        folder: str = "ceph",
+        size: int = 1,
+        system_timeout: int = 60,
+        ceph_timeout: int = 5,
+    ):
+        """Initialise the MemstoreOSD object.
+
+        Args:
+            folder: the place to place the keys of the ceph system.
+            size: number representing a GiB of memory for each OSD, i.e 4 would
+                mean 4GiB
+            system_timeout: The amount of time before a timeout for system actions,
+                this defaulted to 60 seconds.
+            ceph_timeout: The amount of time a ceph command can run before timeout.
+        """
+        self.folder = folder
+        self.size = size
+        self.system_timeout = system_timeout
+        self.ceph_timeout = str(ceph_timeout)
+        self.results: List[OSDResult] = []
+        self.placement: Dict[str, NUMANode] = {}
+
+    @staticmethod
+    def get_names(number: int) -> List[str]:
+        """Get names for the OSDs as memstore OSDs have no devices.
+
+        Args:
+            number: number of OSDs to create
+
+        Returns:
+            List of OSD names, i.e. memstore0,memstore1
+        """
+        return [f"memstore{i}" for i in range(number)]
+
+    def create_osds(
+        self,
+        devices: List[str],
+        workers: int = 1,
+        placement: Optional[Dict[str, NUMANode]] = None,
+    ) -> None:
+        """Create the memstore OSDs.
+
+        Args:
+            devices: One OSD is created for each name, as the OSDs are held in
+                memory the names are only used for logging, i.e. from `get_names`.
+            workers: The number of OSDs to create at the same time.
+            placement: The NUMA node to bind the OSD of each name to.
+
+        Raises:
+            NotEnoughMemoryError: If the memory requested for the OSDs is higher
+                than the memory available.
+            OSDCreationError: If any of the OSDs could not be created.
+
+        Examples:
+            >>> osd.create_osds(osd.get_names(4), workers=4)
+        """
+        self.placement = placement or {}
+        size = self.size * 1024**2  # free memory is reported in KiB
+        free_mem = system.available_memory()
+        if size * len(devices) > free_mem:
+            raise NotEnoughMemoryError(
+                f"{len(devices)} OSDs of {size}KiB totaling {len(devices) * size}KiB "
+                f"requested when only {free_mem}KiB available, please reduce the "
+                f"number of OSDs or the size of the OSD"
+            )
+        # Create needed directories for OSDs to run on the system
+        fileio.create_dir(ceph.VAR_OSD, 755, admin=True)
+        fileio.copy_file(
+            f"{self.folder}/{ceph.CONFIG_FILE}",
+            f"{ceph.ETC_CEPH}/{ceph.CONFIG_FILE}",
+            admin=True,
+        )
+        fileio.copy_file(
+            f"{self.folder}/{ceph.ADMIN_KEYRING}",
+            f"{ceph.ETC_CEPH}/{ceph.ADMIN_KEYRING}",
+            admin=True,
+        )
+        # The OSD daemons read the objectstore from the monitor config database
+        for name, value in [
+            ("osd_objectstore", "memstore"),
+            ("memstore_device_bytes", str(self.size * 1024**3)),
+        ]:
+            ceph.mon_command(
+                {"prefix": "config set", "who": "osd", "name": name, "value": value},
+                self.ceph_timeout,
+            )
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            self.results = list(executor.map(self._create_osd, devices))
+        failed = [result for result in self.results if result.returncode != 0]
+        if failed:
+            raise OSDCreationError(
+                "Failed to create OSDs: "
+                + ", ".join(f"{result.device}: {result.error}" for result in failed)
+            )
+
+    def _create_osd(self, name: str) -> OSDResult:
+        """Create and start a memstore OSD.
+
+        Args:
+            name: The name of the OSD used for logging.
+
+        Returns:
+            The outcome of creating the OSD.
+        """
+        start = time.monotonic()
+        osd_uuid = str(uuid.uuid4())
+        result = ceph.mon_command(
+            {"prefix": "osd new", "uuid": osd_uuid, "format": "json"},
+            self.ceph_timeout,
+        )
+        if result.returncode != 0:
+            error = result.error.strip()
+            logger.error(f"Failed to create {name} OSD: {error}")
+            return OSDResult(name, result.returncode, time.monotonic() - start, error)
+        osd_id = json.loads(result.output)["osdid"]
+        osd_dir = f"{ceph.VAR_OSD_ID}{osd_id}"
+        fileio.create_dir(osd_dir, 755, admin=True)
+        keyring = f"ceph.osd.{osd_id}.keyring"
+        ceph.auth_get_or_create(
+            f"osd.{osd_id}",
+            ["mon", "allow profile osd", "mgr", "allow profile osd", "osd", "allow *"],
+            f"{self.folder}/{keyring}",
+            self.ceph_timeout,
+        )
+        fileio.copy_file(f"{self.folder}/{keyring}", f"{osd_dir}/keyring", admin=True)
+        fileio.recursive_change_ownership(osd_dir, "ceph", "ceph", admin=True)
+        process = subprocess.run(
+            [
+                "sudo",
+                "ceph-osd",
+                "--cluster",
+                "ceph",
+                "-i",
+                str(osd_id),
+                "--mkfs",
+                "--osd-uuid",
+                osd_uuid,
+                "--osd-objectstore",
+                "memstore",
+                "--setuser",
+                "ceph",
+                "--setgroup",
+                "ceph",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        if process.returncode != 0:
+            lines = process.stderr.decode("utf-8").strip().splitlines()
+            error = lines[-1] if lines else f"exit code {process.returncode}"
+            logger.error(f"Failed to create {name} OSD: {error}")
+            return OSDResult(name, process.returncode, time.monotonic() - start, error)
+        if name in self.placement:
+            if not numa.bind_osd(str(osd_id), self.placement[name]):
+                logger.warning(f"Could not bind osd.{osd_id} to its NUMA node")
+        system.start_service(f"ceph-osd@{osd_id}")
+        duration = time.monotonic() - start
+        logger.info(f"Created {name} as osd.{osd_id} in {duration:.1f}s")
+        return OSDResult(name, 0, duration, "")
+
+    def is_osd_ready(self, num_up_and_in: int) -> bool:
+        """Check if the OSDs are ready.
+
+        Args:
+            num_up_and_in: The number of OSDS expected to be up and running
+
+        Returns:
+            True when the number of up and in match stated requirment.
+
+        Examples:
+            >>> osd.osd_ready()
+                True
+
+        """
+        status = ceph.osd_status(self.ceph_timeout, refresh=True)
+        if (
+            status["num_up_osds"] == num_up_and_in
+            and status["num_in_osds"] == num_up_and_in
+        ):
+            return True
+        return False
+
+    def wait_for_osds(self, num_up_and_in: int, timeout: float = 60) -> bool:
+        """Wait for the OSDs to be ready.
+
+        Args:
+            num_up_and_in: The number of OSDS expected to be up and running
+            timeout: The amount of time to wait for the OSDs
+
+        Returns:
+            True when the OSDs are ready before the timeout else False
+
+        Examples:
+            >>> osd.wait_for_osds(4, timeout=60)
+                True
+        """
+        engine = readiness.ReadinessEngine(timeout, ceph_timeout=self.ceph_timeout)
+        try:
+            engine.wait_for([readiness.osds_up_and_in(num_up_and_in)])
+        except TimeoutError as error:
+            logger.error(error)
+            return False
+        return True
+
+    def wait_for_local_osds(self, timeout: float = 60) -> bool:
+        """Wait for the OSDs on this host to be ready, through their admin sockets.
+
+        This does not go through the monitors, so can be run on every host at once.
+
+        Args:
+            timeout: The amount of time to wait for the OSDs
+
+        Returns:
+            True when the OSDs are ready before the timeout, or when their admin
+            sockets cannot be used, else False
+
+        Examples:
+            >>> osd.wait_for_local_osds(timeout=60)
+                True
+        """
+        osd_ids = [
+            osd_dir.replace(ceph.VAR_OSD_ID, "")
+            for osd_dir in glob.glob(f"{ceph.VAR_OSD_ID}*")
+        ]
+        try:
+            readiness.wait_for_daemons([f"osd.{osd_id}" for osd_id in osd_ids], timeout)
+        except PermissionError as error:
+            logger.debug(f"Admin sockets cannot be used, relying on the mons: {error}")
+        except TimeoutError as error:
+            logger.error(error)
+            return False
+        return True
+
+    def remove_osds(self) -> None:
+        """Remove the memstore OSDs from the system.
+
+        Each OSD writes the objects it holds to its data folder as it stops, so the
+        removal takes longer the more data the OSDs hold.
+
+        Examples:
+            >>> osd.remove_osds()
+        """
+        osd_ids = [
+            osd_dir.replace(ceph.VAR_OSD_ID, "")
+            for osd_dir in glob.glob(f"{ceph.VAR_OSD_ID}*")
+        ]
+        if osd_ids:
+            ceph.mon_command({"prefix": "osd out", "ids": osd_ids}, self.ceph_timeout)
+        system.stop_services([f"ceph-osd@{osd_id}" for osd_id in osd_ids])
+        for osd_id in osd_ids:
+            ceph.mon_command(
+                {
+                    "prefix": "osd purge",
+                    "id": int(osd_id),
+                    "yes_i_really_mean_it": True,
+                },
+                self.ceph_timeout,
+            )
+            fileio.remove_file(f"{ceph.VAR_RUN}osd.{osd_id}.asok", admin=True)
+        for name in ["osd_objectstore", "memstore_device_bytes"]:
+            ceph.mon_command(
+                {"prefix": "config rm", "who": "osd", "name": name}, self.ceph_timeout
+            )
+        ceph.invalidate_status()
+        numa.unbind_osds()
+        system.stop_services(["ceph-osd.target", "system-ceph\\x2dosd.slice"])
+        system.disable_services(["ceph-osd.target"])
+        fileio.remove_dir(ceph.VAR_OSD, admin=True)
+
+
+_osd = OSD("memstore", MemstoreOSD)
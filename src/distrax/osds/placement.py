@@ -0,0 +1,92 @@
+"""NUMA placement of OSDs.
+
+Assigns each device and the OSD serving it to a NUMA node, and binds the OSD to
+that node with a systemd drop-in for its `ceph-osd@` unit. The OSD then runs on
+the CPUs of the node and allocates its memory, and the pages of the RAM device it
+writes, from the node.
+
+To read more about the systemd options please see:
+https://www.freedesktop.org/software/systemd/man/systemd.exec.html#NUMAPolicy=
+"""
+
+import glob
+from typing import Dict, List
+
+import distrax.utils.fileio as fileio
+import distrax.utils.system as system
+from distrax.utils.privileged import DROP_IN, DROP_IN_DIR, numa_drop_in
+from distrax.utils.resources import NUMANode, numa_nodes
+
+
+def place_devices(devices: List[str], root: str = "/") -> Dict[str, NUMANode]:
+    """Assign the devices to the NUMA nodes of the host.
+
+    The devices are split into equal contiguous blocks, one per node, i.e. with two
+    nodes and four devices ram0 and ram1 are placed on node 0.
+
+    Args:
+        devices: The devices to place.
+        root: The root of the filesystem to read the NUMA topology from.
+
+    Returns:
+        The node of each device, empty if the host has a single node.
+
+    Examples:
+        >>> place_devices(["/dev/ram0", "/dev/ram1"])
+            {'/dev/ram0': NUMANode(id=0, ...), '/dev/ram1': NUMANode(id=1, ...)}
+    """
+    nodes = [node for node in numa_nodes(root) if node.cpus]
+    if len(nodes) <= 1:
+        return {}
+    placement = {}
+    for index, device in enumerate(devices):
+        placement[device] = nodes[index * len(nodes) // len(devices)]
+    return placement
+
+
+def drop_in(node: NUMANode) -> str:
+    """Create the systemd drop-in binding a unit to a NUMA node.
+
+    Args:
+        node: The node to bind to.
+
+    Returns:
+        The contents of the drop-in.
+
+    Examples:
+        >>> print(drop_in(NUMANode(1, [8, 9, 10, 11], 0, 0)))
+            [Service]
+            CPUAffinity=8 9 10 11
+            NUMAPolicy=bind
+            NUMAMask=1
+    """
+    return numa_drop_in(node.cpus, node.id)
+
+
+def bind_osd(osd_id: str, node: NUMANode) -> bool:
+    """Bind an OSD to a NUMA node, it applies when the OSD is next started.
+
+    The drop-in is written by the privileged helper from the id of the OSD and the
+    CPUs and id of the node.
+
+    Args:
+        osd_id: The id of the OSD.
+        node: The node to bind to.
+
+    Returns:
+        True if bound else False.
+    """
+    if not fileio.bind_osd(osd_id, node.cpus, node.id, admin=True):
+        return False
+    system.daemon_reload()
+    return True
+
+
+def unbind_osds() -> None:
+    """Remove the NUMA drop-ins of all OSDs."""
+    drop_ins = glob.glob(f"{DROP_IN_DIR.format(osd_id='*')}/{DROP_IN}")
+    with fileio.batch():
+        for path in drop_ins:
+            fileio.remove_file(path, admin=True)
+    if drop_ins:
+        system.daemon_reload()
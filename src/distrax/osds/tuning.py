@@ -0,0 +1,156 @@
+"""OSD tuning profiles.
+
+A tuning profile computes the OSD, BlueStore and messenger options written to the
+`[osd]` section of ceph.conf from the size of the devices, the number of OSDs and
+the memory of the host.
+
+To read more about the options please see:
+https://docs.ceph.com/en/latest/rados/configuration/bluestore-config-ref/
+"""
+
+from typing import Callable, Dict, NamedTuple, Optional
+
+MIN_OSD_MEMORY_TARGET = 896 * 1024**2
+"""The smallest osd_memory_target ceph allows, in bytes."""
+MAX_OSD_MEMORY_TARGET = 4 * 1024**3
+"""The ceph default osd_memory_target, in bytes."""
+DEBUG_SUBSYSTEMS = ["osd", "bluestore", "bluefs", "bdev", "rocksdb", "ms", "auth"]
+"""The subsystems whose debug logging is turned off by the ram profile."""
+
+
+class HostResources(NamedTuple):
+    """Structure for the resources a tuning profile is computed from."""
+
+    device_size: int
+    """The size of each OSD device in GiB."""
+    osds: int
+    """The number of OSDs on the host."""
+    memory: int
+    """The total memory of the host in KiB."""
+
+
+def default_profile(resources: HostResources) -> Dict[str, str]:
+    """The ceph defaults, no options are written.
+
+    Args:
+        resources: The resources of the host.
+
+    Returns:
+        No options.
+    """
+    return {}
+
+
+def ram_profile(resources: HostResources) -> Dict[str, str]:
+    """Options for OSDs whose devices are held in RAM.
+
+    The data already lives in memory, so checksums, compression, deferred writes
+    and the page cache only add work. The OSD cache is limited to half of the
+    memory left over once the devices are allocated, shared between the OSDs.
+    Freed extents are discarded, such that RAM devices return the memory of
+    deleted objects to the host.
+
+    Args:
+        resources: The resources of the host.
+
+    Returns:
+        The ceph options for the [osd] section.
+
+    Examples:
+        >>> ram_profile(HostResources(device_size=4, osds=4, memory=64 * 1024**2))
+            {'osd memory target': '4294967296', ...}
+    """
+    osds = max(resources.osds, 1)
+    spare = resources.memory * 1024 - resources.device_size * osds * 1024**3
+    memory_target = min(
+        max(spare // (2 * osds), MIN_OSD_MEMORY_TARGET), MAX_OSD_MEMORY_TARGET
+    )
+    options = {
+        "osd memory target": str(memory_target),
+        "bluestore min alloc size": "4096",
+        "bluestore csum type": "none",
+        "bluestore compression mode": "none",
+        "bluestore rocksdb options annex": "compression=kNoCompression",
+        "bluestore prefer deferred size": "0",
+        "bluefs buffered io": "false",
+        "bdev enable discard": "true",
+        "bdev async discard": "true",
+        "ms crc data": "false",
+        "ms crc header": "false",
+    }
+    for subsystem in DEBUG_SUBSYSTEMS:
+        options[f"debug {subsystem}"] = "0/0"
+    return options
+
+
+PROFILES: Dict[str, Callable[[HostResources], Dict[str, str]]] = {
+    "default": default_profile,
+    "ram": ram_profile,
+}
+"""Tuning profiles that are supported and can be used."""
+
+
+def profile_options(
+    profile: str,
+    resources: HostResources,
+    overrides: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """Compute the options of a tuning profile with any overrides applied.
+
+    Options are named as in ceph.conf, underscores and spaces are
+    interchangeable, i.e. osd_memory_target overrides osd memory target.
+
+    Args:
+        profile: The name of the profile, i.e. default or ram.
+        resources: The resources of the host.
+        overrides: Options that replace or add to those of the profile.
+
+    Returns:
+        The ceph options for the [osd] section.
+
+    Raises:
+        ValueError: If the profile is not one of PROFILES.
+
+    Examples:
+        >>> profile_options(
+        ...     "ram", HostResources(1, 1, 8 * 1024**2), {"debug_osd": "1/5"}
+        ... )["debug osd"]
+            '1/5'
+    """
+    if profile not in PROFILES:
+        raise ValueError(
+            f"Tuning profile `{profile}` is not available! Choose from: "
+            f"{list(PROFILES)}"
+        )
+    options = PROFILES[profile](resources)
+    for name, value in (overrides or {}).items():
+        options[name.replace("_", " ")] = value
+    return options
+
+
+def osd_memory_target(
+    profile: str,
+    resources: HostResources,
+    overrides: Optional[Dict[str, str]] = None,
+) -> int:
+    """Compute the osd_memory_target of the OSDs with a tuning profile.
+
+    Args:
+        profile: The name of the profile, i.e. default or ram.
+        resources: The resources of the host.
+        overrides: Options that replace or add to those of the profile.
+
+    Returns:
+        The memory target of each OSD in bytes, the ceph default when the profile
+        does not set it.
+
+    Raises:
+        ValueError: If the profile is not one of PROFILES, or the target set is not
+            a number of bytes.
+
+    Examples:
+        >>> osd_memory_target("ram", HostResources(3, 8, 64 * 1024**2))
+            2684354560
+    """
+    options = profile_options(profile, resources, overrides)
+    return int(options.get("osd memory target", MAX_OSD_MEMORY_TARGET))
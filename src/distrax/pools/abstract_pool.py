@@ -1,4 +1,26 @@
-from typing import Protocol, runtime_checkable
+from typing import List, NamedTuple, Protocol, runtime_checkable
+
+
+class PoolSpec(NamedTuple):
+    """Structure for a pool to be created.
+
+    Args:
+        name: The name of the pool
+        percentage: The percentage of the cluster to allocate to the pool
+            value expected between 0 and 1.
+    """
+
+    name: str
+    percentage: float
+
+
+class PoolResult(NamedTuple):
+    """Structure for the outcome of removing a pool."""
+
+    name: str
+    returncode: int
+    duration: float
+    error: str
 
 
 @runtime_checkable
@@ -9,17 +31,38 @@ class AbstractPool(Protocol):
     """
 
     @staticmethod
-    def create_pool(name: str = "distrax", percentage: float = 1.0) -> None:
+    def create_pool(
+        name: str = "distrax", percentage: float = 1.0, timeout: float = 60
+    ) -> None:
         """Create the Pool to store objects.
 
         Args:
             name: The name of the pool
             percentage: The percentage of the cluster to allocate to the pool
             value expected between 0 and 1.
+            timeout: The amount of time for the pool to be ready.
         """
         ...
 
     @staticmethod
-    def remove_pools() -> None:
-        """Remove and purge pool."""
+    def create_pools(specs: List[PoolSpec], timeout: float = 60) -> None:
+        """Create several Pools and wait once for them all to be ready.
+
+        Args:
+            specs: The pools to create
+            timeout: The amount of time for the pools to be ready.
+        """
+        ...
+
+    @staticmethod
+    def remove_pools(purge: bool = False, workers: int = 8) -> List[PoolResult]:
+        """Remove the pools, purging them first if they are to be reused.
+
+        Args:
+            purge: Whether to purge the objects of each pool before deleting it.
+            workers: The number of pools to remove at the same time.
+
+        Returns:
+            The outcome of removing each pool.
+        """
         ...
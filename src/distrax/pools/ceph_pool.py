@@ -1,11 +1,14 @@
 import logging
 import subprocess
 import time
-from math import floor, log
-from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 
 import distrax.utils.ceph as ceph
-from distrax.pools import POOL
+import distrax.utils.readiness as readiness
+from distrax.exceptions.exceptions import PoolCreationError
+from distrax.pools import POOL, pg_planner
+from distrax.pools.abstract_pool import PoolResult, PoolSpec
 
 logger = logging.getLogger(__name__)
 
@@ -21,78 +24,159 @@ class CephPool:
     """
 
     @staticmethod
-    def create_pool(name: str = "distrax", percentage: float = 1.0) -> None:
+    def create_pool(
+        name: str = "distrax", percentage: float = 1.0, timeout: float = 60
+    ) -> None:
         """Create the Pool to store objects.
 
         Args:
             name: The name of the pool
             percentage: The percentage of the cluster to allocate to the pool.
+            timeout: The amount of time for the pool to become active+clean.
+
+        Raises:
+            TimeoutError: If the pool is not active+clean before the timeout.
 
         Examples:
             >>> pool.create_pool(name="distrax", percentage=1.0)
                 pool 'distrax' created
 
         """
-        logger.info(f"Creating Pool {name}")
-        current_cluster_pgs = ceph.get_current_pg()
-        TARGET_PGS = 100
-        # Calculate pgs based off https://old.ceph.com/pgcalc/
-        pool_pgs = int(
-            2
-            ** floor(
-                log((TARGET_PGS * ceph.osd_status()["num_osds"] * percentage) / log(2))
-                + 0.5
+        CephPool.create_pools([PoolSpec(name, percentage)], timeout)
+
+    @staticmethod
+    def create_pools(specs: List[PoolSpec], timeout: float = 60) -> None:
+        """Create several Pools and wait once for them all to be ready.
+
+        Every pool is submitted before waiting, such that the placement groups of
+        all the pools peer together rather than one pool after another.
+
+        Args:
+            specs: The pools to create
+            timeout: The amount of time for the pools to become active+clean.
+
+        Raises:
+            PoolCreationError: If the cluster refuses to create any of the pools.
+            TimeoutError: If the pools are not active+clean before the timeout.
+
+        Examples:
+            >>> pool.create_pools(
+            ...     [PoolSpec("cephfs_data", 0.9), PoolSpec("cephfs_metadata", 0.1)]
+            ... )
+        """
+        plan = CephPool.plan_pools(specs)
+        logger.debug(f"Placement group plan:\n{plan.describe()}")
+        failed = []
+        for spec in specs:
+            logger.info(f"Creating Pool {spec.name}")
+            pool_pgs = plan.pools[spec.name]
+            result = ceph.mon_command(
+                {
+                    "prefix": "osd pool create",
+                    "pool": spec.name,
+                    "pg_num": pool_pgs,
+                    "pgp_num": pool_pgs,
+                }
             )
+            if result.returncode != 0:
+                failed.append(f"{spec.name}: {result.error.strip()}")
+        ceph.invalidate_status()
+        if failed:
+            raise PoolCreationError(f"Failed to create pools: {', '.join(failed)}")
+        readiness.wait_for([readiness.pgs_active_clean(plan.total_pgs)], timeout)
+
+    @staticmethod
+    def plan_pools(specs: List[PoolSpec]) -> pg_planner.PGPlan:
+        """Plan the placement groups of the pools for the current cluster.
+
+        Args:
+            specs: The pools to plan
+
+        Returns:
+            The plan of placement groups for the pools.
+
+        Examples:
+            >>> pool.plan_pools([PoolSpec("distrax", 1.0)]).pools
+                {'distrax': 128}
+        """
+        return pg_planner.plan_pgs(
+            specs,
+            num_osds=ceph.osd_status()["num_osds"],
+            existing_pgs=ceph.get_current_pg(),
         )
-        subprocess.run(
-            ["ceph", "osd", "pool", "create", name, str(pool_pgs), str(pool_pgs)]
-        )
-        new_cluster_pg = current_cluster_pgs + pool_pgs
-        clean_pgs: Union[int, str] = -1
-        while new_cluster_pg != clean_pgs:
-            time.sleep(0.1)
-            status = ceph.pool_status()["pgs_by_state"]
-            for stat in status:
-                if stat["state_name"] == "active+clean":
-                    clean_pgs = stat["count"]
-                    break
 
     @staticmethod
-    def remove_pools() -> None:
-        """Remove and purge pools.
+    def remove_pools(purge: bool = False, workers: int = 8) -> List[PoolResult]:
+        """Remove the pools, all at the same time.
+
+        Deleting a pool removes its objects, so purging is only needed when the
+        cluster is kept, i.e. to reuse it. The purge scans the objects one at a
+        time, so it is skipped when the cluster is about to be removed.
+
+        Args:
+            purge: Whether to purge the objects of each pool before deleting it.
+            workers: The number of pools to remove at the same time.
+
+        Returns:
+            The outcome and duration of removing each pool.
 
         Examples:
-            >>> ceph.remove_pools()
+            >>> pool.remove_pools()
+                [PoolResult(name='.mgr', returncode=0, duration=0.4, error='')]
+
+            >>> pool.remove_pools(purge=True)
             Warning: using slow linear search
             Removed 2 objects
             successfully purged pool .mgr
-            pool '.mgr' removed
         """
-        pools = ceph.lspools()
-        for pool in pools:
+        pools = [pool["poolname"] for pool in ceph.lspools()]
+        workers = max(min(workers, len(pools)), 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(lambda name: CephPool._remove_pool(name, purge), pools)
+            )
+        ceph.invalidate_status()
+        return results
+
+    @staticmethod
+    def _remove_pool(name: str, purge: bool) -> PoolResult:
+        """Remove a pool.
+
+        Args:
+            name: The name of the pool.
+            purge: Whether to purge the objects of the pool before deleting it.
+
+        Returns:
+            The outcome of removing the pool.
+        """
+        start = time.monotonic()
+        if purge:
             subprocess.run(
                 [
                     "rados",
                     "purge",
-                    pool["poolname"],
-                    "--yes-i-really-really-mean-it",
-                    "--connect-timeout",
-                    "5",
-                ]
-            )
-            subprocess.run(
-                [
-                    "ceph",
-                    "osd",
-                    "pool",
-                    "delete",
-                    pool["poolname"],
-                    pool["poolname"],
+                    name,
                     "--yes-i-really-really-mean-it",
                     "--connect-timeout",
                     "5",
                 ]
             )
+        # Deleting is allowed by mon allow pool delete in the config file
+        result = ceph.mon_command(
+            {
+                "prefix": "osd pool delete",
+                "pool": name,
+                "pool2": name,
+                "yes_i_really_really_mean_it": True,
+            }
+        )
+        duration = time.monotonic() - start
+        if result.returncode != 0:
+            error = result.error.strip()
+            logger.error(f"Failed to remove pool {name}: {error}")
+            return PoolResult(name, result.returncode, duration, error)
+        logger.info(f"Removed pool {name} in {duration:.1f}s")
+        return PoolResult(name, 0, duration, "")
 
 
 _pool = POOL("ceph", CephPool)
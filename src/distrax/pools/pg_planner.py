@@ -0,0 +1,144 @@
+"""Placement group planner.
+
+Sizes the placement groups (PGs) of all the pools a service needs together, such
+that the pools share one PG budget for the cluster rather than each pool being
+sized as if it were alone.
+
+To read more about placement groups please see:
+https://docs.ceph.com/en/latest/rados/operations/placement-groups/
+"""
+
+from math import floor, log2
+from typing import Dict, List, NamedTuple
+
+from distrax.exceptions.exceptions import PoolCreationError
+from distrax.pools.abstract_pool import PoolSpec
+
+TARGET_PGS_PER_OSD = 100
+"""The number of PGs each OSD should hold, as recommended by pgcalc."""
+MON_MAX_PG_PER_OSD = 250
+"""The ceph default for mon_max_pg_per_osd, above which pools are refused."""
+
+
+class PGPlan(NamedTuple):
+    """Structure for the placement groups planned for a set of pools."""
+
+    pools: Dict[str, int]
+    num_osds: int
+    existing_pgs: int
+    replication: int
+
+    @property
+    def total_pgs(self) -> int:
+        """The number of PGs in the cluster once the pools are created."""
+        return self.existing_pgs + sum(self.pools.values())
+
+    @property
+    def pgs_per_osd(self) -> float:
+        """The number of PGs each OSD will hold once the pools are created."""
+        return self.total_pgs * self.replication / self.num_osds
+
+    def describe(self) -> str:
+        """Describe the plan in a human-readable form.
+
+        Returns:
+            A line per pool followed by the totals for the cluster.
+
+        Examples:
+            >>> print(plan.describe())
+            cephfs_data: 256 PGs
+            cephfs_metadata: 32 PGs
+            289 PGs across 3 OSDs, 96.3 per OSD
+        """
+        lines = [f"{name}: {pg_num} PGs" for name, pg_num in self.pools.items()]
+        lines.append(
+            f"{self.total_pgs} PGs across {self.num_osds} OSDs, "
+            f"{self.pgs_per_osd:.1f} per OSD"
+        )
+        return "\n".join(lines)
+
+
+def nearest_power_of_two(value: float) -> int:
+    """Round a number of PGs to a power of two following pgcalc.
+
+    The power of two below is used unless it is more than 25% below the value,
+    in which case the power of two above is used.
+
+    Args:
+        value: The ideal number of PGs
+
+    Returns:
+        The power of two to use, at least 1.
+
+    Examples:
+        >>> nearest_power_of_two(100)
+            128
+        >>> nearest_power_of_two(70)
+            64
+    """
+    if value <= 1:
+        return 1
+    lower = int(2 ** floor(log2(value)))
+    if lower < 0.75 * value:
+        return lower * 2
+    return lower
+
+
+def plan_pgs(
+    specs: List[PoolSpec],
+    num_osds: int,
+    existing_pgs: int = 0,
+    target_pgs_per_osd: int = TARGET_PGS_PER_OSD,
+    max_pgs_per_osd: int = MON_MAX_PG_PER_OSD,
+    replication: int = 1,
+) -> PGPlan:
+    """Plan the number of PGs of each pool within the budget of the cluster.
+
+    The budget for the new pools is the target PGs for the cluster less the PGs
+    that already exist, capped by the mon_max_pg_per_osd limit. It is shared
+    between the pools by percentage, each rounded to a power of two. If the
+    rounding overshoots the budget, the pool furthest above its share is halved
+    until the plan fits.
+
+    Args:
+        specs: The pools to plan
+        num_osds: The number of OSDs in the cluster
+        existing_pgs: The number of PGs already in the cluster
+        target_pgs_per_osd: The number of PGs each OSD should hold
+        max_pgs_per_osd: The number of PGs above which the cluster refuses pools
+        replication: The number of copies of each PG
+
+    Returns:
+        The plan of PGs for the pools.
+
+    Raises:
+        PoolCreationError: If the pools cannot fit within mon_max_pg_per_osd even
+            with a single PG each.
+
+    Examples:
+        >>> plan = plan_pgs(
+        ...     [PoolSpec("cephfs_data", 0.9), PoolSpec("cephfs_metadata", 0.1)], 3
+        ... )
+        >>> plan.pools
+            {'cephfs_data': 256, 'cephfs_metadata': 32}
+    """
+    num_osds = max(num_osds, 1)
+    limit = max_pgs_per_osd * num_osds // replication - existing_pgs
+    if limit < len(specs):
+        raise PoolCreationError(
+            f"{len(specs)} pools cannot be created as the cluster already has "
+            f"{existing_pgs} PGs across {num_osds} OSDs, which is the limit of "
+            f"{max_pgs_per_osd} PGs per OSD"
+        )
+    budget = min(target_pgs_per_osd * num_osds // replication - existing_pgs, limit)
+    budget = max(budget, len(specs))
+    total_percentage = sum(spec.percentage for spec in specs) or 1.0
+    share = {spec.name: budget * spec.percentage / total_percentage for spec in specs}
+    pools = {name: nearest_power_of_two(ideal) for name, ideal in share.items()}
+    while sum(pools.values()) > budget:
+        over = max(
+            (name for name in pools if pools[name] > 1),
+            key=lambda name: pools[name] / max(share[name], 1e-9),
+        )
+        pools[over] //= 2
+    return PGPlan(pools, num_osds, existing_pgs, replication)
@@ -1 +1,10 @@
-from . import ceph, fileio, network, system
+from . import (
+    ceph,
+    fileio,
+    network,
+    orchestrator,
+    readiness,
+    resources,
+    system,
+    transport,
+)
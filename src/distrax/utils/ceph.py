@@ -7,12 +7,18 @@ To read more about Ceph please see: https://docs.ceph.com/en/latest/
 
 import base64
 import configparser
+import errno
+import glob
 import json
+import os
 import secrets
+import socket
 import struct
-import subprocess
+import threading
 import time
-from typing import Dict, List, TypedDict, Union
+from typing import Any, Dict, List, TypedDict, Union
+
+from distrax.utils.transport import CommandResult, get_transport
 
 ETC_CEPH = "/etc/ceph"
 VAR_RUN = "/var/run/ceph/ceph-"
@@ -28,6 +34,10 @@ OSD_KEYRING = "ceph.client.bootstrap-osd.keyring"
 ADMIN_KEYRING = "ceph.client.admin.keyring"
 CONFIG_FILE = "ceph.conf"
 AUTH = "cephx"
+CLUSTER_FILES = (CONFIG_FILE, ADMIN_KEYRING, OSD_KEYRING)
+"""The files a host needs to add OSDs to the cluster."""
+ADMIN_SOCKET_TIMEOUT = 5.0
+"""The seconds to wait for a daemon to answer on its admin socket."""
 
 
 def generate_auth_key() -> str:
@@ -125,9 +135,236 @@ def create_osd_key(folder: str) -> None:
     )
 
 
-def osd_status() -> Dict[str, int]:
+def read_cluster_files(folder: str) -> Dict[str, str]:
+    """Read the files a host needs to add OSDs to the cluster.
+
+    Args:
+        folder: The folder the monitor created the files in.
+
+    Returns:
+        The contents of each of CLUSTER_FILES by name.
+
+    Examples:
+        >>> files = distrax.utils.ceph.read_cluster_files("distrax")
+        >>> sorted(files)
+            ['ceph.client.admin.keyring', 'ceph.client.bootstrap-osd.keyring',
+            'ceph.conf']
+    """
+    files = {}
+    for name in CLUSTER_FILES:
+        with open(f"{folder}/{name}") as file:
+            files[name] = file.read()
+    return files
+
+
+def write_cluster_files(folder: str, files: Dict[str, str]) -> None:
+    """Write the files read by read_cluster_files, readable by the user only.
+
+    Args:
+        folder: The folder to write the files to, i.e. a folder local to the host.
+        files: The contents of each of CLUSTER_FILES by name.
+
+    Raises:
+        ValueError: If a file is not one of CLUSTER_FILES.
+
+    Examples:
+        >>> distrax.utils.ceph.write_cluster_files("/tmp/distrax", files)
+    """
+    unknown = [name for name in files if name not in CLUSTER_FILES]
+    if unknown:
+        raise ValueError(f"Not cluster files: {unknown}")
+    os.makedirs(folder, mode=0o700, exist_ok=True)
+    for name, contents in files.items():
+        path = f"{folder}/{name}"
+        # Replace rather than write through an existing file or link
+        if os.path.lexists(path):
+            os.remove(path)
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, "w") as file:
+            file.write(contents)
+
+
+def mon_command(cmd: Dict[str, Any], timeout: str = "5") -> CommandResult:
+    """Send a command to the ceph monitor using the current transport.
+
+    Args:
+        cmd: The command in the monitor JSON form, it must contain a prefix.
+        timeout: The length of time to try and connect to the cluster.
+
+    Returns:
+        The returncode, output and error of the command.
+
+    Examples:
+        >>> import distrax.utils.ceph as ceph
+        >>> ceph.mon_command({"prefix": "mon enable-msgr2"})
+        CommandResult(returncode=0, output='', error='')
+    """
+    return get_transport().mon_command(cmd, int(timeout))
+
+
+def cluster_exists(timeout: str = "3") -> bool:
+    """Check if a ceph cluster can be reached.
+
+    Args:
+        timeout: The length of time to try and connect to the cluster.
+
+    Returns:
+        True if the cluster responds else False
+
+    Examples:
+        >>> import distrax.utils.ceph as ceph
+        >>> ceph.cluster_exists()
+            False
+    """
+    return mon_command({"prefix": "status"}, timeout).returncode == 0
+
+
+def auth_get_or_create(
+    entity: str, caps: List[str], keyring: str, timeout: str = "5"
+) -> bool:
+    """Get or create the key of an entity and write it to a keyring file.
+
+    Args:
+        entity: The name of the entity, i.e. mgr.hostname
+        caps: The capabilities as pairs of subsystem and permission,
+            i.e. ["mon", "allow profile mgr", "osd", "allow *"]
+        keyring: The path of the keyring file to write
+        timeout: The length of time to try and connect to the cluster.
+
+    Returns:
+        True if successful else False
+
+    Examples:
+        >>> import distrax.utils.ceph as ceph
+        >>> ceph.auth_get_or_create(
+        ...     "mgr.host", ["mon", "allow profile mgr"], "ceph/ceph.mgr.keyring"
+        ... )
+            True
+    """
+    result = mon_command(
+        {"prefix": "auth get-or-create", "entity": entity, "caps": caps}, timeout
+    )
+    if result.returncode != 0:
+        return False
+    with open(keyring, "w") as keyring_file:
+        keyring_file.write(result.output)
+    return True
+
+
+class ClusterStatus:
+    """A cached snapshot of the cluster status, i.e. `ceph --status`.
+
+    The status helpers within this module all read from one shared snapshot so a
+    burst of queries costs a single call to the cluster. The snapshot is refreshed
+    once it is older than the ttl, or on the next read after `invalidate` is called
+    by an operation that changes the cluster, i.e. creating or deleting a pool.
+
+    Examples:
+        >>> status = ClusterStatus(ttl=1.0)
+        >>> status.get()["pgmap"]["num_pgs"]
+            65
+        >>> status.invalidate()
+    """
+
+    def __init__(self, ttl: float = 1.0) -> None:
+        """Initialise the ClusterStatus object.
+
+        Args:
+            ttl: The number of seconds a snapshot can be reused before it is
+                refreshed.
+        """
+        self.ttl = ttl
+        self._snapshot: Dict[str, Any] = {}
+        self._taken: float = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, timeout: str = "5", refresh: bool = False) -> Dict[str, Any]:
+        """Get the status of the cluster.
+
+        Args:
+            timeout: The length of time to try and connect to the cluster.
+            refresh: Ignore the cached snapshot and query the cluster.
+
+        Returns:
+            The status of the cluster as a dictionary, this is empty when the
+            cluster could not be reached.
+        """
+        with self._lock:
+            if refresh or self.is_stale():
+                self._snapshot = self._fetch(timeout)
+                self._taken = time.monotonic()
+            return self._snapshot
+
+    def is_stale(self) -> bool:
+        """Check if the snapshot needs to be refreshed.
+
+        Returns:
+            True when there is no snapshot or it is older than the ttl.
+        """
+        return self._snapshot == {} or time.monotonic() - self._taken > self.ttl
+
+    def invalidate(self) -> None:
+        """Discard the snapshot so the next read queries the cluster."""
+        with self._lock:
+            self._snapshot = {}
+
+    @staticmethod
+    def _fetch(timeout: str) -> Dict[str, Any]:
+        """Query the cluster for its status.
+
+        Args:
+            timeout: The length of time to try and connect to the cluster.
+
+        Returns:
+            The status of the cluster, empty if the cluster could not be reached.
+        """
+        status = mon_command({"prefix": "status", "format": "json"}, timeout)
+        if status.returncode != 0 or status.output == "":
+            return {}
+        return dict(json.loads(status.output))
+
+
+_cluster_status = ClusterStatus()
+
+
+def cluster_status(timeout: str = "5", refresh: bool = False) -> Dict[str, Any]:
+    """Get the shared snapshot of the cluster status.
+
+    Args:
+        timeout: The length of time to try and connect to the cluster.
+        refresh: Ignore the cached snapshot and query the cluster.
+
+    Returns:
+        The output of `ceph --status` as a dictionary, empty if the cluster could
+        not be reached.
+
+    Examples:
+        >>> import distrax.utils.ceph as ceph
+        >>> ceph.cluster_status()["fsid"]
+            '8c2bd1e0-5b1a-4a34-bbf0-0a6e5d3f1c55'
+    """
+    return _cluster_status.get(timeout, refresh)
+
+
+def invalidate_status() -> None:
+    """Discard the shared status snapshot.
+
+    This should be called after any operation that changes the cluster.
+
+    Examples:
+        >>> import distrax.utils.ceph as ceph
+        >>> ceph.invalidate_status()
+    """
+    _cluster_status.invalidate()
+
+
+def osd_status(timeout: str = "5", refresh: bool = False) -> Dict[str, int]:
     """Get the status of the OSDs.
 
+    Args:
+        timeout: The length of time to try and connect to the cluster.
+        refresh: Ignore the cached snapshot and query the cluster.
+
     Returns:
         Where the `int` is a number
 
@@ -146,10 +383,12 @@ def osd_status() -> Dict[str, int]:
         'num_in_osds': 5, 'osd_in_since': 1, 'num_remapped_pgs': 0}
 
     """
-    status = subprocess.run(
-        ["ceph", "osd", "stat", "--format=json"], stdout=subprocess.PIPE
-    )
-    return dict(json.loads(status.stdout))
+    state = cluster_status(timeout, refresh)
+    if state == {}:
+        return {"epoch": -1, "num_osds": -1, "num_up_osds": -1, "num_in_osds": -1}
+    osdmap = state["osdmap"]
+    # Older releases nest the osdmap within itself
+    return dict(osdmap.get("osdmap", osdmap))
 
 
 def lspools(timeout: str = "5") -> List[Dict[str, str]]:
@@ -168,14 +407,10 @@ def lspools(timeout: str = "5") -> List[Dict[str, str]]:
         'poolnum': 2, 'poolname': 'test'}]
 
     """
-    pools = subprocess.run(
-        ["ceph", "osd", "lspools", "--format", "json", "--connect-timeout", timeout],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
+    pools = mon_command({"prefix": "osd lspools", "format": "json"}, timeout)
     if pools.returncode != 0:
         return []
-    return list(json.loads(pools.stdout))
+    return list(json.loads(pools.output))
 
 
 class PoolStatus(TypedDict):
@@ -191,13 +426,12 @@ class PoolStatus(TypedDict):
     bytes_total: int
 
 
-def pool_status(
-    timeout: str = "5",
-) -> PoolStatus:
+def pool_status(timeout: str = "5", refresh: bool = False) -> PoolStatus:
     """Get the status of the Pools.
 
     Args:
         timeout: The length of time to try and connect to the cluster.
+        refresh: Ignore the cached snapshot and query the cluster.
 
     `ceph -s` is used instead of `ceph pg stat` as `ceph pg stat` is faster to record
     the status, and such does not mirror `ceph -s`. Therefore, as `ceph -s` is the
@@ -229,13 +463,9 @@ def pool_status(
          'bytes_avail': 1056190464,
          'bytes_total': 1069547520}
     """
-    status = subprocess.run(
-        ["ceph", "--status", "--format", "json", "--connect-timeout", timeout],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
+    state = cluster_status(timeout, refresh)
     pgmap: PoolStatus
-    if status.stdout.decode("utf-8") == "":
+    if state == {}:
         pgmap = PoolStatus(
             pgs_by_state=[{"state_name": "error", "count": -1}],
             num_pgs=-1,
@@ -247,7 +477,6 @@ def pool_status(
             bytes_total=-1,
         )
     else:
-        state = dict(json.loads(status.stdout))
         pgmap = PoolStatus(
             pgs_by_state=state["pgmap"]["pgs_by_state"],
             num_pgs=state["pgmap"]["num_pgs"],
@@ -274,21 +503,21 @@ def get_current_pg() -> int:
 
     """
     current_cluster_pgs: int
-    if len(lspools()) == 0 or pool_status()["num_pgs"] == 0:
+    status = pool_status()
+    if status["num_pools"] <= 0 or status["num_pgs"] <= 0:
         # Account for the '.mgr' pool that will be created
         current_cluster_pgs = 1
     else:
-        current_cluster_pgs = pool_status()["num_pgs"]
+        current_cluster_pgs = status["num_pgs"]
     return current_cluster_pgs
 
 
-def rgw_status(
-    timeout: str = "5",
-) -> bool:
+def rgw_status(timeout: str = "5", refresh: bool = False) -> bool:
     """Get the status of the RGW.
 
     Args:
         timeout: The length of time to try and connect to the cluster.
+        refresh: Ignore the cached snapshot and query the cluster.
 
     Returns:
         True when it is up and running False otherwise
@@ -298,25 +527,21 @@ def rgw_status(
         >>> import distrax.utils.ceph as ceph
         >>> ceph.rgw_status()
     """
-    status = subprocess.run(
-        ["ceph", "--status", "--format", "json", "--connect-timeout", timeout],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
-    state = dict(json.loads(status.stdout))
+    state = cluster_status(timeout, refresh)
+    if state == {}:
+        return False
     servicemap = state["servicemap"]
     if "rgw" in servicemap["services"].keys():
         return True
     return False
 
 
-def mds_status(
-    timeout: str = "5",
-) -> bool:
+def mds_status(timeout: str = "5", refresh: bool = False) -> bool:
     """Get the status of the MDS.
 
     Args:
         timeout: The length of time to try and connect to the cluster.
+        refresh: Ignore the cached snapshot and query the cluster.
 
     Returns:
         True when it is up and running False otherwise
@@ -327,15 +552,168 @@ def mds_status(
         >>> ceph.mds_status()
             True
     """
-    status = subprocess.run(
-        ["ceph", "--status", "--format", "json", "--connect-timeout", timeout],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
-    state = dict(json.loads(status.stdout))
+    state = cluster_status(timeout, refresh)
+    if state == {}:
+        return False
     fsmap = state["fsmap"]
     if fsmap["up"] == 1 and fsmap["in"] == 1:
         for fs in fsmap["by_rank"]:
             if fs["status"] == "up:active":
                 return True
     return False
+
+
+def admin_socket(name: str) -> str:
+    """Find the admin socket of a local daemon.
+
+    Daemons create their socket as ceph-{name}.asok, clients such as the rados
+    gateway add their pid, i.e. ceph-client.radosgw.host.1234.5678.asok.
+
+    Args:
+        name: The name of the daemon, i.e. osd.0 or client.radosgw.host
+
+    Returns:
+        The path of the socket, empty if the daemon has no socket.
+
+    Raises:
+        PermissionError: If the folder of the sockets cannot be searched, as
+            /run/ceph is only open to the ceph user and group, such that whether
+            the daemon has a socket cannot be told.
+
+    Examples:
+        >>> import distrax.utils.ceph as ceph
+        >>> ceph.admin_socket("osd.0")
+            '/var/run/ceph/ceph-osd.0.asok'
+    """
+    folder = os.path.dirname(VAR_RUN)
+    if os.path.isdir(folder) and not os.access(folder, os.X_OK):
+        raise PermissionError(
+            errno.EACCES, f"Cannot search {folder} for the admin socket of {name}"
+        )
+    path = f"{VAR_RUN}{name}.asok"
+    if os.path.exists(path):
+        return path
+    sockets = sorted(glob.glob(f"{VAR_RUN}{name}.*.asok"), key=os.path.getmtime)
+    return sockets[-1] if sockets else ""
+
+
+def admin_command(
+    name: str, cmd: Dict[str, Any], timeout: float = ADMIN_SOCKET_TIMEOUT
+) -> CommandResult:
+    """Send a command to the admin socket of a local daemon.
+
+    This does not involve the monitors. The command is sent as JSON terminated by a
+    null byte and the reply is its length as a 32 bit big-endian integer followed
+    by the output, as with `ceph daemon`.
+
+    Args:
+        name: The name of the daemon, i.e. osd.0, or the path of its socket.
+        cmd: The command, i.e. {"prefix": "status"}
+        timeout: The seconds to wait for the daemon.
+
+    Returns:
+        The returncode, output and error of the command, the returncode is the
+        errno when the socket could not be used, i.e. ENOENT before the daemon has
+        created it or EACCES when not allowed to connect or to search for it.
+
+    Examples:
+        >>> import distrax.utils.ceph as ceph
+        >>> ceph.admin_command("osd.0", {"prefix": "status"})
+            CommandResult(returncode=0, output='{"state": "active", ...}', error='')
+    """
+    try:
+        path = name if name.startswith("/") else admin_socket(name)
+    except PermissionError as error:
+        return CommandResult(errno.EACCES, "", str(error))
+    if path == "":
+        return CommandResult(errno.ENOENT, "", f"No admin socket for {name}")
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.sendall(json.dumps(cmd).encode("utf-8") + b"\0")
+            header = _receive(sock, 4)
+            (length,) = struct.unpack(">I", header)
+            output = _receive(sock, length)
+    except OSError as error:
+        return CommandResult(error.errno or errno.EIO, "", str(error))
+    return CommandResult(0, output.decode("utf-8"), "")
+
+
+def _receive(sock: socket.socket, length: int) -> bytes:
+    """Receive exactly length bytes from a socket."""
+    data = b""
+    while len(data) < length:
+        chunk = sock.recv(length - len(data))
+        if not chunk:
+            raise ConnectionError(errno.ECONNRESET, "Admin socket closed early")
+        data += chunk
+    return data
+
+
+def _admin_json(name: str, prefix: str, timeout: float) -> Dict[str, Any]:
+    """Send a command to an admin socket and decode the JSON output."""
+    result = admin_command(name, {"prefix": prefix, "format": "json"}, timeout)
+    if result.returncode != 0:
+        return {}
+    try:
+        output = json.loads(result.output)
+    except ValueError:
+        return {}
+    return output if isinstance(output, dict) else {}
+
+
+def daemon_status(name: str, timeout: float = ADMIN_SOCKET_TIMEOUT) -> Dict[str, Any]:
+    """Get the status of a local daemon from its admin socket.
+
+    Args:
+        name: The name of the daemon, i.e. osd.0 or mds.host
+        timeout: The seconds to wait for the daemon.
+
+    Returns:
+        The status, i.e. {"state": "active", ...} for an OSD, empty on failure.
+
+    Examples:
+        >>> import distrax.utils.ceph as ceph
+        >>> ceph.daemon_status("osd.0")["state"]
+            'active'
+    """
+    return _admin_json(name, "status", timeout)
+
+
+def daemon_perf_dump(
+    name: str, timeout: float = ADMIN_SOCKET_TIMEOUT
+) -> Dict[str, Any]:
+    """Get the performance counters of a local daemon from its admin socket.
+
+    Args:
+        name: The name of the daemon, i.e. osd.0 or client.radosgw.host
+        timeout: The seconds to wait for the daemon.
+
+    Returns:
+        The counters by section, empty on failure.
+
+    Examples:
+        >>> import distrax.utils.ceph as ceph
+        >>> ceph.daemon_perf_dump("osd.0")["osd"]["op"]
+            1024
+    """
+    return _admin_json(name, "perf dump", timeout)
+
+
+def daemon_config(name: str, timeout: float = ADMIN_SOCKET_TIMEOUT) -> Dict[str, Any]:
+    """Get the running configuration of a local daemon from its admin socket.
+
+    Args:
+        name: The name of the daemon, i.e. osd.0
+        timeout: The seconds to wait for the daemon.
+
+    Returns:
+        The configuration by option name, empty on failure.
+
+    Examples:
+        >>> import distrax.utils.ceph as ceph
+        >>> ceph.daemon_config("osd.0")["osd_memory_target"]
+            '4294967296'
+    """
+    return _admin_json(name, "config show", timeout)
@@ -0,0 +1,310 @@
+"""Coordination of the hosts of a multi-host deployment.
+
+A deployment is a list of phases, each run either on the leader only, i.e. the
+monitor, or on every rank, i.e. the OSDs. After a run of phases every rank agrees
+whether any rank failed with one allreduce using a logical or, which MPI carries
+out as a tree in O(log P) steps rather than a message from every rank to the leader
+followed by a broadcast. After a run on the leader only the leader broadcasts
+whether it failed along with the values its phases returned, such that data, i.e.
+the cluster config and keyrings, reaches every rank without a shared filesystem or
+a further message. The collective is also the only synchronisation point, so no
+barriers are needed, and consecutive phases that run on the same ranks share one.
+If a phase fails the undo actions of the phases started on each rank are run in
+reverse, with the same synchronisation points.
+
+The communicator is any object with the mpi4py collectives used, such that the
+coordination can be tested without MPI.
+
+To read more about the MPI collectives please see:
+https://mpi4py.readthedocs.io/en/stable/tutorial.html#collective-communication
+"""
+
+import logging
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Protocol,
+    Tuple,
+    Type,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Communicator(Protocol):
+    """The collectives of an mpi4py communicator that are used."""
+
+    def Get_rank(self) -> int:
+        """Get the rank of this process."""
+        ...
+
+    def Get_size(self) -> int:
+        """Get the number of processes."""
+        ...
+
+    def allreduce(self, sendobj: Any, op: Any) -> Any:
+        """Combine a value from every rank with op, returning the result on all."""
+        ...
+
+    def allgather(self, sendobj: Any) -> List[Any]:
+        """Gather a value from every rank, returning them in rank order on all."""
+        ...
+
+    def bcast(self, obj: Any, root: int) -> Any:
+        """Send a value from the root rank, returning it on all."""
+        ...
+
+
+class Phase(NamedTuple):
+    """Structure for a phase of a deployment and how to undo it."""
+
+    name: str
+    action: Optional[Callable[[], Any]] = None
+    """Called with no arguments, on the leader a value returned that is not None is
+    sent to every rank in Coordinator.shared under the name of the phase."""
+    undo: Optional[Callable[[], Any]] = None
+    everywhere: bool = False
+    """Run on every rank, otherwise on the leader only."""
+    keep_on: Tuple[Type[BaseException], ...] = ()
+    """Errors raised by the action for which the undo should not be run, i.e. when
+    the monitor fails because a cluster already exists it must not be removed."""
+
+
+class Coordinator:
+    """Run the phases of a deployment across the ranks of a communicator.
+
+    Examples:
+        >>> from mpi4py import MPI
+        >>> coordinator = Coordinator(MPI.COMM_WORLD)
+        >>> coordinator.run(
+        ...     [
+        ...         Phase("monitor", mon.create_mon, mon.remove_mon),
+        ...         Phase("manager", mgr.create_mgr, mgr.remove_mgr),
+        ...         Phase("osds", create_osds, osd.remove_osds, everywhere=True),
+        ...     ]
+        ... )
+            True
+    """
+
+    def __init__(
+        self, comm: Communicator, lor: Any = None, minimum: Any = None
+    ) -> None:
+        """Initialise the Coordinator object.
+
+        Args:
+            comm: The communicator of the ranks, i.e. MPI.COMM_WORLD
+            lor: The logical or reduction, MPI.LOR if None.
+            minimum: The minimum reduction, MPI.MIN if None.
+        """
+        if lor is None or minimum is None:
+            from mpi4py import MPI
+
+            lor = MPI.LOR if lor is None else lor
+            minimum = MPI.MIN if minimum is None else minimum
+        self.comm = comm
+        self.lor = lor
+        self.min = minimum
+        self.rank = comm.Get_rank()
+        self.size = comm.Get_size()
+        self.reached: List[Phase] = []
+        """The phases of the runs reached, the same on every rank."""
+        self.started: List[Phase] = []
+        """The phases started on this rank, less those that failed due to keep_on."""
+        self.shared: Dict[str, Any] = {}
+        """The values returned by the phases run on the leader only."""
+
+    @property
+    def leader(self) -> bool:
+        """Whether this rank is the leader."""
+        return self.rank == 0
+
+    def any_failed(self, failed: bool) -> bool:
+        """Agree whether any rank failed.
+
+        Args:
+            failed: Whether this rank failed.
+
+        Returns:
+            True on every rank if any rank failed else False.
+        """
+        return bool(self.comm.allreduce(failed, op=self.lor))
+
+    def minimum(self, value: int) -> int:
+        """Agree on the smallest value of all the ranks.
+
+        Args:
+            value: The value of this rank.
+
+        Returns:
+            The smallest value, on every rank.
+        """
+        return int(self.comm.allreduce(value, op=self.min))
+
+    def hosts_are_different(self, host: str) -> bool:
+        """Check that every rank is on a different host.
+
+        Args:
+            host: The name of the host of this rank.
+
+        Returns:
+            True on every rank if no two ranks share a host else False.
+        """
+        hosts = self.comm.allgather(host)
+        shared = sorted({name for name in hosts if hosts.count(name) > 1})
+        if shared and self.leader:
+            logger.error(
+                "Not all hosts are different, please ensure each rank is on a "
+                f"separate host: {', '.join(shared)}"
+            )
+        return not shared
+
+    @staticmethod
+    def _groups(phases: List[Phase]) -> List[List[Phase]]:
+        """Split the phases into runs that are on the same ranks."""
+        groups: List[List[Phase]] = []
+        for phase in phases:
+            if groups and groups[-1][0].everywhere == phase.everywhere:
+                groups[-1].append(phase)
+            else:
+                groups.append([phase])
+        return groups
+
+    def _runs_here(self, phase: Phase) -> bool:
+        """Whether a phase runs on this rank."""
+        return phase.everywhere or self.leader
+
+    def _agree(self, group: List[Phase], failed: bool, shared: Dict[str, Any]) -> bool:
+        """Agree whether a run of phases failed, sharing the values of the leader.
+
+        Args:
+            group: The run of phases on the same ranks.
+            failed: Whether the run failed on this rank.
+            shared: The values returned on this rank.
+
+        Returns:
+            True on every rank if the run failed on any rank else False.
+        """
+        if group[0].everywhere:
+            return self.any_failed(failed)
+        # Only the leader ran the phases, so it alone knows the outcome
+        failed, shared = self.comm.bcast((failed, shared), root=0)
+        self.shared.update(shared)
+        return bool(failed)
+
+    def run(self, phases: List[Phase], rollback: bool = True) -> bool:
+        """Run the phases in order, undoing them on failure.
+
+        The phases of a run that are on the same ranks are run one after the other,
+        then the ranks agree whether any failed before the next run. The values
+        returned by the phases on the leader are in shared by the next run.
+
+        Args:
+            phases: The phases to run, the same on every rank.
+            rollback: Undo the phases started when one fails.
+
+        Returns:
+            True on every rank if every phase succeeded on every rank else False.
+        """
+        self.reached = []
+        self.started = []
+        self.shared = {}
+        for group in self._groups(phases):
+            shared: Dict[str, Any] = {}
+            self.reached += group
+            failed = self._run_group(group, shared)
+            if self._agree(group, failed, shared):
+                if self.leader:
+                    logger.error("Reversing creation due to error")
+                if rollback:
+                    self.rollback()
+                return False
+        return True
+
+    def _run_group(self, group: List[Phase], shared: Dict[str, Any]) -> bool:
+        """Run the phases of a run on this rank until one fails.
+
+        A phase is started once it is reached, even one with no action so that
+        its undo is run, and is no longer started if it fails due to keep_on.
+
+        Args:
+            group: The run of phases on the same ranks.
+            shared: Filled with the values returned by the phases.
+
+        Returns:
+            True if a phase failed on this rank else False.
+        """
+        for phase in group:
+            if not self._runs_here(phase):
+                continue
+            self.started.append(phase)
+            if phase.action is None:
+                continue
+            logger.info(f"Rank {self.rank}: Starting {phase.name}")
+            try:
+                result = phase.action()
+                if result is not None and not phase.everywhere:
+                    shared[phase.name] = result
+            except phase.keep_on as error:
+                logger.error(f"Rank {self.rank}: {phase.name} failed: {error}")
+                self.started.pop()
+                return True
+            except Exception as error:
+                logger.exception(f"Rank {self.rank}: {phase.name} failed: {error}")
+                return True
+        return False
+
+    def rollback(self, phases: Optional[List[Phase]] = None) -> bool:
+        """Run the undo actions of the phases in reverse order.
+
+        A failed undo does not stop the others from running. Runs of phases with
+        nothing to undo are skipped without synchronising.
+
+        Args:
+            phases: The phases to undo, i.e. to remove a deployment, if None the
+                phases started on this rank by run, synchronised as the runs reached.
+
+        Returns:
+            True on every rank if every undo succeeded on every rank else False.
+        """
+        if phases is None:
+            phases, started = self.reached, [phase.name for phase in self.started]
+        else:
+            started = [phase.name for phase in phases]
+        ok = True
+        for group in self._groups(list(reversed(phases))):
+            # The same on every rank, so no rank waits on a run with nothing to undo
+            if all(phase.undo is None for phase in group):
+                continue
+            failed = self._undo_group(group, started)
+            ok = not self._agree(group, failed, {}) and ok
+        return ok
+
+    def _undo_group(self, group: List[Phase], started: List[str]) -> bool:
+        """Run the undo actions of a run on this rank.
+
+        Args:
+            group: The run of phases on the same ranks, in reverse order.
+            started: The names of the phases to undo.
+
+        Returns:
+            True if an undo failed on this rank else False.
+        """
+        failed = False
+        for phase in group:
+            if phase.undo is None or not self._runs_here(phase):
+                continue
+            if phase.name not in started:
+                continue
+            logger.info(f"Rank {self.rank}: Removing {phase.name}")
+            try:
+                phase.undo()
+            except Exception as error:
+                logger.exception(
+                    f"Rank {self.rank}: Removing {phase.name} failed: {error}"
+                )
+                failed = True
+        return failed
@@ -1,7 +1,97 @@
+import contextlib
+import logging
 import os
 import shutil
 import subprocess
-from typing import List
+import threading
+from typing import Any, Iterator, List, Optional
+
+from distrax.utils import privileged
+
+logger = logging.getLogger(__name__)
+_batches = threading.local()
+
+
+def _run(operation: str, args: List[Any], command: Optional[str], admin: bool) -> bool:
+    """Run a file operation.
+
+    Operations are run in-process unless they need privileges this process does not
+    have, in which case they are sent to the privileged helper, or queued if a batch
+    is open. Without the helper they are run as a sudo command.
+
+    Args:
+        operation: The operation, see distrax.utils.privileged.apply
+        args: The arguments of the operation
+        command: The equivalent command, run with sudo without the helper, None if
+            the operation needs the helper
+        admin: To run under escalted privileges
+
+    Returns:
+        True if successful, or queued, else False
+    """
+    request = privileged.Request(operation, args)
+    if not admin or os.geteuid() == 0:
+        return privileged.apply(request).ok
+    helper = privileged.get_helper()
+    if helper is None and command is None:
+        logger.warning(f"{operation} needs the privileged helper")
+        return False
+    if helper is None:
+        process = subprocess.run(
+            ["sudo"] + str(command).split(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        if process.returncode != 0:
+            return False
+        return True
+    pending = getattr(_batches, "pending", None)
+    if pending is not None:
+        pending.append(request)
+        return True
+    response = helper.run([request])[0]
+    if not response.ok:
+        logger.debug(f"{operation} {args} failed: {response.error}")
+    return response.ok
+
+
+@contextlib.contextmanager
+def batch() -> Iterator[List[privileged.Response]]:
+    """Send the privileged operations within the block to the helper together.
+
+    The operations return True when queued and are run in order on leaving the
+    block, in one round trip to the privileged helper, so nothing within the block
+    may depend on them. Operations that do not go to the helper, i.e. when already
+    privileged or without the helper, are run straight away. Failures are logged,
+    not raised, as the return values of the operations are when run on their own.
+
+    Yields:
+        The outcome of each queued operation, filled on leaving the block.
+
+    Examples:
+        >>> with distrax.utils.fileio.batch():
+        ...     distrax.utils.fileio.create_dir(path, 755, admin=True)
+        ...     distrax.utils.fileio.copy_file(keyring, f"{path}/keyring", admin=True)
+    """
+    if getattr(_batches, "pending", None) is not None:
+        # Nested batches are sent with the outer one
+        yield []
+        return
+    pending: List[privileged.Request] = []
+    responses: List[privileged.Response] = []
+    _batches.pending = pending
+    try:
+        yield responses
+    finally:
+        _batches.pending = None
+        helper = privileged.get_helper()
+        if pending and helper is not None:
+            responses += helper.run(pending)
+            for request, response in zip(pending, responses):
+                if not response.ok:
+                    logger.warning(
+                        f"{request.operation} {request.args} failed: {response.error}"
+                    )
 
 
 def create_dir(path: str, mode: int, admin: bool = False) -> bool:
@@ -20,17 +110,7 @@ def create_dir(path: str, mode: int, admin: bool = False) -> bool:
     """
     if os.path.exists(path) is True:
         return False
-    command = ""
-    if admin:
-        command += "sudo "
-    command += f"mkdir -p -m {mode} {path}"
-    command_lst = command.split()
-    process = subprocess.run(
-        command_lst, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
-    if process.returncode != 0:
-        return False
-    return True
+    return _run("create_dir", [path, mode], f"mkdir -p -m {mode} {path}", admin)
 
 
 def remove_dir(path: str, admin: bool = False) -> bool:
@@ -48,17 +128,7 @@ def remove_dir(path: str, admin: bool = False) -> bool:
         >>> distrax.utils.fileio.remove_dir("non_existent_folder")
         False
     """
-    command = ""
-    if admin:
-        command += "sudo "
-    command += f"find {path} -mindepth 0 -delete"
-    command_lst = command.split()
-    process = subprocess.run(
-        command_lst, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
-    if process.returncode != 0:
-        return False
-    return True
+    return _run("remove", [path], f"find {path} -mindepth 0 -delete", admin)
 
 
 def copy_file(src: str, dest: str, admin: bool = False) -> bool:
@@ -80,17 +150,7 @@ def copy_file(src: str, dest: str, admin: bool = False) -> bool:
         >>> distrax.utils.fileio.copy_file("non_existent_file", "./new_file")
         False
     """
-    command = ""
-    if admin:
-        command += "sudo "
-    command += f"cp {src} {dest}"
-    command_lst = command.split()
-    process = subprocess.run(
-        command_lst, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
-    if process.returncode != 0:
-        return False
-    return True
+    return _run("copy_file", [src, dest], f"cp {src} {dest}", admin)
 
 
 def remove_file(path: str, admin: bool = False) -> bool:
@@ -109,18 +169,8 @@ def remove_file(path: str, admin: bool = False) -> bool:
         >>> distrax.utils.fileio.remove_file("non_existent_file")
         False
     """
-    command = ""
-    if admin:
-        command += "sudo "
     if os.path.exists(path):
-        command += f"find {path} -mindepth 0 -delete"
-        command_lst = command.split()
-        process = subprocess.run(
-            command_lst, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
-        if process.returncode != 0:
-            return False
-        return True
+        return _run("remove", [path], f"find {path} -mindepth 0 -delete", admin)
     else:
         return False
 
@@ -143,17 +193,12 @@ def change_ownership(path: str, user: str, group: str, admin: bool = False) -> b
         >>> distrax.utils.fileio.change_ownership("no_file",user="user",group="grp")
         False
     """
-    command = ""
-    if admin:
-        command += "sudo "
-    command += f"chown {user}:{group} {path}"
-    command_lst = command.split()
-    process = subprocess.run(
-        command_lst, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    return _run(
+        "change_ownership",
+        [path, user, group],
+        f"chown {user}:{group} {path}",
+        admin,
     )
-    if process.returncode != 0:
-        return False
-    return True
 
 
 def recursive_change_ownership(
@@ -176,17 +221,58 @@ def recursive_change_ownership(
         >>> distrax.utils.fileio.recursive_change_ownership("no_folder","usr", "grp")
         False
     """
-    command = ""
-    if admin:
-        command += "sudo "
-    command += f"chown -R {user}:{group} {path}"
-    command_lst = command.split()
-    process = subprocess.run(
-        command_lst, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    return _run(
+        "recursive_change_ownership",
+        [path, user, group],
+        f"chown -R {user}:{group} {path}",
+        admin,
     )
-    if process.returncode != 0:
-        return False
-    return True
+
+
+def bind_osd(osd_id: str, cpus: List[int], node: int, admin: bool = False) -> bool:
+    """Write the systemd drop-in binding an OSD to a NUMA node.
+
+    The drop-in is generated from the values by distrax.utils.privileged, as a
+    drop-in copied from a file could run anything as root, so there is no sudo
+    command for it without the privileged helper.
+
+    Args:
+        osd_id: The id of the OSD
+        cpus: The CPUs of the node
+        node: The id of the node
+        admin: To run under escalted privileges
+
+    Returns:
+        True if successful else False
+
+    Examples:
+        >>> distrax.utils.fileio.bind_osd("0", [0, 1, 2, 3], 0, admin=True)
+        True
+    """
+    return _run("bind_osd", [osd_id, cpus, node], None, admin)
+
+
+def write_setting(device: str, name: str, value: str, admin: bool = False) -> bool:
+    """Write a sysfs setting of a block device.
+
+    Only the settings and values in distrax.utils.privileged.SETTINGS of the devices
+    distrax creates can be written, so there is no sudo command for it without the
+    privileged helper.
+
+    Args:
+        device: The name of the device, i.e. ram0
+        name: The name of the setting, i.e. queue/scheduler
+        value: The value to write
+        admin: To run under escalted privileges
+
+    Returns:
+        True if successful else False
+
+    Examples:
+        >>> distrax.utils.fileio.write_setting("ram0", "queue/nomerges", "2")
+        True
+    """
+    return _run("write_setting", [device, name, value], None, admin)
 
 
 def change_permissions(path: str, mode: int) -> bool:
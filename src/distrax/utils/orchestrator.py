@@ -0,0 +1,186 @@
+"""Dependency graph orchestration of the cluster components.
+
+Each component of the cluster is a step that declares the steps it depends on and
+the action that undoes it. Steps whose dependencies are complete are run at the
+same time, i.e. the devices are created while the monitor and manager start. If a
+step fails no further steps are started and the undo actions of the steps that ran
+are run in reverse dependency order, again at the same time where possible.
+"""
+
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+
+class Step(NamedTuple):
+    """Structure for a component of the cluster and how to undo it."""
+
+    name: str
+    action: Callable[[], Any]
+    undo: Optional[Callable[[], Any]] = None
+    depends: Tuple[str, ...] = ()
+    keep_on: Tuple[Type[BaseException], ...] = ()
+    """Errors raised by the action for which the undo should not be run, i.e. when
+    the monitor fails because a cluster already exists it must not be removed."""
+
+
+class Orchestrator:
+    """Run steps concurrently in dependency order, undoing them on failure.
+
+    Examples:
+        >>> plan = Orchestrator(workers=4)
+        >>> plan.add("mon", mon.create_mon, mon.remove_mon)
+        >>> plan.add("devices", device.create_device, device.remove_device)
+        >>> plan.add("mgr", mgr.create_mgr, mgr.remove_mgr, depends=["mon"])
+        >>> plan.add("osds", create_osds, osd.remove_osds, depends=["mgr", "devices"])
+        >>> plan.run()
+            True
+    """
+
+    def __init__(self, workers: int = 4) -> None:
+        """Initialise the Orchestrator object.
+
+        Args:
+            workers: The number of steps that can run at the same time.
+        """
+        self.workers = workers
+        self.steps: Dict[str, Step] = {}
+        self.completed: List[str] = []
+        self.errors: Dict[str, BaseException] = {}
+
+    def add(
+        self,
+        name: str,
+        action: Callable[[], Any],
+        undo: Optional[Callable[[], Any]] = None,
+        depends: Optional[List[str]] = None,
+        keep_on: Tuple[Type[BaseException], ...] = (),
+    ) -> None:
+        """Add a step to the plan.
+
+        Dependencies must be added before the steps that depend on them, such
+        that the plan cannot contain a cycle.
+
+        Args:
+            name: The unique name of the step.
+            action: Called with no arguments to run the step.
+            undo: Called with no arguments to undo the step.
+            depends: The names of the steps that must complete first.
+            keep_on: Errors raised by the action for which undo should not be run.
+
+        Raises:
+            ValueError: If the name is taken or a dependency has not been added.
+        """
+        depends = depends or []
+        if name in self.steps:
+            raise ValueError(f"Step `{name}` has already been added")
+        missing = [dependency for dependency in depends if dependency not in self.steps]
+        if missing:
+            raise ValueError(f"Step `{name}` depends on unknown steps: {missing}")
+        self.steps[name] = Step(name, action, undo, tuple(depends), keep_on)
+
+    @staticmethod
+    def _ready(pending: Dict[str, Set[str]], finished: Set[str]) -> List[str]:
+        """Get the pending steps whose steps to wait on have all finished."""
+        return [name for name, wait_on in pending.items() if wait_on <= finished]
+
+    def _schedule(
+        self,
+        names: List[str],
+        waits_on: Dict[str, Set[str]],
+        run: Callable[[str], Any],
+        halt_on_error: bool,
+    ) -> Tuple[List[str], Dict[str, BaseException]]:
+        """Run the named steps as soon as the steps they wait on have finished.
+
+        Args:
+            names: The steps to run.
+            waits_on: The steps each step must wait for.
+            run: Called with the name of each step to run it.
+            halt_on_error: Whether to stop starting steps after an error.
+
+        Returns:
+            The steps that succeeded in the order they finished and the errors of
+            those that failed.
+        """
+        pending = {name: waits_on[name] & set(names) for name in names}
+        succeeded: List[str] = []
+        errors: Dict[str, BaseException] = {}
+        running: Dict["Future[Any]", str] = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while pending or running:
+                if not (errors and halt_on_error):
+                    for name in self._ready(pending, set(succeeded) | set(errors)):
+                        del pending[name]
+                        running[executor.submit(run, name)] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        succeeded.append(name)
+                    else:
+                        errors[name] = error
+        return succeeded, errors
+
+    def _run_action(self, name: str) -> Any:
+        """Run the action of a step."""
+        logger.info(f"Starting: {name}")
+        result = self.steps[name].action()
+        logger.info(f"Finished: {name}")
+        return result
+
+    def _run_undo(self, name: str) -> Any:
+        """Run the undo action of a step."""
+        undo = self.steps[name].undo
+        if undo is None:
+            return None
+        logger.info(f"Undoing: {name}")
+        return undo()
+
+    def rollback(self) -> None:
+        """Undo the steps that ran, dependents before their dependencies.
+
+        The failed steps are undone as well to remove anything they left behind,
+        unless they failed with an error the step keeps on. Errors while undoing
+        are logged and do not stop the rollback.
+        """
+        names = list(self.completed)
+        for name, error in self.errors.items():
+            if not isinstance(error, self.steps[name].keep_on):
+                names.append(name)
+        dependents = {
+            name: {other for other in names if name in self.steps[other].depends}
+            for name in names
+        }
+        _, errors = self._schedule(names, dependents, self._run_undo, False)
+        for name, error in errors.items():
+            logger.error(f"Failed to undo {name}: {error}")
+        self.completed = []
+
+    def run(self, rollback: bool = True) -> bool:
+        """Run all the steps of the plan.
+
+        Args:
+            rollback: Whether to undo the steps that ran if any step fails.
+
+        Returns:
+            True if every step succeeded else False.
+        """
+        names = list(self.steps)
+        depends = {name: set(self.steps[name].depends) for name in names}
+        self.completed, self.errors = self._schedule(
+            names, depends, self._run_action, True
+        )
+        for name, error in self.errors.items():
+            logger.error(f"Step {name} failed", exc_info=error)
+        if not self.errors:
+            return True
+        if rollback:
+            logger.error("Reversing creation due to error")
+            self.rollback()
+        return False
@@ -0,0 +1,757 @@
+"""Privileged file operations.
+
+The file operations of distrax.utils.fileio are run here with os and shutil rather
+than by forking sudo and a coreutils binary for each one. When already privileged
+the operations are run in-process. When not, they are sent over a pipe to one
+long-lived helper started once with sudo, which runs each operation in-process if
+it is allowed by RULES, the same paths sudeors/distrax-ceph allows the commands
+on. The paths are resolved before they are checked, and the operations never
+follow a symbolic link after, such that a link planted by a user cannot lead an
+operation outside of the paths allowed. The helper needs the line below in the
+sudoers file, with the path of the python interpreter distrax is installed into,
+which must be owned by root::
+
+    %distrax ALL=NOPASSWD: /usr/bin/python3 -I -m distrax.utils.privileged
+
+When the helper cannot be started distrax.utils.fileio falls back to a sudo
+command for each operation. distrax.devices.prefault writes a device with dd,
+started as `prefault DEVICE [NODE]`, the command is built here from the device and
+NUMA node once they are checked. A sudoers line that lists arguments only allows
+those, so prefault needs two more lines, the line above followed by
+`prefault ram*` and by `prefault loop*`, see sudeors/distrax-ceph.
+"""
+
+import atexit
+import grp
+import json
+import logging
+import os
+import pwd
+import re
+import shutil
+import stat
+import subprocess
+import sys
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+HELPER_COMMAND = ["sudo", "-n", sys.executable, "-I", "-m", "distrax.utils.privileged"]
+"""The command that starts the helper."""
+CALLER = "{caller}"
+"""Stands for the user that started the helper in the owner of a rule."""
+PATH_ARGS: Dict[str, Tuple[int, ...]] = {
+    "create_dir": (0,),
+    "copy_file": (1,),
+    "remove": (0,),
+    "change_ownership": (0,),
+    "recursive_change_ownership": (0,),
+}
+"""The arguments of each operation that are paths it changes."""
+DIR_FLAGS = os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW
+DROP_IN_DIR = "/etc/systemd/system/ceph-osd@{osd_id}.service.d"
+DROP_IN = "distrax-numa.conf"
+SYS_BLOCK = "/sys/block"
+ZRAM_HOT_REMOVE = "/sys/class/zram-control/hot_remove"
+BLOCK_DEVICE = "(ram|zram|loop)[0-9]+"
+"""The names of the block devices distrax creates, whose settings can be written."""
+SETTINGS: Dict[str, str] = {
+    "queue/scheduler": "none|mq-deadline|kyber|bfq",
+    "queue/nomerges": "[0-2]",
+    "queue/read_ahead_kb": "[0-9]+",
+    "queue/iostats": "[01]",
+    "queue/rq_affinity": "[0-2]",
+    "comp_algorithm": "[a-z0-9-]+",
+    "max_comp_streams": "[0-9]+",
+    "disksize": "[0-9]+[KMG]?",
+    "reset": "1",
+    "hot_remove": "[0-9]+",
+}
+"""The pattern of the values of each sysfs setting of a block device that can be
+written, hot_remove removes the zram device of the id written."""
+PREFAULT_DEVICE = "ram[0-9]+|loop[0-9]+"
+"""The names of the block devices that can be prefaulted."""
+LOOP_BACKING = "distrax-loop*.img"
+"""The pattern of the files of the loop devices distrax creates."""
+PREFAULT_BLOCK_SIZE = "4M"
+"""The size of each write of a prefault."""
+
+
+class Request(NamedTuple):
+    """Structure for a file operation, named after its function in fileio."""
+
+    operation: str
+    args: List[Any]
+
+
+class Response(NamedTuple):
+    """Structure for the outcome of a file operation."""
+
+    ok: bool
+    error: str
+
+
+class Rule(NamedTuple):
+    """Structure for a path an operation is allowed on.
+
+    The patterns are shell-style, as in sudoers, except * does not match /.
+    """
+
+    operation: str
+    path: str
+    """The pattern of the path, or of the destination of a copy."""
+    extra: str = ""
+    """The pattern of the base name of the source of a copy, or the owner of an
+    ownership change as user:group, where CALLER is the user that started the
+    helper."""
+
+
+RULES: List[Rule] = [
+    # Monitor
+    Rule("create_dir", "/var/lib/ceph/mon/ceph-*"),
+    Rule("copy_file", "/etc/ceph/ceph.conf", "ceph.conf"),
+    Rule("copy_file", "/var/lib/ceph/mon/ceph-*/keyring", "ceph.mon..keyring"),
+    Rule(
+        "copy_file", "/etc/ceph/ceph.client.admin.keyring", "ceph.client.admin.keyring"
+    ),
+    Rule("change_ownership", "/var/lib/ceph/mon/ceph-*", "ceph:ceph"),
+    Rule("recursive_change_ownership", "/var/lib/ceph/mon/ceph-*", "ceph:ceph"),
+    # MGR
+    Rule("create_dir", "/var/lib/ceph/mgr/ceph-*"),
+    Rule("copy_file", "/var/lib/ceph/mgr/ceph-*/keyring", "ceph.mgr.keyring"),
+    Rule("change_ownership", "/var/lib/ceph/mgr/ceph-*", "ceph:ceph"),
+    Rule("recursive_change_ownership", "/var/lib/ceph/mgr/ceph-*", "ceph:ceph"),
+    # MDS
+    Rule("create_dir", "/var/lib/ceph/mds/ceph-*"),
+    Rule("copy_file", "/var/lib/ceph/mds/ceph-*/keyring", "ceph.mds.keyring"),
+    Rule("change_ownership", "/var/lib/ceph/mds/ceph-*", "ceph:ceph"),
+    Rule("recursive_change_ownership", "/var/lib/ceph/mds/ceph-*", "ceph:ceph"),
+    # OSD
+    Rule("create_dir", "/var/lib/ceph/bootstrap-osd"),
+    Rule("create_dir", "/var/lib/ceph/osd"),
+    Rule("create_dir", "/var/lib/ceph/osd/ceph-*"),
+    Rule("copy_file", "/etc/ceph/ceph.keyring", "ceph.client.admin.keyring"),
+    Rule("copy_file", "/etc/ceph/ceph.keyring", "ceph.client.bootstrap-osd.keyring"),
+    Rule(
+        "copy_file",
+        "/var/lib/ceph/bootstrap-osd/ceph.keyring",
+        "ceph.client.bootstrap-osd.keyring",
+    ),
+    Rule("copy_file", "/var/lib/ceph/osd/ceph-*/keyring", "ceph.osd.*.keyring"),
+    Rule("recursive_change_ownership", "/var/lib/ceph/osd/ceph-*", "ceph:ceph"),
+    Rule("bind_osd", "/etc/systemd/system/ceph-osd@*.service.d/distrax-numa.conf"),
+    # Devices
+    Rule("write_setting", "/sys/block/*/queue/scheduler"),
+    Rule("write_setting", "/sys/block/*/queue/nomerges"),
+    Rule("write_setting", "/sys/block/*/queue/read_ahead_kb"),
+    Rule("write_setting", "/sys/block/*/queue/iostats"),
+    Rule("write_setting", "/sys/block/*/queue/rq_affinity"),
+    Rule("write_setting", "/sys/block/zram*/comp_algorithm"),
+    Rule("write_setting", "/sys/block/zram*/max_comp_streams"),
+    Rule("write_setting", "/sys/block/zram*/disksize"),
+    Rule("write_setting", "/sys/block/zram*/reset"),
+    Rule("write_setting", "/sys/class/zram-control/hot_remove"),
+    # RGW
+    Rule("create_dir", "/var/lib/ceph/radosgw/ceph-radosgw.*"),
+    Rule(
+        "copy_file",
+        "/var/lib/ceph/radosgw/ceph-radosgw.*/keyring",
+        "ceph.client.radosgw.keyring",
+    ),
+    Rule("change_ownership", "/var/lib/ceph/radosgw/ceph-radosgw.*", "ceph:ceph"),
+    Rule(
+        "recursive_change_ownership",
+        "/var/lib/ceph/radosgw/ceph-radosgw.*",
+        "ceph:ceph",
+    ),
+    # FS
+    Rule("create_dir", "/mnt/distrax"),
+    Rule("change_ownership", "/mnt/distrax", f"{CALLER}:*"),
+    Rule("recursive_change_ownership", "/mnt/distrax", f"{CALLER}:*"),
+    # Remove Ceph
+    Rule("remove", "/mnt/distrax"),
+    Rule("remove", "/etc/systemd/system/multi-user.target.wants/ceph-volume@lvm-*"),
+    Rule("remove", "/etc/systemd/system/ceph-osd@*.service.d/distrax-numa.conf"),
+    Rule("remove", "/var/lib/ceph/bootstrap-mgr"),
+    Rule("remove", "/var/lib/ceph/bootstrap-osd"),
+    Rule("remove", "/var/lib/ceph/bootstrap-rbd"),
+    Rule("remove", "/var/lib/ceph/bootstrap-rgw"),
+    Rule("remove", "/var/lib/ceph/bootstrap-mds"),
+    Rule("remove", "/var/lib/ceph/mgr/ceph-*"),
+    Rule("remove", "/var/lib/ceph/mon/ceph-*"),
+    Rule("remove", "/var/lib/ceph/mds/ceph-*"),
+    Rule("remove", "/var/lib/ceph/radosgw/ceph-radosgw.*"),
+    Rule("remove", "/var/lib/ceph/osd"),
+    Rule("remove", "/var/lib/ceph/tmp"),
+    Rule("remove", "/var/lib/ceph/crash"),
+    Rule("remove", "/var/log/ceph"),
+    Rule("remove", "/etc/ceph"),
+    Rule("remove", "/var/run/ceph/ceph-*.asok"),
+    Rule("remove", "/run/ceph/ceph-*.asok"),
+]
+"""The paths the helper runs each operation on, matching sudeors/distrax-ceph."""
+
+
+def _glob(value: str, pattern: str) -> bool:
+    """Check a value matches a shell-style pattern, where * does not match /."""
+    regex = "[^/]*".join(re.escape(part) for part in pattern.split("*"))
+    return re.fullmatch(regex, value) is not None
+
+
+def _match(path: str, pattern: str) -> bool:
+    """Check an absolute, normalised path matches a pattern."""
+    if not os.path.isabs(path) or os.path.normpath(path) != path:
+        return False
+    return _glob(path, pattern)
+
+
+def caller() -> str:
+    """Get the name of the user that started the helper with sudo, else of this one.
+
+    Returns:
+        The name of the user.
+
+    Raises:
+        KeyError: If the user is unknown.
+    """
+    return pwd.getpwuid(int(os.environ.get("SUDO_UID", os.getuid()))).pw_name
+
+
+def numa_drop_in(cpus: List[int], node: int) -> str:
+    """Create the systemd drop-in binding a unit to a NUMA node.
+
+    Args:
+        cpus: The CPUs of the node.
+        node: The id of the node.
+
+    Returns:
+        The contents of the drop-in.
+
+    Raises:
+        ValueError: If there are no CPUs, or a CPU or the node is not an id.
+
+    Examples:
+        >>> print(numa_drop_in([8, 9, 10, 11], 1))
+            [Service]
+            CPUAffinity=8 9 10 11
+            NUMAPolicy=bind
+            NUMAMask=1
+    """
+    if (
+        not isinstance(cpus, list)
+        or not cpus
+        or not all(
+            isinstance(value, int) and not isinstance(value, bool) and value >= 0
+            for value in cpus + [node]
+        )
+    ):
+        raise ValueError(f"Invalid NUMA node {node} with CPUs {cpus}")
+    cpu_list = " ".join(str(cpu) for cpu in cpus)
+    return f"[Service]\nCPUAffinity={cpu_list}\nNUMAPolicy=bind\nNUMAMask={node}\n"
+
+
+def setting_path(device: str, name: str) -> str:
+    """Get the sysfs file of a setting of a block device.
+
+    Args:
+        device: The name of the device, i.e. ram0
+        name: The name of the setting, one of SETTINGS.
+
+    Returns:
+        The path of the setting.
+
+    Examples:
+        >>> setting_path("ram0", "queue/scheduler")
+            '/sys/block/ram0/queue/scheduler'
+    """
+    if name == "hot_remove":
+        return ZRAM_HOT_REMOVE
+    return f"{SYS_BLOCK}/{device}/{name}"
+
+
+def prefault_command(device: str, node: Optional[str] = None) -> List[str]:
+    """Build the command that writes the whole of a device once, from checked values.
+
+    The number of bytes is read from sysfs rather than given, and a loop device must
+    be over a file distrax creates.
+
+    Args:
+        device: The name of the device, i.e. ram0
+        node: The id of the NUMA node to write from, None to leave it to the kernel.
+
+    Returns:
+        The dd command, run through numactl when there is a node.
+
+    Raises:
+        ValueError: If the device cannot be prefaulted or the node is not an id.
+        OSError: If the device does not exist.
+
+    Examples:
+        >>> prefault_command("ram0", "1")
+            ['numactl', '--cpunodebind=1', '--membind=1', 'dd', 'if=/dev/zero',
+            'of=/dev/ram0', 'bs=4M', 'oflag=direct', 'iflag=count_bytes',
+            'count=4294967296']
+    """
+    if not re.fullmatch(PREFAULT_DEVICE, device):
+        raise ValueError(f"Cannot prefault {device}")
+    if device.startswith("loop"):
+        with open(f"{SYS_BLOCK}/{device}/loop/backing_file") as file:
+            backing = file.read().strip()
+        if not _glob(os.path.basename(backing), LOOP_BACKING):
+            raise ValueError(f"Cannot prefault {device} over {backing}")
+    with open(f"{SYS_BLOCK}/{device}/size") as file:
+        # The size is reported in 512 byte sectors whatever the block size
+        size = int(file.read()) * 512
+    command = []
+    if node is not None:
+        if not re.fullmatch("[0-9]+", node):
+            raise ValueError(f"Invalid NUMA node {node}")
+        command += ["numactl", f"--cpunodebind={node}", f"--membind={node}"]
+    return command + [
+        "dd",
+        "if=/dev/zero",
+        f"of=/dev/{device}",
+        f"bs={PREFAULT_BLOCK_SIZE}",
+        "oflag=direct",
+        "iflag=count_bytes",
+        f"count={size}",
+    ]
+
+
+def resolve(request: Request) -> Request:
+    """Resolve the symbolic links of the paths of a request.
+
+    The paths an operation changes are resolved but for their last component, which
+    the operations never follow, so that a link is removed rather than its target.
+    The source of a copy is resolved entirely, so its base name is that of the file
+    read.
+
+    Args:
+        request: The file operation to resolve.
+
+    Returns:
+        The file operation with absolute paths without symbolic links.
+
+    Examples:
+        >>> resolve(Request("remove", ["/var/run/ceph/ceph-mon.host.asok"]))
+            Request(operation='remove', args=['/run/ceph/ceph-mon.host.asok'])
+    """
+    args = list(request.args)
+    for index in PATH_ARGS.get(request.operation, ()):
+        if index < len(args):
+            parent, name = os.path.split(os.path.abspath(str(args[index])))
+            args[index] = os.path.join(os.path.realpath(parent), name)
+    if request.operation == "copy_file" and args:
+        args[0] = os.path.realpath(str(args[0]))
+    return Request(request.operation, args)
+
+
+def _target(operation: str, args: List[str]) -> Tuple[str, str]:
+    """Get the path an operation changes and the extra argument the rules match.
+
+    Raises:
+        IndexError: If an argument is missing.
+        KeyError: If a setting is not one of SETTINGS.
+    """
+    if operation == "copy_file":
+        return args[1], os.path.basename(args[0])
+    if operation.endswith("change_ownership"):
+        return args[0], f"{args[1]}:{args[2]}"
+    if operation == "bind_osd":
+        return f"{DROP_IN_DIR.format(osd_id=args[0])}/{DROP_IN}", ""
+    if operation == "write_setting":
+        return setting_path(args[0], args[1]), ""
+    return args[0], ""
+
+
+def allowed(request: Request, rules: Optional[List[Rule]] = None) -> bool:
+    """Check a request is allowed by the rules.
+
+    Paths must be absolute and normalised, i.e. without `..`, to match, and should
+    be resolved first for the rules to hold.
+
+    Args:
+        request: The file operation to check.
+        rules: The rules to check against, RULES if None.
+
+    Returns:
+        True if allowed else False.
+
+    Examples:
+        >>> allowed(Request("create_dir", ["/var/lib/ceph/mon/ceph-host", 755]))
+            True
+        >>> allowed(Request("remove", ["/etc/passwd"]))
+            False
+    """
+    try:
+        path, extra = _target(request.operation, [str(arg) for arg in request.args])
+        user = caller()
+    except (IndexError, KeyError):
+        return False
+    return any(
+        rule.operation == request.operation
+        and _match(path, rule.path)
+        and _glob(extra, rule.extra.replace(CALLER, user))
+        for rule in (RULES if rules is None else rules)
+    )
+
+
+def _open_parent(path: str) -> Tuple[int, str]:
+    """Open the directory of an absolute path without following symbolic links.
+
+    Args:
+        path: The path, resolved.
+
+    Returns:
+        The descriptor of the directory, to be closed, and the base name.
+
+    Raises:
+        OSError: If a component of the directory is not a directory, or a link.
+    """
+    parent, name = os.path.split(path)
+    fd = os.open("/", DIR_FLAGS)
+    try:
+        for part in parent.split("/"):
+            if part:
+                child = os.open(part, DIR_FLAGS, dir_fd=fd)
+                os.close(fd)
+                fd = child
+    except OSError:
+        os.close(fd)
+        raise
+    return fd, name
+
+
+def _create_dir(path: str, mode: int) -> None:
+    """Create a directory and its parents without following symbolic links.
+
+    As mkdir -p -m only the directory created is given the mode, regardless of the
+    umask, an existing directory is left as it is.
+    """
+    parts = [part for part in path.split("/") if part]
+    fd = os.open("/", DIR_FLAGS)
+    try:
+        for index, part in enumerate(parts):
+            last = index == len(parts) - 1
+            created = False
+            try:
+                os.mkdir(part, 0o700 if last else 0o777, dir_fd=fd)
+                created = last
+            except FileExistsError:
+                pass
+            child = os.open(part, DIR_FLAGS, dir_fd=fd)
+            os.close(fd)
+            fd = child
+            if created:
+                os.fchmod(fd, mode)
+    finally:
+        os.close(fd)
+
+
+def _no_follow(path: str, flags: int) -> int:
+    """Open a file that is not a symbolic link."""
+    return os.open(path, flags | os.O_NOFOLLOW)
+
+
+def _copy_file(source: str, destination: str) -> None:
+    """Copy a file and its mode, as cp into a directory, but through neither link."""
+    parent, name = _open_parent(destination)
+    try:
+        try:
+            child = os.open(name, DIR_FLAGS, dir_fd=parent)
+        except OSError:
+            pass
+        else:
+            os.close(parent)
+            parent, name = child, os.path.basename(source)
+        with open(source, "rb", opener=_no_follow) as reader:
+            mode = stat.S_IMODE(os.fstat(reader.fileno()).st_mode)
+            fd = os.open(
+                name,
+                os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_NOFOLLOW,
+                mode,
+                dir_fd=parent,
+            )
+            with open(fd, "wb") as writer:
+                shutil.copyfileobj(reader, writer)
+                os.fchmod(fd, mode)
+    finally:
+        os.close(parent)
+
+
+def _write_file(path: str, content: str, mode: int) -> None:
+    """Write a file, replacing the contents of an existing file but not a link."""
+    parent, name = _open_parent(path)
+    try:
+        fd = os.open(
+            name,
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_NOFOLLOW,
+            mode,
+            dir_fd=parent,
+        )
+        with open(fd, "w") as writer:
+            writer.write(content)
+            os.fchmod(fd, mode)
+    finally:
+        os.close(parent)
+
+
+def _bind_osd(osd_id: str, cpus: List[int], node: int) -> None:
+    """Write the drop-in binding an OSD to a NUMA node, generated from the values.
+
+    The drop-in is never copied from a file, as its contents run as root.
+    """
+    if not re.fullmatch("[0-9]+", str(osd_id)):
+        raise ValueError(f"Invalid OSD id {osd_id}")
+    content = numa_drop_in(cpus, node)
+    directory = DROP_IN_DIR.format(osd_id=osd_id)
+    _create_dir(directory, 0o755)
+    _write_file(f"{directory}/{DROP_IN}", content, 0o644)
+
+
+def _write_setting(device: str, name: str, value: str) -> None:
+    """Write a setting of a block device distrax creates, once the value is checked.
+
+    The setting is written as the single value, as sysfs expects, while the device
+    and the value must match patterns that cannot name another file or value.
+    """
+    pattern = SETTINGS.get(name)
+    if (
+        pattern is None
+        or not re.fullmatch(BLOCK_DEVICE, device)
+        or not re.fullmatch(pattern, value)
+        or (name == "hot_remove" and device != f"zram{value}")
+    ):
+        raise ValueError(f"Invalid setting {name}={value} of {device}")
+    with open(setting_path(device, name), "w") as file:
+        file.write(value)
+
+
+def _remove(path: str) -> None:
+    """Remove a file, link or directory and its contents."""
+    parent, name = _open_parent(path)
+    try:
+        try:
+            mode = os.stat(name, dir_fd=parent, follow_symlinks=False).st_mode
+        except FileNotFoundError:
+            raise FileNotFoundError(f"{path} does not exist") from None
+        if stat.S_ISDIR(mode):
+            # rmtree does not follow links within, nor a link in place of the path
+            shutil.rmtree(path)
+        else:
+            os.remove(name, dir_fd=parent)
+    finally:
+        os.close(parent)
+
+
+def _chown(path: str, user: str, group: str, recursive: bool = False) -> None:
+    """Change the ownership of a path, and its contents, without following links."""
+    uid, gid = pwd.getpwnam(user).pw_uid, grp.getgrnam(group).gr_gid
+    parent, name = _open_parent(path)
+    try:
+        os.chown(name, uid, gid, dir_fd=parent, follow_symlinks=False)
+        mode = os.stat(name, dir_fd=parent, follow_symlinks=False).st_mode
+        if recursive and stat.S_ISDIR(mode):
+            for _, dir_names, file_names, dir_fd in os.fwalk(name, dir_fd=parent):
+                for entry in dir_names + file_names:
+                    os.chown(entry, uid, gid, dir_fd=dir_fd, follow_symlinks=False)
+    finally:
+        os.close(parent)
+
+
+OPERATIONS: Dict[str, Callable[[List[Any]], None]] = {
+    "ping": lambda args: None,
+    "create_dir": lambda args: _create_dir(args[0], int(str(args[1]), 8)),
+    "copy_file": lambda args: _copy_file(args[0], args[1]),
+    "remove": lambda args: _remove(args[0]),
+    "change_ownership": lambda args: _chown(args[0], args[1], args[2]),
+    "recursive_change_ownership": lambda args: _chown(
+        args[0], args[1], args[2], recursive=True
+    ),
+    "bind_osd": lambda args: _bind_osd(args[0], args[1], args[2]),
+    "write_setting": lambda args: _write_setting(
+        str(args[0]), str(args[1]), str(args[2])
+    ),
+}
+"""The file operations by name, called with the arguments of a request."""
+
+
+def apply(request: Request) -> Response:
+    """Run a file operation in-process with the privileges of this process.
+
+    The paths are resolved first, see resolve. The operations are:
+
+    - create_dir: path, mode as the digits of the octal mode, i.e. 755
+    - copy_file: source, destination
+    - remove: path, a file or a directory and its contents
+    - change_ownership: path, user, group
+    - recursive_change_ownership: path, user, group
+    - bind_osd: OSD id, CPUs and id of the NUMA node, see numa_drop_in
+    - write_setting: device, setting and value, see SETTINGS
+
+    Args:
+        request: The file operation to run.
+
+    Returns:
+        The outcome of the operation.
+
+    Examples:
+        >>> apply(Request("create_dir", ["/tmp/folder", 755]))
+            Response(ok=True, error='')
+    """
+    return _apply(resolve(request))
+
+
+def _apply(request: Request) -> Response:
+    """Run a file operation whose paths are resolved, see apply."""
+    operation = OPERATIONS.get(request.operation)
+    if operation is None:
+        return Response(False, f"Unknown operation {request.operation}")
+    try:
+        operation(request.args)
+    except (OSError, KeyError, ValueError, IndexError, TypeError) as error:
+        return Response(False, str(error))
+    return Response(True, "")
+
+
+def serve(reader: TextIO, writer: TextIO, rules: Optional[List[Rule]] = None) -> None:
+    """Run the requests read, one JSON object per line, until the end of input.
+
+    Each request is answered with a JSON response on its own line, in order. The
+    paths of a request are resolved once, then checked and used as resolved.
+
+    Args:
+        reader: Where the requests are read from.
+        writer: Where the responses are written to.
+        rules: The rules the requests must be allowed by, RULES if None.
+    """
+    for line in reader:
+        try:
+            request = resolve(Request(**json.loads(line)))
+        except (ValueError, TypeError) as error:
+            response = Response(False, f"Invalid request: {error}")
+        else:
+            if request.operation == "ping" or allowed(request, rules):
+                response = _apply(request)
+            else:
+                response = Response(False, f"Not allowed: {request}")
+        writer.write(json.dumps(response._asdict()) + "\n")
+        writer.flush()
+
+
+class Helper:
+    """A long-lived process that runs file operations.
+
+    Requests are sent together over a pipe and answered in order, such that a batch
+    of operations costs one round trip rather than a fork and exec of sudo each.
+    """
+
+    def __init__(self, command: Optional[List[str]] = None):
+        """Start the helper.
+
+        Args:
+            command: The command that starts the helper, HELPER_COMMAND if None.
+
+        Raises:
+            OSError: If the helper did not start, i.e. sudo wants a password.
+        """
+        self.lock = threading.Lock()
+        self.process = subprocess.Popen(
+            command or HELPER_COMMAND,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        if not self.run([Request("ping", [])])[0].ok:
+            self.close()
+            raise OSError("The privileged helper did not start")
+
+    def run(self, requests: List[Request]) -> List[Response]:
+        """Run the requests in order.
+
+        Args:
+            requests: The file operations to run.
+
+        Returns:
+            The outcome of each operation.
+
+        Examples:
+            >>> helper.run([Request("remove", ["/var/lib/ceph/osd"])])
+                [Response(ok=True, error='')]
+        """
+        with self.lock:
+            stdin, stdout = self.process.stdin, self.process.stdout
+            assert stdin is not None and stdout is not None
+            try:
+                stdin.write(
+                    "".join(
+                        json.dumps(request._asdict()) + "\n" for request in requests
+                    )
+                )
+                stdin.flush()
+                lines = [stdout.readline() for _ in requests]
+            except OSError as error:
+                return [Response(False, str(error)) for _ in requests]
+        return [
+            Response(**json.loads(line)) if line else Response(False, "Helper exited")
+            for line in lines
+        ]
+
+    def close(self) -> None:
+        """Stop the helper."""
+        if self.process.stdin is not None:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+        self.process.wait()
+
+
+_helper: Optional[Helper] = None
+_started = False
+_start_lock = threading.Lock()
+
+
+def get_helper() -> Optional[Helper]:
+    """Get the helper, starting it the first time.
+
+    Returns:
+        The helper, None if it could not be started.
+    """
+    global _helper, _started
+    with _start_lock:
+        if not _started:
+            _started = True
+            try:
+                _helper = Helper()
+                atexit.register(_helper.close)
+            except OSError as error:
+                logger.debug(f"Falling back to sudo for file operations: {error}")
+        return _helper
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Serve requests from stdin, or prefault a device, refusing unless privileged.
+
+    Args:
+        argv: The arguments, `prefault DEVICE [NODE]` to prefault a device, see
+            prefault_command, else none to serve requests. sys.argv if None.
+    """
+    if os.geteuid() != 0:
+        sys.exit("distrax.utils.privileged must be run as root")
+    args = sys.argv[1:] if argv is None else argv
+    if not args:
+        serve(sys.stdin, sys.stdout)
+        return
+    if args[0] != "prefault" or len(args) not in (2, 3):
+        sys.exit("Usage: python3 -m distrax.utils.privileged [prefault DEVICE [NODE]]")
+    try:
+        command = prefault_command(*args[1:])
+    except (OSError, ValueError) as error:
+        sys.exit(str(error))
+    sys.exit(subprocess.run(command).returncode)
+
+
+if __name__ == "__main__":
+    main()
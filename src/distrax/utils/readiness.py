@@ -0,0 +1,309 @@
+"""Readiness waits for the cluster.
+
+Rather than polling the cluster status on a fixed interval, the readiness engine
+subscribes once to the cluster log and re-evaluates the outstanding predicates each
+time an event arrives, falling back to an occasional re-check for state changes
+that are not logged. The log is watched at debug level, which carries the pgmap
+and service changes, so the re-check is seconds apart. All predicates share a
+single deadline.
+
+The daemons on the local host can instead be checked through their admin sockets,
+in parallel and without going through the monitors.
+"""
+
+import errno
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import TracebackType
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Type
+
+import distrax.utils.ceph as ceph
+from distrax.utils.transport import get_transport
+
+logger = logging.getLogger(__name__)
+BACKSTOP = 2.0
+"""The longest seconds between checks when the cluster log is quiet, the changes
+waited for wake the waiter through the log well before."""
+MDS_READY_STATES = ["up:standby", "up:standby-replay", "up:active"]
+"""The states of an MDS that has joined the cluster."""
+
+
+class Predicate(NamedTuple):
+    """Structure for a named check on the cluster status."""
+
+    name: str
+    check: Callable[[Dict[str, Any]], bool]
+
+
+def pgs_active_clean(count: int) -> Predicate:
+    """Predicate for the number of active+clean placement groups.
+
+    Args:
+        count: The number of placement groups expected to be active+clean.
+
+    Returns:
+        A predicate that is True when at least count PGs are active+clean.
+    """
+
+    def check(status: Dict[str, Any]) -> bool:
+        for state in status["pgmap"]["pgs_by_state"]:
+            if state["state_name"] == "active+clean":
+                return bool(state["count"] >= count)
+        return False
+
+    return Predicate(f"{count} PGs active+clean", check)
+
+
+def rgw_in_servicemap() -> Predicate:
+    """Predicate for the rados gateway joining the cluster.
+
+    Returns:
+        A predicate that is True when rgw is in the servicemap.
+    """
+
+    def check(status: Dict[str, Any]) -> bool:
+        return "rgw" in status["servicemap"]["services"].keys()
+
+    return Predicate("rgw in servicemap", check)
+
+
+def fs_rank_active(rank: int = 0) -> Predicate:
+    """Predicate for a filesystem rank becoming active.
+
+    Args:
+        rank: The MDS rank to check.
+
+    Returns:
+        A predicate that is True when the rank is up:active.
+    """
+
+    def check(status: Dict[str, Any]) -> bool:
+        for fs in status["fsmap"]["by_rank"]:
+            if fs.get("rank", 0) == rank and fs["status"] == "up:active":
+                return True
+        return False
+
+    return Predicate(f"fs rank {rank} up:active", check)
+
+
+def osds_up_and_in(count: int) -> Predicate:
+    """Predicate for the number of OSDs that are up and in.
+
+    Args:
+        count: The number of OSDs expected to be up and in.
+
+    Returns:
+        A predicate that is True when exactly count OSDs are up and in.
+    """
+
+    def check(status: Dict[str, Any]) -> bool:
+        osdmap = status["osdmap"]
+        # Older releases nest the osdmap within itself
+        osdmap = osdmap.get("osdmap", osdmap)
+        return bool(osdmap["num_up_osds"] == count and osdmap["num_in_osds"] == count)
+
+    return Predicate(f"{count} OSDs up and in", check)
+
+
+class ReadinessEngine:
+    """Wait for predicates on the cluster status to become true.
+
+    The engine can be used as a context manager such that several waits share
+    one subscription to the cluster log.
+
+    Examples:
+        >>> engine = ReadinessEngine(timeout=60)
+        >>> engine.wait_for([pgs_active_clean(33), rgw_in_servicemap()])
+
+        >>> with ReadinessEngine(timeout=60) as engine:
+        ...     engine.wait_for([osds_up_and_in(4)])
+        ...     engine.wait_for([pgs_active_clean(129)])
+    """
+
+    def __init__(
+        self,
+        timeout: float = 60,
+        backstop: float = BACKSTOP,
+        ceph_timeout: str = "5",
+    ) -> None:
+        """Initialise the ReadinessEngine object.
+
+        Args:
+            timeout: The number of seconds each wait has for all of its predicates
+                to become true.
+            backstop: The longest time between checks when no events arrive.
+            ceph_timeout: The amount of time a ceph command can run before timeout.
+        """
+        self.timeout = timeout
+        self.backstop = backstop
+        self.ceph_timeout = ceph_timeout
+        self._changed = threading.Event()
+        self._stop: Optional[Callable[[], None]] = None
+
+    def start(self) -> None:
+        """Subscribe to the cluster log."""
+        if self._stop is None:
+            self._stop = get_transport().watch(lambda line: self._changed.set())
+
+    def stop(self) -> None:
+        """End the subscription to the cluster log."""
+        if self._stop is not None:
+            self._stop()
+            self._stop = None
+
+    def __enter__(self) -> "ReadinessEngine":
+        """Subscribe to the cluster log for the duration of the context."""
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """End the subscription to the cluster log."""
+        self.stop()
+
+    def _satisfied(self, predicate: Predicate, status: Dict[str, Any]) -> bool:
+        """Evaluate a predicate, treating a missing field as not yet satisfied."""
+        if status == {}:
+            return False
+        try:
+            return predicate.check(status)
+        except (KeyError, TypeError):
+            return False
+
+    def wait_for(self, predicates: List[Predicate]) -> None:
+        """Wait until all the predicates are true.
+
+        Args:
+            predicates: The predicates to wait for.
+
+        Raises:
+            TimeoutError: If any predicate is not true before the deadline.
+        """
+        owns_subscription = self._stop is None
+        self.start()
+        pending = list(predicates)
+        deadline = time.monotonic() + self.timeout
+        try:
+            while True:
+                self._changed.clear()
+                status = ceph.cluster_status(self.ceph_timeout, refresh=True)
+                waiting = []
+                for predicate in pending:
+                    if self._satisfied(predicate, status):
+                        logger.debug(f"Cluster ready: {predicate.name}")
+                    else:
+                        waiting.append(predicate)
+                pending = waiting
+                if not pending:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    names = ", ".join(predicate.name for predicate in pending)
+                    raise TimeoutError(f"Cluster not ready, waiting on: {names}")
+                self._changed.wait(min(self.backstop, remaining))
+        finally:
+            if owns_subscription:
+                self.stop()
+
+
+def wait_for(predicates: List[Predicate], timeout: float = 60) -> None:
+    """Wait until all the predicates are true.
+
+    Args:
+        predicates: The predicates to wait for.
+        timeout: The number of seconds for all the predicates to become true.
+
+    Raises:
+        TimeoutError: If any predicate is not true before the deadline.
+
+    Examples:
+        >>> import distrax.utils.readiness as readiness
+        >>> readiness.wait_for([readiness.fs_rank_active(0)], timeout=5)
+    """
+    ReadinessEngine(timeout).wait_for(predicates)
+
+
+def daemon_ready(name: str) -> bool:
+    """Check a local daemon is ready from its admin socket, without the monitors.
+
+    An OSD is ready when active, an MDS once it has joined the cluster as a standby
+    or rank, and a rados gateway once it has its rgw counters.
+
+    Args:
+        name: The name of the daemon, i.e. osd.0, mds.host or client.radosgw.host
+
+    Returns:
+        True if ready else False.
+
+    Raises:
+        PermissionError: If the admin socket cannot be connected to, or its folder
+            cannot be searched.
+
+    Examples:
+        >>> import distrax.utils.readiness as readiness
+        >>> readiness.daemon_ready("osd.0")
+            True
+    """
+    prefix = "perf dump" if name.startswith("client.") else "status"
+    result = ceph.admin_command(name, {"prefix": prefix, "format": "json"})
+    if result.returncode in (errno.EACCES, errno.EPERM):
+        raise PermissionError(result.returncode, result.error)
+    if result.returncode != 0:
+        return False
+    try:
+        output = json.loads(result.output)
+    except ValueError:
+        return False
+    if name.startswith("client."):
+        return "rgw" in output
+    if name.startswith("mds."):
+        return output.get("state") in MDS_READY_STATES
+    return bool(output.get("state") == "active")
+
+
+def wait_for_daemons(
+    names: List[str], timeout: float = 60, interval: float = 0.2
+) -> None:
+    """Wait for local daemons to be ready, checking each at the same time.
+
+    Each daemon is checked through its admin socket, so this puts no load on the
+    monitors and can be run on every host at once.
+
+    Args:
+        names: The names of the daemons, i.e. osd.0
+        timeout: The number of seconds for all the daemons to become ready.
+        interval: The seconds between checks of a daemon.
+
+    Raises:
+        TimeoutError: If any daemon is not ready before the deadline.
+        PermissionError: If the admin sockets cannot be connected to, such that the
+            caller can fall back to the cluster status.
+
+    Examples:
+        >>> import distrax.utils.readiness as readiness
+        >>> readiness.wait_for_daemons(["osd.0", "osd.1"], timeout=30)
+    """
+    deadline = time.monotonic() + timeout
+
+    def wait(name: str) -> bool:
+        while not daemon_ready(name):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+        logger.debug(f"Daemon ready: {name}")
+        return True
+
+    if not names:
+        return
+    with ThreadPoolExecutor(max_workers=len(names)) as executor:
+        ready = list(executor.map(wait, names))
+    waiting = [name for name, done in zip(names, ready) if not done]
+    if waiting:
+        raise TimeoutError(f"Daemons not ready, waiting on: {', '.join(waiting)}")
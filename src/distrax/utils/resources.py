@@ -0,0 +1,234 @@
+"""Host resource discovery.
+
+Reads the memory, cgroup limits, CPUs and NUMA topology of the host from procfs
+and sysfs. Every function takes the root of the filesystem to read from, such that
+a fake procfs and sysfs can be used in place of the real ones.
+"""
+
+import glob
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+CGROUP_UNLIMITED = 2**60
+"""Cgroup v1 reports no limit as a number near the largest page-aligned int64."""
+
+
+class NUMANode(NamedTuple):
+    """Structure for a NUMA node of the host."""
+
+    id: int
+    cpus: List[int]
+    memory: int
+    """The total memory of the node in KiB."""
+    free: int
+    """The free memory of the node in KiB."""
+
+
+class Resources(NamedTuple):
+    """Structure for the resources of the host."""
+
+    memory: int
+    """The total memory of the host in KiB."""
+    available: int
+    """The memory available to new processes in KiB, from MemAvailable."""
+    cgroup_limit: Optional[int]
+    """The memory limit of the cgroup in KiB, None when there is no limit."""
+    cgroup_usage: int
+    """The memory used by the cgroup in KiB."""
+    cpus: List[int]
+    numa_nodes: List[NUMANode]
+
+    @property
+    def usable(self) -> int:
+        """The memory that can be used in KiB, within the cgroup limit."""
+        if self.cgroup_limit is None:
+            return self.available
+        return max(min(self.available, self.cgroup_limit - self.cgroup_usage), 0)
+
+
+def parse_cpulist(cpulist: str) -> List[int]:
+    """Parse a kernel cpu list.
+
+    Args:
+        cpulist: The cpu list, i.e. 0-3,8-11
+
+    Returns:
+        The cpus in the list.
+
+    Examples:
+        >>> parse_cpulist("0-2,8")
+            [0, 1, 2, 8]
+    """
+    cpus: List[int] = []
+    for part in cpulist.strip().split(","):
+        if part == "":
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def _read(path: str) -> Optional[str]:
+    """Read a file, returning None when it does not exist."""
+    try:
+        with open(path) as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def meminfo(root: str = "/") -> Dict[str, int]:
+    """Read /proc/meminfo.
+
+    Args:
+        root: The root of the filesystem to read from.
+
+    Returns:
+        The fields of meminfo in KiB.
+
+    Examples:
+        >>> meminfo()["MemAvailable"]
+            14623096
+    """
+    fields: Dict[str, int] = {}
+    content = _read(os.path.join(root, "proc/meminfo")) or ""
+    for line in content.splitlines():
+        name, _, value = line.partition(":")
+        if value.split():
+            fields[name] = int(value.split()[0])
+    return fields
+
+
+def _cgroup_limit(hierarchy: str, path: str, name: str) -> Optional[int]:
+    """Read the smallest memory limit of a cgroup and its ancestors.
+
+    A cgroup can use no more than the limit of any of its ancestors, which is often
+    where the limit of a job or container is set rather than on the cgroup itself.
+
+    Args:
+        hierarchy: The folder the cgroup hierarchy is mounted at.
+        path: The path of the cgroup within the hierarchy.
+        name: The name of the file of the limit.
+
+    Returns:
+        The limit in bytes, None when none of them are limited.
+    """
+    limits = []
+    parts = [part for part in path.split("/") if part]
+    for depth in range(len(parts), -1, -1):
+        limit = _read(os.path.join(hierarchy, *parts[:depth], name))
+        if limit is None or limit.strip() == "max":
+            continue
+        if int(limit) < CGROUP_UNLIMITED:
+            limits.append(int(limit))
+    return min(limits, default=None)
+
+
+def cgroup_memory(root: str = "/") -> Tuple[Optional[int], int]:
+    """Read the memory limit and usage of the cgroup of this process.
+
+    Both cgroup v2, the unified hierarchy, and cgroup v1 are supported. The limit is
+    the smallest of the cgroup and its ancestors.
+
+    Args:
+        root: The root of the filesystem to read from.
+
+    Returns:
+        The limit in KiB, None when unlimited, and the usage in KiB.
+    """
+    groups = _read(os.path.join(root, "proc/self/cgroup")) or ""
+    for line in groups.splitlines():
+        _, controllers, path = line.split(":", 2)
+        if controllers == "":
+            hierarchy = os.path.join(root, "sys/fs/cgroup")
+            names = ("memory.max", "memory.current")
+        elif "memory" in controllers.split(","):
+            hierarchy = os.path.join(root, "sys/fs/cgroup/memory")
+            names = ("memory.limit_in_bytes", "memory.usage_in_bytes")
+        else:
+            continue
+        folder = os.path.join(hierarchy, path.lstrip("/"))
+        if not os.path.exists(os.path.join(folder, names[0])):
+            continue
+        usage = _read(os.path.join(folder, names[1]))
+        usage_kib = int(usage) // 1024 if usage else 0
+        limit = _cgroup_limit(hierarchy, path, names[0])
+        return None if limit is None else limit // 1024, usage_kib
+    return None, 0
+
+
+def online_cpus(root: str = "/") -> List[int]:
+    """Read the online cpus.
+
+    Args:
+        root: The root of the filesystem to read from.
+
+    Returns:
+        The online cpus.
+    """
+    cpulist = _read(os.path.join(root, "sys/devices/system/cpu/online"))
+    if cpulist is None:
+        return list(range(os.cpu_count() or 1))
+    return parse_cpulist(cpulist)
+
+
+def numa_nodes(root: str = "/") -> List[NUMANode]:
+    """Read the NUMA topology.
+
+    Args:
+        root: The root of the filesystem to read from.
+
+    Returns:
+        The NUMA nodes with their cpus and memory, empty if the host has no NUMA
+        information.
+    """
+    nodes = []
+    for folder in glob.glob(os.path.join(root, "sys/devices/system/node/node*")):
+        match = re.search(r"node(\d+)$", folder)
+        if match is None:
+            continue
+        cpus = parse_cpulist(_read(os.path.join(folder, "cpulist")) or "")
+        fields: Dict[str, int] = {}
+        # Lines are in the form: Node 0 MemTotal:       32657728 kB
+        for line in (_read(os.path.join(folder, "meminfo")) or "").splitlines():
+            parts = line.replace(":", "").split()
+            if len(parts) >= 4:
+                fields[parts[2]] = int(parts[3])
+        nodes.append(
+            NUMANode(
+                int(match.group(1)),
+                cpus,
+                fields.get("MemTotal", 0),
+                fields.get("MemFree", 0),
+            )
+        )
+    return sorted(nodes, key=lambda node: node.id)
+
+
+def host_resources(root: str = "/") -> Resources:
+    """Read the resources of the host.
+
+    Args:
+        root: The root of the filesystem to read from.
+
+    Returns:
+        The resources of the host.
+
+    Examples:
+        >>> host_resources().usable
+            14623096
+    """
+    fields = meminfo(root)
+    limit, usage = cgroup_memory(root)
+    return Resources(
+        memory=fields.get("MemTotal", 0),
+        available=fields.get("MemAvailable", fields.get("MemFree", 0)),
+        cgroup_limit=limit,
+        cgroup_usage=usage,
+        cpus=online_cpus(root),
+        numa_nodes=numa_nodes(root),
+    )
@@ -0,0 +1,129 @@
+"""State kept on a host between the creation and removal of a cluster.
+
+The devices record what they created, i.e. the ids of the zram devices, such that
+only those are removed. A file in a folder any user can write to could be planted
+by another user, naming the files a removal then deletes, so the state of a user is
+kept in a folder of their own, STATE_DIR, which does not depend on TMPDIR, such
+that the removal finds it wherever it is run from. A folder or file of state is
+refused unless owned by the user, and a file is never opened through a link.
+"""
+
+import logging
+import os
+import stat
+
+logger = logging.getLogger(__name__)
+STATE_DIR = f"/tmp/distrax-{os.getuid()}"
+"""The folder of the state of this user, only they can use it."""
+
+
+def state_file(name: str) -> str:
+    """Get the path of a file of state.
+
+    Args:
+        name: The name of the file.
+
+    Returns:
+        The path of the file in STATE_DIR.
+
+    Examples:
+        >>> state_file("zram")
+            '/tmp/distrax-1000/zram'
+    """
+    return os.path.join(STATE_DIR, name)
+
+
+def _check_owner(path: str, info: os.stat_result) -> None:
+    """Refuse a path not owned by this user, or writable by others.
+
+    Raises:
+        PermissionError: If the path is refused.
+    """
+    if info.st_uid != os.getuid() or info.st_mode & 0o022:
+        raise PermissionError(
+            f"{path} is not owned by this user only, please remove it"
+        )
+
+
+def _check_folder(folder: str, create: bool) -> None:
+    """Check the folder of a file of state, creating it for this user if missing.
+
+    Raises:
+        PermissionError: If the folder is not a folder owned by this user only.
+    """
+    if create:
+        try:
+            os.mkdir(folder, 0o700)
+        except FileExistsError:
+            pass
+    info = os.lstat(folder)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{folder} is not a folder, please remove it")
+    _check_owner(folder, info)
+
+
+def _no_follow(path: str, flags: int) -> int:
+    """Open a file that is not a symbolic link."""
+    return os.open(path, flags | os.O_NOFOLLOW)
+
+
+def read_state(path: str) -> str:
+    """Read a file of state.
+
+    Args:
+        path: The path of the file.
+
+    Returns:
+        The contents of the file.
+
+    Raises:
+        OSError: If the file is missing, or PermissionError if it is refused.
+
+    Examples:
+        >>> read_state(state_file("queue"))
+            '{}'
+    """
+    try:
+        _check_folder(os.path.dirname(os.path.abspath(path)), create=False)
+        with open(path, opener=_no_follow) as file:
+            _check_owner(path, os.fstat(file.fileno()))
+            return file.read()
+    except PermissionError as error:
+        logger.error(f"Refusing the state in {path}: {error}")
+        raise
+
+
+def write_state(path: str, contents: str) -> None:
+    """Write a file of state, only readable by this user.
+
+    Args:
+        path: The path of the file, its folder is created if missing.
+        contents: The contents of the file.
+
+    Raises:
+        OSError: If the file could not be written, or PermissionError if refused.
+
+    Examples:
+        >>> write_state(state_file("queue"), "{}")
+    """
+    _check_folder(os.path.dirname(os.path.abspath(path)), create=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    with open(fd, "w") as file:
+        _check_owner(path, os.fstat(fd))
+        file.truncate()
+        file.write(contents)
+
+
+def remove_state(path: str) -> None:
+    """Remove a file of state, if it exists.
+
+    Args:
+        path: The path of the file.
+
+    Examples:
+        >>> remove_state(state_file("zram"))
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,11 +1,23 @@
 import os
 import re
 import subprocess
+import time
+from typing import Dict, List, Optional
+
+from distrax.utils.resources import host_resources
+
+_systemd: Optional[bool] = None
+TRANSITIONAL_STATES = ["activating", "deactivating", "reloading", "refreshing"]
+"""The states of a unit with a job running, i.e. starting or stopping."""
+SERVICE_TIMEOUT = 60.0
+"""The seconds to wait for units to finish starting or stopping."""
 
 
 def is_systemd() -> bool:
     """Check if the system is using systemd.
 
+    The result is cached as the init system does not change while running.
+
     Returns:
         True if the system uses systemd else False
 
@@ -13,16 +25,15 @@ def is_systemd() -> bool:
         >>> distrax.utils.system.is_systemd()
         True
     """
-    # If this is the case the file /proc/1/comm will have systemd within it
-    PROCESS_PATH = "/proc/1/comm"
-    if os.path.exists(PROCESS_PATH):
-        file = open(PROCESS_PATH)
-    else:
-        return False
-    for line in file:
-        if re.search("systemd", line):
-            return True
-    return False
+    global _systemd
+    if _systemd is None:
+        # If this is the case the file /proc/1/comm will have systemd within it
+        try:
+            with open("/proc/1/comm") as file:
+                _systemd = re.search("systemd", file.read()) is not None
+        except OSError:
+            _systemd = False
+    return _systemd
 
 
 def enable_service(service: str) -> None:
@@ -63,6 +74,20 @@ def disable_service(service: str) -> None:
         subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
 
+def disable_services(services: List[str]) -> None:
+    """Disables systemd services with one call to systemctl.
+
+    Args:
+        services: The systemd services to disable
+
+    Examples:
+        >>> distrax.utils.system.disable_services(["ceph-mon.target"])
+    """
+    if is_systemd() and services:
+        command = ["sudo", "systemctl", "disable"] + services
+        subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
 def is_systemd_service_enabled(service: str) -> bool:
     """Check if systemd service is enabled or not.
 
@@ -108,6 +133,59 @@ def start_service(service: str) -> None:
         subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
 
+def start_services(services: List[str], timeout: float = SERVICE_TIMEOUT) -> bool:
+    """Start systemd services with one call to systemctl and wait for them.
+
+    systemctl returns once the start jobs finish, which for Type=simple units is as
+    soon as the process is forked. This then waits for every unit to leave the
+    activating state, i.e. a unit that exits straight away and is waiting to be
+    restarted, such that the result reflects whether the services came up rather
+    than a single check racing with their start.
+
+    Args:
+        services: The systemd services to start
+        timeout: The seconds to wait for the services to finish starting
+
+    Returns:
+        True if every service is active else False
+
+    Examples:
+        >>> distrax.utils.system.start_services(["ceph-mon@host"])
+        True
+    """
+    if not is_systemd() or not services:
+        return False
+    command = ["sudo", "systemctl", "start"] + services
+    subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    states = wait_for_services(services, timeout)
+    return all(state == "active" for state in states.values())
+
+
+def restart_service(service: str) -> None:
+    """Restarts systemd service.
+
+    Args:
+        service: The systemd service to restart
+
+    Examples:
+        >>> distrax.utils.system.restart_service("service_to_restart")
+    """
+    if is_systemd():
+        command = ["sudo", "systemctl", "restart", service]
+        subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def daemon_reload() -> None:
+    """Reload the systemd unit files, i.e. after adding a drop-in.
+
+    Examples:
+        >>> distrax.utils.system.daemon_reload()
+    """
+    if is_systemd():
+        command = ["sudo", "systemctl", "daemon-reload"]
+        subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
 def stop_service(service: str) -> None:
     """Stops systemd service.
 
@@ -127,6 +205,20 @@ def stop_service(service: str) -> None:
         subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
 
+def stop_services(services: List[str]) -> None:
+    """Stops systemd services with one call to systemctl.
+
+    Args:
+        services: The systemd services to stop running
+
+    Examples:
+        >>> distrax.utils.system.stop_services(["ceph-osd@0", "ceph-osd@1"])
+    """
+    if is_systemd() and services:
+        command = ["sudo", "systemctl", "stop"] + services
+        subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
 def is_systemd_service_active(service: str) -> bool:
     """Check if systemd service is active or not.
 
@@ -153,6 +245,65 @@ def is_systemd_service_active(service: str) -> bool:
     return result.returncode == 0
 
 
+def service_states(services: List[str]) -> Dict[str, str]:
+    """Get the active state of systemd services with one call to systemctl.
+
+    Args:
+        services: The systemd services to check
+
+    Returns:
+        The state of each service, i.e. active, activating, inactive or failed,
+        empty if the state could not be read.
+
+    Examples:
+        >>> distrax.utils.system.service_states(["ceph-mon@host", "ceph-mgr@host"])
+            {'ceph-mon@host': 'active', 'ceph-mgr@host': 'activating'}
+    """
+    if not services:
+        return {}
+    result = subprocess.run(
+        ["systemctl", "show", "--property=ActiveState"] + services,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    # One ActiveState line per service, in the order they were given
+    states = [
+        line.split("=", 1)[1]
+        for line in result.stdout.decode("utf-8").splitlines()
+        if line.startswith("ActiveState=")
+    ]
+    if len(states) != len(services):
+        return {service: "" for service in services}
+    return dict(zip(services, states))
+
+
+def wait_for_services(
+    services: List[str], timeout: float = SERVICE_TIMEOUT, interval: float = 0.1
+) -> Dict[str, str]:
+    """Wait for the jobs of systemd services to finish.
+
+    Args:
+        services: The systemd services to wait for
+        timeout: The seconds to wait before giving up
+        interval: The seconds between checks
+
+    Returns:
+        The state of each service once none are starting or stopping, or at the
+        timeout.
+
+    Examples:
+        >>> distrax.utils.system.wait_for_services(["ceph-mon@host"])
+            {'ceph-mon@host': 'active'}
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        states = service_states(services)
+        settled = not any(state in TRANSITIONAL_STATES for state in states.values())
+        if settled or time.monotonic() >= deadline:
+            return states
+        time.sleep(interval)
+
+
 def free_memory() -> int:
     """Get the amount of free RAM available on the system.
 
@@ -169,3 +320,36 @@ def free_memory() -> int:
                 free_mem = line.split()[1]
                 return int(free_mem)
     return 0
+
+
+def total_memory() -> int:
+    """Get the total amount of RAM on the system.
+
+    Returns:
+        Amount of memory in KiB
+
+    Examples:
+        >>> total_memory()
+            32657728
+    """
+    with open("/proc/meminfo") as file:
+        for line in file:
+            if "MemTotal" in line:
+                return int(line.split()[1])
+    return 0
+
+
+def available_memory() -> int:
+    """Get the amount of RAM that can be used without swapping or being OOM-killed.
+
+    This is MemAvailable, which unlike MemFree counts reclaimable caches, capped
+    by the memory limit of the cgroup DisTRaX is running in.
+
+    Returns:
+        Amount of memory in KiB
+
+    Examples:
+        >>> available_memory()
+            28493212
+    """
+    return host_resources().usable
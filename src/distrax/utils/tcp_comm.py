@@ -0,0 +1,392 @@
+"""A communicator over TCP for multi-host deployment without MPI.
+
+One process is the leader, rank 0, and listens on an address the workers connect
+to. Once the number of hosts requested have joined the workers are given ranks in
+the order of their hostnames. Each collective is a message from every worker to the
+leader, which combines them and sends the result back, such that the communicator
+can be used by distrax.utils.coordination.Coordinator in place of MPI.COMM_WORLD
+with the same phases. The network is handled by asyncio on a thread of its own, so
+the leader waits on every worker at the same time.
+
+Messages are JSON with a length prefix, so only JSON values can be sent, tuples
+arrive as lists. Workers must present a token shared by the hosts before they
+join, however messages are not encrypted, the cluster keyrings are sent to the
+workers, so the network between the hosts must be trusted as it is for MPI.
+"""
+
+import asyncio
+import functools
+import hmac
+import json
+import logging
+import socket
+import struct
+import threading
+import time
+from typing import Any, Callable, Coroutine, Dict, List, NamedTuple, Optional, TypeVar
+
+from distrax.exceptions.exceptions import CoordinationError
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+PORT = 6700
+TOKEN_ENV = "DISTRAX_TOKEN"
+"""The environment variable holding the token shared by the hosts."""
+LOR = "lor"
+MIN = "min"
+REDUCTIONS: Dict[str, Callable[[Any, Any], Any]] = {
+    LOR: lambda first, second: bool(first or second),
+    MIN: min,
+}
+"""The reductions of allreduce by name, as functions cannot be sent."""
+HEADER = struct.Struct(">I")
+MAX_MESSAGE = 64 * 1024**2
+
+
+class Peer(NamedTuple):
+    """Structure for a worker connected to the leader."""
+
+    hostname: str
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+
+
+async def send_message(writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+    """Send a message.
+
+    Args:
+        writer: The stream to send the message on.
+        message: The message, it must be JSON serialisable.
+    """
+    payload = json.dumps(message).encode("utf-8")
+    writer.write(HEADER.pack(len(payload)) + payload)
+    await writer.drain()
+
+
+async def receive_message(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    """Receive a message.
+
+    Args:
+        reader: The stream to receive the message from.
+
+    Returns:
+        The message.
+
+    Raises:
+        CoordinationError: If the connection closed or the message is invalid.
+    """
+    try:
+        (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+        if length > MAX_MESSAGE:
+            raise CoordinationError(f"Message of {length} bytes is too large")
+        message = json.loads(await reader.readexactly(length))
+    except (asyncio.IncompleteReadError, ConnectionError) as error:
+        raise CoordinationError(f"Connection closed: {error}") from error
+    except ValueError as error:
+        raise CoordinationError(f"Invalid message: {error}") from error
+    if not isinstance(message, dict):
+        raise CoordinationError(f"Invalid message: {message}")
+    return message
+
+
+class TCPComm:
+    """A communicator of the hosts over TCP, led by one of them.
+
+    Examples:
+        >>> # On the leader
+        >>> comm = TCPComm("node1", PORT, size=4, token=token, leader=True)
+        >>> comm.join()
+        >>> coordinator = Coordinator(comm, lor=LOR, minimum=MIN)
+
+        >>> # On each worker
+        >>> comm = TCPComm("node1", PORT, size=4, token=token)
+        >>> comm.join()
+        >>> comm.Get_rank()
+            2
+    """
+
+    def __init__(
+        self,
+        address: str,
+        port: int = PORT,
+        size: int = 1,
+        token: str = "",
+        leader: bool = False,
+        hostname: Optional[str] = None,
+        timeout: float = 60.0,
+    ) -> None:
+        """Initialise the TCPComm object, the leader starts listening.
+
+        Args:
+            address: The address of the leader, which it listens on.
+            port: The port of the leader, 0 for the leader to pick one.
+            size: The number of hosts including the leader.
+            token: The token the workers must present to join.
+            leader: Whether this host is the leader.
+            hostname: The name of this host, the name from the system if None.
+            timeout: The seconds to wait for the hosts to join.
+
+        Raises:
+            ValueError: If there is no token.
+            CoordinationError: If the leader could not listen on the address.
+        """
+        if not token:
+            raise ValueError(f"A token must be shared by the hosts, i.e. {TOKEN_ENV}")
+        self.address = address
+        self.port = port
+        self.size = size
+        self.token = token
+        self.leader = leader
+        self.hostname = hostname or socket.gethostname()
+        self.timeout = timeout
+        self.rank = 0
+        self.hosts: List[str] = []
+        """The hostnames of the ranks, once joined."""
+        self.peers: List[Peer] = []
+        self.sequence = 0
+        self._joined: Optional[asyncio.Event] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        if leader:
+            try:
+                self._call(self._listen())
+            except BaseException:
+                self.close()
+                raise
+
+    def _call(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the thread of the network and wait for the result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _listen(self) -> None:
+        """Listen for workers until the number of hosts have joined."""
+        self._joined = asyncio.Event()
+        if self.size == 1:
+            self._joined.set()
+        try:
+            self._server = await asyncio.start_server(
+                self._accept, self.address, self.port
+            )
+        except OSError as error:
+            raise CoordinationError(
+                f"Could not listen on {self.address}:{self.port}: {error}"
+            ) from error
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Leader listening on {self.address}:{self.port}")
+
+    async def _accept(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Admit a worker that presents the token while there is room."""
+        peer = writer.get_extra_info("peername")
+        try:
+            hello = await asyncio.wait_for(receive_message(reader), self.timeout)
+            token = str(hello.get("token", ""))
+            if not hmac.compare_digest(token.encode(), self.token.encode()):
+                raise CoordinationError("Invalid token")
+            if self._joined is None or self._joined.is_set():
+                raise CoordinationError("All hosts have joined")
+        except (CoordinationError, asyncio.TimeoutError) as error:
+            logger.warning(f"Refused {peer}: {error}")
+            try:
+                await send_message(writer, {"error": str(error)})
+            except ConnectionError:
+                pass
+            writer.close()
+            return
+        self.peers.append(Peer(str(hello.get("hostname", peer)), reader, writer))
+        logger.info(f"{self.peers[-1].hostname} joined from {peer}")
+        if len(self.peers) == self.size - 1:
+            self._joined.set()
+
+    async def _lead(self) -> None:
+        """Wait for the workers to join then give them their ranks."""
+        assert self._joined is not None and self._server is not None
+        try:
+            await asyncio.wait_for(self._joined.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            raise CoordinationError(
+                f"{len(self.peers) + 1} of {self.size} hosts joined within "
+                f"{self.timeout}s"
+            ) from None
+        finally:
+            self._server.close()
+        # Ranks follow the hostnames such that they are the same between runs
+        self.peers.sort(key=lambda peer: peer.hostname)
+        self.hosts = [self.hostname] + [peer.hostname for peer in self.peers]
+        await asyncio.gather(
+            *(
+                send_message(
+                    peer.writer, {"rank": rank, "size": self.size, "hosts": self.hosts}
+                )
+                for rank, peer in enumerate(self.peers, start=1)
+            )
+        )
+
+    async def _follow(self) -> None:
+        """Connect to the leader and receive the rank of this host."""
+        deadline = time.monotonic() + self.timeout
+        # The leader may not be listening yet
+        while True:
+            try:
+                self._reader, self._writer = await asyncio.open_connection(
+                    self.address, self.port
+                )
+                break
+            except OSError as error:
+                if time.monotonic() > deadline:
+                    raise CoordinationError(
+                        f"Could not connect to {self.address}:{self.port}: {error}"
+                    ) from error
+                await asyncio.sleep(0.2)
+        await send_message(
+            self._writer, {"token": self.token, "hostname": self.hostname}
+        )
+        try:
+            reply = await asyncio.wait_for(receive_message(self._reader), self.timeout)
+        except asyncio.TimeoutError:
+            raise CoordinationError(
+                f"Not all hosts joined the leader within {self.timeout}s"
+            ) from None
+        if "error" in reply:
+            raise CoordinationError(f"Refused by the leader: {reply['error']}")
+        self.rank = int(reply["rank"])
+        self.size = int(reply["size"])
+        self.hosts = list(reply["hosts"])
+
+    def join(self) -> None:
+        """Wait until every host has joined, giving each its rank.
+
+        Raises:
+            CoordinationError: If the hosts did not join within the timeout.
+        """
+        self._call(self._lead() if self.leader else self._follow())
+        logger.info(f"{self.hostname} joined as rank {self.rank} of {self.size}")
+
+    async def _collective(
+        self, kind: str, value: Any, combine: Callable[[List[Any]], Any]
+    ) -> Any:
+        """Send a value to the leader, which combines them and returns the result.
+
+        Args:
+            kind: The name of the collective, each rank must call the same one.
+            value: The value of this rank.
+            combine: Called on the leader with the values of the ranks in order.
+
+        Returns:
+            The result from the leader.
+
+        Raises:
+            CoordinationError: If a connection closed or a rank called a different
+                collective.
+        """
+        self.sequence += 1
+        expected = {"kind": kind, "sequence": self.sequence}
+        if not self.leader:
+            assert self._reader is not None and self._writer is not None
+            await send_message(self._writer, {**expected, "value": value})
+            reply = await receive_message(self._reader)
+            if "error" in reply:
+                raise CoordinationError(reply["error"])
+            return reply["value"]
+        messages = await asyncio.gather(
+            *(receive_message(peer.reader) for peer in self.peers),
+            return_exceptions=True,
+        )
+        error = None
+        values = [value]
+        for peer, message in zip(self.peers, messages):
+            if isinstance(message, BaseException):
+                error = f"{peer.hostname}: {message}"
+            elif {key: message.get(key) for key in expected} != expected:
+                error = f"{peer.hostname} called {message.get('kind')} not {kind}"
+            else:
+                values.append(message.get("value"))
+        if error is not None:
+            # The workers still waiting are told, rather than left to hang
+            await self._send_all({"error": error})
+            raise CoordinationError(error)
+        result = combine(values)
+        await self._send_all({**expected, "value": result})
+        return result
+
+    async def _send_all(self, message: Dict[str, Any]) -> None:
+        """Send a message from the leader to every worker."""
+        await asyncio.gather(
+            *(send_message(peer.writer, message) for peer in self.peers),
+            return_exceptions=True,
+        )
+
+    def Get_rank(self) -> int:
+        """Get the rank of this host."""
+        return self.rank
+
+    def Get_size(self) -> int:
+        """Get the number of hosts."""
+        return self.size
+
+    def allreduce(self, sendobj: Any, op: str) -> Any:
+        """Combine a value from every rank, returning the result on all.
+
+        Args:
+            sendobj: The value of this rank.
+            op: The name of the reduction, one of REDUCTIONS.
+
+        Returns:
+            The values combined in rank order.
+        """
+        reduction = REDUCTIONS[op]
+        return self._call(
+            self._collective(
+                f"allreduce {op}",
+                sendobj,
+                lambda values: functools.reduce(reduction, values),
+            )
+        )
+
+    def allgather(self, sendobj: Any) -> List[Any]:
+        """Gather a value from every rank, returning them in rank order on all.
+
+        Args:
+            sendobj: The value of this rank.
+
+        Returns:
+            The values in rank order.
+        """
+        return list(self._call(self._collective("allgather", sendobj, list)))
+
+    def bcast(self, obj: Any, root: int = 0) -> Any:
+        """Send a value from the root rank, returning it on all.
+
+        Args:
+            obj: The value, only used on the root.
+            root: The rank to send the value from.
+
+        Returns:
+            The value of the root.
+        """
+        value = obj if self.rank == root else None
+        return self._call(
+            self._collective(f"bcast {root}", value, lambda values: values[root])
+        )
+
+    def close(self) -> None:
+        """Close the connections and stop the thread of the network."""
+
+        async def _close() -> None:
+            if self._server is not None:
+                self._server.close()
+            writers = [peer.writer for peer in self.peers] + [self._writer]
+            for writer in writers:
+                if writer is not None:
+                    writer.close()
+
+        if self._loop.is_running():
+            self._call(_close())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        self._loop.close()
@@ -0,0 +1,354 @@
+"""Ceph command transports.
+
+A transport sends monitor commands to the cluster. Commands are given in the
+JSON form used by the monitors, i.e. {"prefix": "osd pool create", "pool": "distrax",
+"pg_num": 32, "pgp_num": 32}, such that they can be sent over a long-lived librados
+connection when python-rados is installed, or through the `ceph` command line tool
+when it is not.
+
+To read more about the monitor commands please see:
+https://docs.ceph.com/en/latest/api/mon_command_api/
+"""
+
+import json
+import logging
+import subprocess
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Protocol,
+    Union,
+    runtime_checkable,
+)
+
+log = logging.getLogger(__name__)
+AVAILABLE = ["rados", "cli"]
+"""Transports that are supported and can be used."""
+WATCH_LEVEL = "debug"
+"""The level the cluster log is watched at, the pgmap and service changes are only
+logged at debug level, such that a waiter is woken by the changes it waits for."""
+
+
+class CommandResult(NamedTuple):
+    """Structure for the result of a command."""
+
+    returncode: int
+    output: str
+    error: str
+
+
+@runtime_checkable
+class AbstractTransport(Protocol):
+    """An interface for Transport Classes.
+
+    A Transport sends monitor commands to the cluster and returns the result.
+    """
+
+    def mon_command(self, cmd: Dict[str, Any], timeout: int = 5) -> CommandResult:
+        """Send a command to the monitor.
+
+        Args:
+            cmd: The command in the monitor JSON form, it must contain a prefix.
+            timeout: The length of time to try and connect to the cluster.
+
+        Returns:
+            The returncode, output and error of the command.
+        """
+        ...
+
+    def watch(self, callback: Callable[[str], None]) -> Callable[[], None]:
+        """Subscribe to the cluster log at WATCH_LEVEL, i.e. `ceph -w --watch-debug`.
+
+        Args:
+            callback: Called with each line of the cluster log as it arrives.
+
+        Returns:
+            A function that ends the subscription when called.
+        """
+        ...
+
+    def shutdown(self) -> None:
+        """Close any connection held to the cluster."""
+        ...
+
+
+class CLITransport:
+    """Send monitor commands using the `ceph` command line tool.
+
+    The values of the command are passed to `ceph` as positional arguments in the
+    order they are given, with the exception of `format` which is passed as
+    `--format` and booleans which are passed as flags, i.e.
+    {"yes_i_really_mean_it": True} becomes `--yes-i-really-mean-it`.
+
+    Examples:
+        >>> transport = CLITransport()
+        >>> transport.mon_command({"prefix": "osd lspools", "format": "json"})
+        CommandResult(returncode=0, output='[{"poolnum":1,"poolname":".mgr"}]',
+        error='')
+    """
+
+    @staticmethod
+    def to_argv(cmd: Dict[str, Any], timeout: int = 5) -> List[str]:
+        """Convert a monitor command into the arguments for the `ceph` tool.
+
+        Args:
+            cmd: The command in the monitor JSON form, it must contain a prefix.
+            timeout: The length of time to try and connect to the cluster.
+
+        Returns:
+            The command line to run.
+
+        Examples:
+            >>> CLITransport.to_argv({"prefix": "osd out", "ids": ["0", "1"]})
+            ['ceph', 'osd', 'out', '0', '1', '--connect-timeout', '5']
+        """
+        prefix: str = cmd["prefix"]
+        argv = ["ceph"] + prefix.split()
+        for key, value in cmd.items():
+            if key == "prefix":
+                continue
+            elif key == "format":
+                argv += ["--format", str(value)]
+            elif isinstance(value, bool):
+                if value:
+                    argv.append(f"--{key.replace('_', '-')}")
+            elif isinstance(value, list):
+                argv += [str(item) for item in value]
+            else:
+                argv.append(str(value))
+        return argv + ["--connect-timeout", str(timeout)]
+
+    def mon_command(self, cmd: Dict[str, Any], timeout: int = 5) -> CommandResult:
+        """Send a command to the monitor using the `ceph` tool.
+
+        Args:
+            cmd: The command in the monitor JSON form, it must contain a prefix.
+            timeout: The length of time to try and connect to the cluster.
+
+        Returns:
+            The returncode, output and error of the command.
+        """
+        process = subprocess.run(
+            self.to_argv(cmd, timeout), stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        return CommandResult(
+            process.returncode,
+            process.stdout.decode("utf-8"),
+            process.stderr.decode("utf-8"),
+        )
+
+    @staticmethod
+    def watch(callback: Callable[[str], None]) -> Callable[[], None]:
+        """Subscribe to the cluster log at WATCH_LEVEL using `ceph -w`.
+
+        Args:
+            callback: Called with each line of the cluster log as it arrives.
+
+        Returns:
+            A function that ends the subscription when called.
+        """
+        process = subprocess.Popen(
+            ["ceph", "-w", f"--watch-{WATCH_LEVEL}", "--format", "json"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+        def read() -> None:
+            assert process.stdout is not None
+            for line in process.stdout:
+                callback(line.decode("utf-8"))
+
+        threading.Thread(target=read, daemon=True).start()
+
+        def stop() -> None:
+            process.terminate()
+            process.wait()
+
+        return stop
+
+    def shutdown(self) -> None:
+        """Nothing to close as every command uses its own process."""
+
+
+class RadosTransport:
+    """Send monitor commands over a single librados connection.
+
+    The connection is opened on the first command and reused for every command
+    after, if the cluster cannot be reached the connection is retried on the next
+    command.
+
+    Examples:
+        >>> transport = RadosTransport()
+        >>> transport.mon_command({"prefix": "osd lspools", "format": "json"})
+        CommandResult(returncode=0, output='[{"poolnum":1,"poolname":".mgr"}]',
+        error='')
+    """
+
+    def __init__(
+        self, conffile: str = "/etc/ceph/ceph.conf", name: str = "client.admin"
+    ) -> None:
+        """Initialise the RadosTransport object.
+
+        Args:
+            conffile: The ceph config file to connect with.
+            name: The name of the client to connect as.
+        """
+        self.conffile = conffile
+        self.name = name
+        self._cluster: Any = None
+        self._lock = threading.Lock()
+
+    def _connect(self, timeout: int) -> Any:
+        """Open the connection to the cluster if it is not already open.
+
+        Args:
+            timeout: The length of time to try and connect to the cluster.
+
+        Returns:
+            The connected rados.Rados object.
+        """
+        import rados
+
+        if self._cluster is None:
+            cluster = rados.Rados(conffile=self.conffile, name=self.name)
+            try:
+                cluster.connect(timeout=timeout)
+            except Exception:
+                cluster.shutdown()
+                raise
+            self._cluster = cluster
+        return self._cluster
+
+    def mon_command(self, cmd: Dict[str, Any], timeout: int = 5) -> CommandResult:
+        """Send a command to the monitor over the librados connection.
+
+        Args:
+            cmd: The command in the monitor JSON form, it must contain a prefix.
+            timeout: The length of time to try and connect to the cluster.
+
+        Returns:
+            The returncode, output and error of the command.
+        """
+        with self._lock:
+            try:
+                cluster = self._connect(timeout)
+            except Exception as exception:
+                log.debug(f"Unable to connect to the cluster: {exception}")
+                return CommandResult(1, "", str(exception))
+            try:
+                returncode, output, error = cluster.mon_command(
+                    json.dumps(cmd), b"", timeout=timeout
+                )
+            except Exception as exception:
+                # Drop the connection such that the next command reconnects
+                cluster.shutdown()
+                self._cluster = None
+                return CommandResult(1, "", str(exception))
+        return CommandResult(abs(returncode), output.decode("utf-8"), error)
+
+    def watch(self, callback: Callable[[str], None]) -> Callable[[], None]:
+        """Subscribe to the cluster log at WATCH_LEVEL over the librados connection.
+
+        Args:
+            callback: Called with each line of the cluster log as it arrives.
+
+        Returns:
+            A function that ends the subscription when called, if the cluster
+            cannot be reached no lines are delivered.
+        """
+
+        def log_line(arg: Any, line: str, *_: Any) -> None:
+            callback(line)
+
+        with self._lock:
+            try:
+                cluster = self._connect(5)
+                cluster.monitor_log(WATCH_LEVEL, log_line, None)
+            except Exception as exception:
+                log.debug(f"Unable to watch the cluster: {exception}")
+                return lambda: None
+
+        def stop() -> None:
+            with self._lock:
+                if self._cluster is cluster:
+                    cluster.monitor_log(WATCH_LEVEL, None, None)
+
+        return stop
+
+    def shutdown(self) -> None:
+        """Close the connection to the cluster."""
+        with self._lock:
+            if self._cluster is not None:
+                self._cluster.shutdown()
+                self._cluster = None
+
+
+def rados_available() -> bool:
+    """Check if python-rados can be imported.
+
+    Returns:
+        True if python-rados is installed else False
+    """
+    try:
+        import rados  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def set_transport(transport: Union[str, AbstractTransport]) -> None:
+    """Sets the transport to use.
+
+    Args:
+        transport: the name of the transport, i.e. rados or cli, or a transport
+            object to use directly.
+
+    Examples:
+        >>> distrax.utils.transport as transport
+        >>> transport.set_transport("cli")
+    """
+    global _current
+    if not isinstance(transport, str):
+        new: AbstractTransport = transport
+    elif transport.lower() == "rados":
+        if not rados_available():
+            raise Exception("Transport `rados` requires python-rados to be installed")
+        new = RadosTransport()
+    elif transport.lower() == "cli":
+        new = CLITransport()
+    else:
+        raise Exception(
+            f"Transport `{transport}` is not available! Choose from: {AVAILABLE}"
+        )
+    if _current is not None and _current is not new:
+        _current.shutdown()
+    log.debug("Switching transport to `%s`", type(new).__name__)
+    _current = new
+
+
+def get_transport() -> AbstractTransport:
+    """Gets the transport in use.
+
+    The rados transport is used when python-rados is installed, otherwise the
+    `ceph` command line tool is used.
+
+    Returns:
+        The transport object
+
+    Examples:
+        >>> distrax.utils.transport as transport
+        >>> transport.get_transport()
+            <distrax.utils.transport.CLITransport object at 0x7f0a4c2b1d50>
+    """
+    if _current is None:
+        set_transport("rados" if rados_available() else "cli")
+    assert _current is not None
+    return _current
+
+
+_current: Optional[AbstractTransport] = None
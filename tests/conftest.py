@@ -0,0 +1,175 @@
+import fnmatch
+import json
+import os
+import socket
+import struct
+import threading
+
+import pytest
+
+import distrax.utils.ceph as ceph
+import distrax.utils.transport as transport
+from distrax.utils.transport import CommandResult
+
+
+class CannedTransport:
+    """
+    A stand-in transport that answers monitor commands with canned JSON
+
+    A response can be a value, which is returned as JSON, or a function of the
+    command returning a CommandResult.
+    """
+
+    def __init__(self, responses=None):
+        self.responses = responses if responses is not None else {}
+        self.commands = []
+        self.callback = None
+        self.stopped = False
+
+    def mon_command(self, cmd, timeout=5):
+        self.commands.append(cmd)
+        if cmd["prefix"] not in self.responses:
+            return CommandResult(1, "", "unknown command")
+        response = self.responses[cmd["prefix"]]
+        if callable(response):
+            return response(cmd)
+        if isinstance(response, str):
+            return CommandResult(0, response, "")
+        return CommandResult(0, json.dumps(response), "")
+
+    def watch(self, callback):
+        self.callback = callback
+        self.stopped = False
+
+        def stop():
+            self.stopped = True
+
+        return stop
+
+    def shutdown(self):
+        pass
+
+    def announce(self, prefix, response):
+        """
+        Change a response and announce it as a cluster log event
+        """
+        self.responses[prefix] = response
+        if self.callback is not None:
+            self.callback("cluster event")
+
+    def prefixes(self):
+        return [cmd["prefix"] for cmd in self.commands]
+
+
+@pytest.fixture()
+def canned_transport():
+    """
+    Sets the transport to a CannedTransport for the test
+    """
+    canned = CannedTransport()
+    transport.set_transport(canned)
+    ceph.invalidate_status()
+    yield canned
+    ceph.invalidate_status()
+    transport.set_transport("cli")
+
+
+class AdminSocketServer:
+    """
+    A stand-in for the admin socket of a daemon, answering commands by prefix
+
+    A response can be a value, which is returned as JSON, or a string.
+    """
+
+    def __init__(self, path, responses):
+        self.path = path
+        self.responses = responses
+        self.commands = []
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(path)
+        self.sock.listen()
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                connection, _ = self.sock.accept()
+            except OSError:
+                return
+            with connection:
+                data = b""
+                while not data.endswith(b"\0"):
+                    chunk = connection.recv(1024)
+                    if not chunk:
+                        break
+                    data += chunk
+                cmd = json.loads(data.rstrip(b"\0"))
+                self.commands.append(cmd)
+                response = self.responses.get(cmd["prefix"], "")
+                if not isinstance(response, str):
+                    response = json.dumps(response)
+                output = response.encode()
+                connection.sendall(struct.pack(">I", len(output)) + output)
+
+    def close(self):
+        self.sock.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@pytest.fixture()
+def admin_sockets(monkeypatch, tmp_path):
+    """
+    Points the admin sockets at a temporary folder, returning a function that starts
+    a stand-in daemon with the responses given
+    """
+    monkeypatch.setattr(ceph, "VAR_RUN", f"{tmp_path}/ceph-")
+    servers = []
+
+    def start(name, responses):
+        server = AdminSocketServer(f"{tmp_path}/ceph-{name}.asok", responses)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+SUDOERS = os.path.join(os.path.dirname(__file__), "..", "sudeors", "distrax-ceph")
+
+
+class Sudoers:
+    """
+    The commands of the sudoers file, matched as sudo does
+
+    A command that lists arguments only allows arguments matching them, where a
+    wildcard matches any characters including spaces and slashes, and a command
+    without arguments allows any.
+    """
+
+    def __init__(self, path=SUDOERS):
+        self.rules = []
+        with open(path) as file:
+            for line in file:
+                _, found, command = line.strip().partition("NOPASSWD: ")
+                if found:
+                    program, _, args = command.partition(" ")
+                    self.rules.append((program, args))
+
+    def allows(self, argv):
+        program, args = argv[0], " ".join(argv[1:])
+        return any(
+            fnmatch.fnmatchcase(program, rule_program)
+            and (rule_args == "" or fnmatch.fnmatchcase(args, rule_args))
+            for rule_program, rule_args in self.rules
+        )
+
+
+@pytest.fixture()
+def sudoers():
+    """
+    The commands of the sudoers file shipped with distrax
+    """
+    return Sudoers()
@@ -0,0 +1,97 @@
+import subprocess
+
+import pytest
+
+import distrax.devices.loop_device as loop_device
+from distrax.exceptions.exceptions import DeviceCreationError, NotEnoughMemoryError
+
+
+@pytest.fixture()
+def loop(monkeypatch, tmp_path):
+    """
+    A fake losetup and loop sysfs, with loop0 already used by the host
+    """
+    block = tmp_path / "block"
+    backing = tmp_path / "shm"
+    backing.mkdir()
+    calls = {"commands": [], "fail": None, "block": block, "backing": backing}
+
+    def attach(name, path):
+        (block / name / "loop").mkdir(parents=True, exist_ok=True)
+        (block / name / "loop" / "backing_file").write_text(f"{path}\n")
+        (block / name / "loop" / "dio").write_text("1\n")
+
+    def run(args, **kwargs):
+        calls["commands"].append(args)
+        if "--find" in args:
+            if args[-1] == calls["fail"]:
+                return subprocess.CompletedProcess(args, 1, b"", b"no free loop")
+            name = f"loop{len(list(block.iterdir()))}"
+            attach(name, args[-1])
+            return subprocess.CompletedProcess(args, 0, f"/dev/{name}\n".encode(), b"")
+        if "--detach" in args:
+            (block / args[-1][5:] / "loop" / "backing_file").unlink()
+        return subprocess.CompletedProcess(args, 0, b"", b"")
+
+    attach("loop0", "/var/lib/images/disk.img")
+    monkeypatch.setattr(loop_device.subprocess, "run", run)
+    monkeypatch.setattr(loop_device, "SYS_BLOCK", str(block))
+    monkeypatch.setattr(loop_device, "available_memory", lambda: 1024**3)
+    calls["device"] = loop_device.LoopDevice(str(backing), str(tmp_path / "state"))
+    yield calls
+
+
+class TestLoopDevice:
+    """
+    Tests the creation and removal of loop devices
+    """
+
+    def test_create_device(self, loop):
+        loop["device"].create_device(size=1, number=2)
+        assert loop["device"].get_paths(2) == ["/dev/loop1", "/dev/loop2"]
+        files = sorted(loop["backing"].iterdir())
+        assert [file.name for file in files] == [
+            "distrax-loop0.img",
+            "distrax-loop1.img",
+        ]
+        assert all(file.stat().st_size == 1024**3 for file in files)
+        # The backing files are sparse
+        assert all(file.stat().st_blocks == 0 for file in files)
+        assert all("--direct-io=on" in command for command in loop["commands"])
+
+    def test_create_device_exists(self, loop):
+        loop["device"].create_device(size=1, number=1)
+        with pytest.raises(DeviceCreationError):
+            loop["device"].create_device(size=1, number=1)
+
+    def test_create_device_not_enough_memory(self, loop):
+        with pytest.raises(NotEnoughMemoryError):
+            loop["device"].create_device(size=1024, number=2)
+
+    def test_create_device_failure_removes_devices(self, loop):
+        loop["fail"] = str(loop["backing"] / "distrax-loop1.img")
+        with pytest.raises(DeviceCreationError, match="no free loop"):
+            loop["device"].create_device(size=1, number=2)
+        assert list(loop["backing"].iterdir()) == []
+        assert ["sudo", "losetup", "--detach", "/dev/loop1"] in loop["commands"]
+        assert loop["device"].get_paths(2) == []
+
+    def test_remove_device_only_detaches_own(self, loop):
+        loop["device"].create_device(size=1, number=2)
+        # loop2 was detached and reused by something else
+        backing_file = loop["block"] / "loop2" / "loop" / "backing_file"
+        backing_file.write_text("/var/lib/images/other.img\n")
+        loop["device"].remove_device()
+        detached = [
+            command[-1] for command in loop["commands"] if "--detach" in command
+        ]
+        assert detached == ["/dev/loop1"]
+        assert list(loop["backing"].iterdir()) == []
+
+    def test_remove_device_only_removes_backing_files(self, loop, tmp_path):
+        other = tmp_path / "important"
+        other.write_text("kept")
+        loop_device.write_state(str(tmp_path / "state"), f"/dev/loop5 {other}\n")
+        loop["device"].remove_device()
+        assert other.read_text() == "kept"
+        assert loop["device"].get_paths(1) == []
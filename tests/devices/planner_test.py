@@ -0,0 +1,80 @@
+import pytest
+
+from distrax.devices import planner
+from distrax.exceptions.exceptions import NotEnoughMemoryError
+from distrax.utils.resources import NUMANode, Resources
+
+GiB = 1024**2
+
+
+def host(memory_gib, cpus=16, nodes=2, limit=None):
+    per_node = cpus // nodes
+    return Resources(
+        memory=memory_gib * GiB,
+        available=memory_gib * GiB,
+        cgroup_limit=limit,
+        cgroup_usage=0,
+        cpus=list(range(cpus)),
+        numa_nodes=[
+            NUMANode(node, list(range(node * per_node, (node + 1) * per_node)), 0, 0)
+            for node in range(nodes)
+        ],
+    )
+
+
+class TestPlanner:
+    """
+    Tests the planning of devices from the host resources
+    """
+
+    def test_auto_number_and_size(self):
+        plan = planner.plan_devices(host(128), memory_fraction=0.5)
+        # 16 CPUs allow 8 OSDs, sharing 64GiB with the default 4GiB target each
+        assert plan.number == 8
+        assert plan.size == 4
+        assert plan.osd_overhead == 4 * GiB
+        assert plan.total <= plan.budget
+
+    def test_overhead_of_tuning_profile(self):
+        plan = planner.plan_devices(host(64), memory_fraction=0.5)
+        # The budget of 32GiB holds 6 OSDs with the default target
+        assert (plan.number, plan.size) == (6, 1)
+        plan = planner.plan_devices(
+            host(64),
+            memory_fraction=0.5,
+            profile="ram",
+            overrides={"osd_memory_target": str(1024**3)},
+        )
+        assert (plan.number, plan.size, plan.osd_overhead) == (8, 3, GiB)
+        # The ram profile lowers the target to half of the memory the devices leave
+        with pytest.raises(NotEnoughMemoryError):
+            planner.plan_devices(host(64), memory_fraction=0.75, number=8, size=3)
+        plan = planner.plan_devices(
+            host(64), memory_fraction=0.75, number=8, size=3, profile="ram"
+        )
+        assert plan.osd_overhead == 2.5 * GiB
+
+    def test_number_is_multiple_of_numa_nodes(self):
+        plan = planner.plan_devices(host(20, cpus=16, nodes=2), memory_fraction=0.5)
+        # The 10GiB budget holds 2 OSDs of 1GiB, balanced over both nodes
+        assert plan.number % 2 == 0
+
+    def test_fixed_size(self):
+        plan = planner.plan_devices(host(128), memory_fraction=0.5, size=6)
+        assert plan.size == 6
+        assert plan.number == 6
+
+    def test_cgroup_limit(self):
+        plan = planner.plan_devices(host(64, limit=8 * GiB), memory_fraction=1.0)
+        assert plan.total <= 8 * GiB
+
+    def test_not_enough_memory(self):
+        with pytest.raises(NotEnoughMemoryError):
+            planner.plan_devices(host(2), memory_fraction=0.5)
+        with pytest.raises(NotEnoughMemoryError):
+            planner.plan_devices(host(64), memory_fraction=0.5, number=8, size=8)
+
+    def test_describe(self):
+        plan = planner.plan_devices(host(128), memory_fraction=0.5)
+        assert "8 x 4GiB" in plan.describe()
+        assert "2 NUMA nodes" in plan.describe()
@@ -0,0 +1,79 @@
+import subprocess
+import threading
+import time
+
+import pytest
+
+import distrax.devices.prefault as prefault
+from distrax.exceptions.exceptions import DeviceCreationError
+from distrax.utils.resources import NUMANode
+
+
+@pytest.fixture()
+def dd(monkeypatch, tmp_path):
+    """
+    Replaces the helper with a short sleep, recording the commands and peak
+    concurrency
+    """
+    calls = {"commands": [], "running": 0, "peak": 0, "fail": set()}
+    lock = threading.Lock()
+    for name in ["ram0", "ram1", "ram2"]:
+        (tmp_path / name).mkdir()
+        # 1GiB in 512 byte sectors
+        (tmp_path / name / "size").write_text("2097152\n")
+
+    def run(args, **kwargs):
+        calls["commands"].append(args)
+        with lock:
+            calls["running"] += 1
+            calls["peak"] = max(calls["peak"], calls["running"])
+        time.sleep(0.05)
+        with lock:
+            calls["running"] -= 1
+        if any(device in args for device in calls["fail"]):
+            return subprocess.CompletedProcess(args, 1, b"", b"dd: No space left\n")
+        return subprocess.CompletedProcess(args, 0, b"", b"")
+
+    monkeypatch.setattr(prefault.subprocess, "run", run)
+    monkeypatch.setattr(prefault, "SYS_BLOCK", str(tmp_path))
+    yield calls
+
+
+class TestPrefault:
+    """
+    Tests prefaulting the pages of the devices
+    """
+
+    def test_prefault_devices_in_parallel(self, dd):
+        devices = ["/dev/ram0", "/dev/ram1", "/dev/ram2"]
+        results = prefault.prefault_devices(devices)
+        assert dd["peak"] == 3
+        assert [result.device for result in results] == devices
+        assert all(result.size == 1024**3 for result in results)
+        assert all(result.rate > 0 for result in results)
+        assert dd["commands"][0][-2:] == ["prefault", "ram0"]
+
+    def test_prefault_devices_on_numa_node(self, dd):
+        node = NUMANode(1, [4, 5], 1024, 1024)
+        prefault.prefault_devices(["/dev/ram0", "/dev/ram1"], {"/dev/ram1": node})
+        commands = sorted(command[-3:] for command in dd["commands"])
+        assert commands[0][-2:] == ["prefault", "ram0"]
+        assert commands[1] == ["prefault", "ram1", "1"]
+
+    def test_prefault_devices_failure(self, dd):
+        dd["fail"] = {"ram1"}
+        with pytest.raises(DeviceCreationError, match="/dev/ram1: dd: No space left"):
+            prefault.prefault_devices(["/dev/ram0", "/dev/ram1"])
+
+    def test_prefault_command_allowed_by_sudoers(self, dd, sudoers):
+        node = NUMANode(1, [4, 5], 1024, 1024)
+        prefault.prefault_devices(["/dev/ram0", "/dev/ram1"], {"/dev/ram1": node})
+        helper = ["/usr/bin/python3", "-I", "-m", "distrax.utils.privileged"]
+        for command in dd["commands"]:
+            # sudo runs the interpreter distrax is installed into, as in sudoers
+            assert command[:2] == ["sudo", "-n"]
+            assert sudoers.allows(["/usr/bin/python3"] + command[3:])
+        assert sudoers.allows(helper + ["prefault", "loop3"])
+        assert sudoers.allows(helper)
+        assert not sudoers.allows(helper + ["prefault", "sda"])
+        assert not sudoers.allows(helper + ["serve"])
@@ -0,0 +1,92 @@
+import pytest
+
+import distrax.devices.queue as queue
+from distrax.exceptions.exceptions import DeviceCreationError
+
+DEFAULTS = {
+    "scheduler": "[mq-deadline] none",
+    "nomerges": "0",
+    "read_ahead_kb": "128",
+    "iostats": "1",
+    "rq_affinity": "1",
+}
+
+
+@pytest.fixture()
+def sysfs(monkeypatch, tmp_path):
+    """
+    A fake block sysfs with two devices, writes through the helper are applied
+    """
+    calls = {"written": [], "ignore": set()}
+    for name in ["ram0", "ram1"]:
+        folder = tmp_path / name / "queue"
+        folder.mkdir(parents=True)
+        for setting, value in DEFAULTS.items():
+            (folder / setting).write_text(f"{value}\n")
+
+    def write_setting(device, name, value, admin=False):
+        path = str(tmp_path / device / name)
+        calls["written"].append((path, value))
+        if name.split("/")[-1] not in calls["ignore"]:
+            if name.endswith("scheduler"):
+                value = " ".join(
+                    f"[{option}]" if option == value else option
+                    for option in ["mq-deadline", "none"]
+                )
+            with open(path, "w") as file:
+                file.write(f"{value}\n")
+        return True
+
+    monkeypatch.setattr(queue.fileio, "write_setting", write_setting)
+    monkeypatch.setattr(queue, "SYS_BLOCK", str(tmp_path))
+    monkeypatch.setattr(queue, "STATE_FILE", str(tmp_path / "state"))
+    yield calls
+
+
+class TestQueue:
+    """
+    Tests the tuning of the block queues of the devices
+    """
+
+    def test_tune_devices(self, sysfs):
+        queue.tune_devices(["/dev/ram0", "/dev/ram1"], "ram")
+        for device in ["/dev/ram0", "/dev/ram1"]:
+            for name, value in queue.PROFILES["ram"].items():
+                assert queue.read_setting(device, name) == value
+
+    def test_tune_devices_skips_missing_settings(self, sysfs, tmp_path):
+        (tmp_path / "ram0" / "queue" / "scheduler").unlink()
+        queue.tune_devices(["/dev/ram0"], "ram")
+        assert queue.read_setting("/dev/ram0", "nomerges") == "2"
+        assert all("scheduler" not in path for path, _ in sysfs["written"])
+
+    def test_tune_devices_verifies(self, sysfs):
+        sysfs["ignore"] = {"rq_affinity"}
+        with pytest.raises(DeviceCreationError, match="/dev/ram0 rq_affinity=2"):
+            queue.tune_devices(["/dev/ram0"], "ram")
+
+    def test_restore_devices(self, sysfs):
+        queue.tune_devices(["/dev/ram0", "/dev/ram1"], "ram")
+        queue.restore_devices()
+        assert queue.read_setting("/dev/ram1", "scheduler") == "mq-deadline"
+        assert queue.read_setting("/dev/ram1", "read_ahead_kb") == "128"
+        # Nothing is restored twice
+        written = len(sysfs["written"])
+        queue.restore_devices()
+        assert len(sysfs["written"]) == written
+
+    def test_restore_devices_only_restores_queue_settings(self, sysfs):
+        queue.write_state(
+            queue.STATE_FILE,
+            '{"/dev/ram0": {"nomerges": "1", "../../etc/x": "1"}, "/dev/sda": {}}',
+        )
+        queue.restore_devices()
+        assert sysfs["written"] == [(f"{queue.SYS_BLOCK}/ram0/queue/nomerges", "1")]
+
+    def test_default_profile_changes_nothing(self, sysfs):
+        queue.tune_devices(["/dev/ram0"], "default")
+        assert sysfs["written"] == []
+
+    def test_unknown_profile(self, sysfs):
+        with pytest.raises(ValueError):
+            queue.tune_devices(["/dev/ram0"], "ssd")
@@ -0,0 +1,90 @@
+import json
+import subprocess
+
+import pytest
+
+import distrax.devices.reclaim as reclaim
+
+
+@pytest.fixture()
+def discard(monkeypatch, tmp_path):
+    """
+    Replaces blkdiscard and ceph-volume, each discard frees 1GiB of memory
+    """
+    calls = {
+        "discarded": [],
+        "raw": set(),
+        "fail": set(),
+        "unlisted": {},
+        "free": 1024**2,
+    }
+    for name in ["ram0", "ram1", "ram2"]:
+        (tmp_path / name / "holders").mkdir(parents=True)
+
+    def run(args, **kwargs):
+        device = args[-1] if args[1] == "blkdiscard" else args[4]
+        if args[1] == "ceph-volume" and device in calls["unlisted"]:
+            returncode, output, error = calls["unlisted"][device]
+            return subprocess.CompletedProcess(args, returncode, output, error)
+        if args[1] == "ceph-volume":
+            listing = {"uuid": {"device": device}} if device in calls["raw"] else {}
+            return subprocess.CompletedProcess(
+                args, 0, json.dumps(listing).encode(), b""
+            )
+        if device in calls["fail"]:
+            return subprocess.CompletedProcess(args, 1, b"", b"Operation not supported")
+        calls["discarded"].append(device)
+        calls["free"] += 1024**2
+        return subprocess.CompletedProcess(args, 0, b"", b"")
+
+    monkeypatch.setattr(reclaim.subprocess, "run", run)
+    monkeypatch.setattr(reclaim, "SYS_BLOCK", str(tmp_path))
+    monkeypatch.setattr(reclaim, "meminfo", lambda: {"MemFree": calls["free"]})
+    calls["block"] = tmp_path
+    yield calls
+
+
+class TestReclaim:
+    """
+    Tests reclaiming the memory of the devices
+    """
+
+    def test_reclaim_devices(self, discard):
+        result = reclaim.reclaim_devices(["/dev/ram0", "/dev/ram1"])
+        assert result.discarded == ["/dev/ram0", "/dev/ram1"]
+        assert result.skipped == []
+        assert result.freed == 2 * 1024**2
+
+    def test_reclaim_skips_devices_in_use(self, discard):
+        (discard["block"] / "ram0" / "holders" / "dm-0").touch()
+        discard["raw"] = {"/dev/ram1"}
+        result = reclaim.reclaim_devices(["/dev/ram0", "/dev/ram1", "/dev/ram2"])
+        assert discard["discarded"] == ["/dev/ram2"]
+        assert result.skipped == ["/dev/ram0", "/dev/ram1"]
+        assert result.freed == 1024**2
+
+    def test_reclaim_failure_is_skipped(self, discard):
+        discard["fail"] = {"/dev/ram0"}
+        result = reclaim.reclaim_devices(["/dev/ram0"])
+        assert result.skipped == ["/dev/ram0"]
+        assert result.freed == 0
+        assert "Skipped: /dev/ram0" in result.describe()
+
+    def test_reclaim_skips_devices_without_discard(self, discard):
+        queue = discard["block"] / "ram0" / "queue"
+        queue.mkdir()
+        (queue / "discard_max_bytes").write_text("0\n")
+        result = reclaim.reclaim_devices(["/dev/ram0"])
+        assert discard["discarded"] == []
+        assert result.skipped == ["/dev/ram0"]
+        assert reclaim.NOTHING_RECLAIMED in result.describe()
+
+    def test_reclaim_skips_devices_that_cannot_be_listed(self, discard):
+        discard["unlisted"] = {
+            "/dev/ram0": (1, b"", b"sudo: a password is required\n"),
+            "/dev/ram1": (0, b"not json", b""),
+        }
+        result = reclaim.reclaim_devices(["/dev/ram0", "/dev/ram1", "/dev/ram2"])
+        # Discarding destroys the data so is not done when it cannot be told
+        assert discard["discarded"] == ["/dev/ram2"]
+        assert result.skipped == ["/dev/ram0", "/dev/ram1"]
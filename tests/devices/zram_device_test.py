@@ -0,0 +1,100 @@
+import shutil
+import subprocess
+
+import pytest
+
+import distrax.devices.zram_device as zram_device
+from distrax.exceptions.exceptions import DeviceCreationError
+
+
+@pytest.fixture()
+def zram(monkeypatch, tmp_path):
+    """
+    A fake zram sysfs, with zram0 already used by the host, driven through sudo
+    and the helper
+    """
+    control = tmp_path / "class" / "zram-control"
+    block = tmp_path / "block"
+    control.mkdir(parents=True)
+    (block / "zram0").mkdir(parents=True)
+    calls = {"commands": [], "fail": None}
+
+    def run(args, input=None, **kwargs):
+        calls["commands"].append(args)
+        if args[1] == "cat":
+            device_id = len(list(block.iterdir()))
+            (block / f"zram{device_id}").mkdir()
+            return subprocess.CompletedProcess(args, 0, f"{device_id}\n".encode(), b"")
+        return subprocess.CompletedProcess(args, 0, b"", b"")
+
+    def write_setting(device, name, value, admin=False):
+        calls["commands"].append(["write_setting", device, name, value])
+        if f"{device}/{name}" == calls["fail"]:
+            return False
+        if name == "hot_remove":
+            shutil.rmtree(block / f"zram{value}")
+        else:
+            (block / device / name).write_text(value)
+        return True
+
+    monkeypatch.setattr(zram_device.subprocess, "run", run)
+    monkeypatch.setattr(zram_device.fileio, "write_setting", write_setting)
+    monkeypatch.setattr(zram_device, "ZRAM_CONTROL", str(control))
+    monkeypatch.setattr(zram_device, "SYS_BLOCK", str(block))
+    monkeypatch.setattr(zram_device, "available_memory", lambda: 1024**3)
+    calls["block"] = block
+    calls["state"] = str(tmp_path / "state")
+    yield calls
+
+
+class TestZRAMDevice:
+    """
+    Tests the creation and removal of zram devices
+    """
+
+    def test_create_device(self, zram):
+        device = zram_device.ZRAMDevice("zstd", streams=4, state_file=zram["state"])
+        device.create_device(size=2, number=2)
+        assert device.get_paths(2) == ["/dev/zram1", "/dev/zram2"]
+        for name in ["zram1", "zram2"]:
+            folder = zram["block"] / name
+            assert (folder / "comp_algorithm").read_text() == "zstd"
+            assert (folder / "max_comp_streams").read_text() == "4"
+            assert (folder / "disksize").read_text() == "2G"
+        steps = [command[2].split("/")[-1] for command in zram["commands"][1:4]]
+        assert steps == ["hot_add", "comp_algorithm", "max_comp_streams"]
+
+    def test_create_device_exists(self, zram):
+        device = zram_device.ZRAMDevice(state_file=zram["state"])
+        device.create_device(size=1, number=1)
+        with pytest.raises(DeviceCreationError):
+            device.create_device(size=1, number=1)
+
+    def test_create_device_failure_removes_devices(self, zram):
+        zram["fail"] = "zram2/disksize"
+        device = zram_device.ZRAMDevice(state_file=zram["state"])
+        with pytest.raises(DeviceCreationError, match="disksize of /dev/zram2"):
+            device.create_device(size=1, number=3)
+        assert sorted(path.name for path in zram["block"].iterdir()) == ["zram0"]
+        assert device.get_paths(3) == []
+
+    def test_remove_device_leaves_other_devices(self, zram):
+        device = zram_device.ZRAMDevice(state_file=zram["state"])
+        device.create_device(size=1, number=2)
+        device.remove_device()
+        assert sorted(path.name for path in zram["block"].iterdir()) == ["zram0"]
+        assert ["sudo", "rmmod", "zram"] not in zram["commands"]
+
+    def test_stats(self, zram):
+        device = zram_device.ZRAMDevice(state_file=zram["state"])
+        device.create_device(size=1, number=1)
+        (zram["block"] / "zram1" / "mm_stat").write_text(
+            "  3000000  1000000  1048576        0  1048576        0        0\n"
+        )
+        stats = device.stats()
+        assert stats == [zram_device.ZRAMStats("/dev/zram1", 3000000, 1000000, 1048576)]
+        assert stats[0].ratio == 3.0
+
+    def test_unknown_algorithm(self):
+        with pytest.raises(ValueError):
+            zram_device.ZRAMDevice(algorithm="gzip")
@@ -0,0 +1,187 @@
+import json
+import subprocess
+import threading
+import time
+
+import pytest
+
+import distrax.osds.ceph_osd as ceph_osd
+from distrax.exceptions.exceptions import OSDCreationError
+
+
+@pytest.fixture()
+def volume(monkeypatch):
+    """
+    Replaces ceph-volume and the host preparation, recording the peak concurrency
+    """
+    calls = {"running": 0, "peak": 0, "fail": set(), "commands": [], "started": []}
+    lock = threading.Lock()
+
+    def run(args, **kwargs):
+        calls["commands"].append(args)
+        device = next(arg for arg in args if arg.startswith("/dev/"))
+        if "list" in args:
+            listing = {"uuid": {"device": device, "osd_id": int(device[-1])}}
+            return subprocess.CompletedProcess(
+                args, 0, json.dumps(listing).encode(), b""
+            )
+        with lock:
+            calls["running"] += 1
+            calls["peak"] = max(calls["peak"], calls["running"])
+        time.sleep(0.05)
+        with lock:
+            calls["running"] -= 1
+        if device in calls["fail"]:
+            return subprocess.CompletedProcess(
+                args, 1, b"", b"--> RuntimeError: busy\n"
+            )
+        return subprocess.CompletedProcess(args, 0, b"", b"")
+
+    monkeypatch.setattr(ceph_osd.subprocess, "run", run)
+    monkeypatch.setattr(ceph_osd.fileio, "create_dir", lambda *a, **k: None)
+    monkeypatch.setattr(ceph_osd.fileio, "copy_file", lambda *a, **k: None)
+    monkeypatch.setattr(ceph_osd.system, "start_service", calls["started"].append)
+    yield calls
+
+
+class TestCephOSD:
+    """
+    Tests the provisioning of Ceph OSDs
+    """
+
+    def test_create_osds_bounded_concurrency(self, volume):
+        osd = ceph_osd.CephOSD()
+        devices = [f"/dev/ram{number}" for number in range(6)]
+        osd.create_osds(devices, workers=3)
+        assert volume["peak"] == 3
+        assert [result.device for result in osd.results] == devices
+        assert all(result.returncode == 0 for result in osd.results)
+        assert all(result.duration > 0 for result in osd.results)
+
+    def test_create_osds_sequential_by_default(self, volume):
+        osd = ceph_osd.CephOSD()
+        osd.create_osds(["/dev/ram0", "/dev/ram1"])
+        assert volume["peak"] == 1
+
+    def test_create_osds_reports_failures(self, volume):
+        volume["fail"] = {"/dev/ram1"}
+        osd = ceph_osd.CephOSD()
+        with pytest.raises(OSDCreationError, match="/dev/ram1: --> RuntimeError"):
+            osd.create_osds(["/dev/ram0", "/dev/ram1", "/dev/ram2"], workers=3)
+        assert [result.returncode for result in osd.results] == [0, 1, 0]
+
+    def test_create_osds_raw_mode(self, volume):
+        osd = ceph_osd.CephOSD(mode="raw")
+        osd.create_osds(["/dev/ram0", "/dev/ram1"], workers=2)
+        steps = [command[2:4] for command in volume["commands"]]
+        assert steps.count(["raw", "prepare"]) == 2
+        assert steps.count(["raw", "activate"]) == 2
+        assert ["lvm", "create"] not in steps
+        assert sorted(volume["started"]) == ["ceph-osd@0", "ceph-osd@1"]
+
+    def test_remove_osds_raw_mode_skips_volumes(self, volume, monkeypatch):
+        monkeypatch.setattr(ceph_osd.glob, "glob", lambda pattern: [])
+        monkeypatch.setattr(ceph_osd.system, "stop_service", lambda service: None)
+        monkeypatch.setattr(ceph_osd.system, "stop_services", lambda services: None)
+        monkeypatch.setattr(ceph_osd.system, "disable_services", lambda services: None)
+        monkeypatch.setattr(ceph_osd.fileio, "remove_dir", lambda *a, **k: None)
+        zapped = []
+        monkeypatch.setattr(
+            ceph_osd.CephOSD, "_zap_volumes", staticmethod(lambda: zapped.append(1))
+        )
+        ceph_osd.CephOSD(mode="raw").remove_osds()
+        assert zapped == []
+        ceph_osd.CephOSD(mode="lvm").remove_osds()
+        assert zapped == [1]
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            ceph_osd.CephOSD(mode="zfs")
+
+    def test_remove_osds_fast_teardown(self, monkeypatch):
+        osd_dirs = [f"{ceph_osd.ceph.VAR_OSD_ID}{number}" for number in range(3)]
+        monkeypatch.setattr(
+            ceph_osd.glob,
+            "glob",
+            lambda pattern: (
+                osd_dirs if pattern.startswith(ceph_osd.ceph.VAR_OSD_ID) else []
+            ),
+        )
+        commands, stopped, marked = [], [], []
+        monkeypatch.setattr(
+            ceph_osd.ceph,
+            "mon_command",
+            lambda command, timeout: marked.append(command),
+        )
+        monkeypatch.setattr(ceph_osd.system, "stop_services", stopped.append)
+        monkeypatch.setattr(ceph_osd.system, "stop_service", lambda service: None)
+        monkeypatch.setattr(ceph_osd.system, "disable_services", lambda services: None)
+        monkeypatch.setattr(ceph_osd.fileio, "remove_dir", lambda *a, **k: None)
+        monkeypatch.setattr(ceph_osd.fileio, "remove_file", lambda *a, **k: None)
+        monkeypatch.setattr(ceph_osd.time, "sleep", lambda seconds: None)
+        pvs = b"  PV,VG\n  /dev/ram0,ceph-a\n  /dev/ram1,ceph-b\n  /dev/sda2,root\n"
+        dmsetup = b"ceph--a-osd--block--1\t(253:0)\nroot-home\t(253:1)\n"
+
+        def run(args, **kwargs):
+            commands.append(args)
+            if args[1] == "pvs":
+                return subprocess.CompletedProcess(args, 0, pvs, b"")
+            if args[1:3] == ["dmsetup", "ls"]:
+                return subprocess.CompletedProcess(args, 0, dmsetup, b"")
+            # The volume groups are busy until the device mapper tables are removed
+            busy = args[1] == "vgremove" and ["sudo", "dmsetup"] not in [
+                command[:2] for command in commands
+            ]
+            return subprocess.CompletedProcess(args, int(busy), b"", b"")
+
+        monkeypatch.setattr(ceph_osd.subprocess, "run", run)
+        ceph_osd.CephOSD(teardown="fast").remove_osds()
+        assert marked == [{"prefix": "osd out", "ids": ["0", "1", "2"]}]
+        assert len(stopped) == 1
+        assert stopped[0][:3] == ["ceph-osd@0", "ceph-osd@1", "ceph-osd@2"]
+        assert stopped[0][-3:] == ceph_osd.OSD_UNITS
+        assert not any("zap" in command for command in commands)
+        assert ["sudo", "dmsetup", "remove", "--force", "ceph--a-osd--block--1"] in (
+            commands
+        )
+        vgremove = ["sudo", "vgremove", "--force", "--yes", "ceph-a", "ceph-b"]
+        assert commands.count(vgremove) == 2
+        assert ["sudo", "pvremove", "--force", "--yes", "/dev/ram0", "/dev/ram1"] in (
+            commands
+        )
+
+    def test_retry_is_bounded(self, monkeypatch):
+        attempts = []
+        monkeypatch.setattr(ceph_osd.time, "sleep", lambda seconds: None)
+        monkeypatch.setattr(
+            ceph_osd.subprocess,
+            "run",
+            lambda args, **kwargs: attempts.append(args)
+            or subprocess.CompletedProcess(args, 5, b"", b""),
+        )
+        assert ceph_osd.CephOSD._retry(["sudo", "false"]) is False
+        assert len(attempts) == ceph_osd.RETRIES
+
+    def test_unknown_teardown(self):
+        with pytest.raises(ValueError):
+            ceph_osd.CephOSD(teardown="slow")
+
+    def test_wait_for_local_osds(self, monkeypatch):
+        osd_dirs = [f"{ceph_osd.ceph.VAR_OSD_ID}{number}" for number in range(2)]
+        monkeypatch.setattr(ceph_osd.glob, "glob", lambda pattern: osd_dirs)
+        waited = []
+
+        def wait_for_daemons(names, timeout):
+            waited.append(names)
+            if error is not None:
+                raise error
+
+        monkeypatch.setattr(ceph_osd.readiness, "wait_for_daemons", wait_for_daemons)
+        error = None
+        assert ceph_osd.CephOSD().wait_for_local_osds(timeout=1) is True
+        assert waited == [["osd.0", "osd.1"]]
+        # The admin sockets cannot be used, the monitors are relied on instead
+        error = PermissionError("Permission denied")
+        assert ceph_osd.CephOSD().wait_for_local_osds(timeout=1) is True
+        error = TimeoutError("Daemons not ready, waiting on: osd.1")
+        assert ceph_osd.CephOSD().wait_for_local_osds(timeout=1) is False
@@ -0,0 +1,60 @@
+import itertools
+import subprocess
+
+import pytest
+
+import distrax.osds.memstore_osd as memstore_osd
+from distrax.exceptions.exceptions import NotEnoughMemoryError
+from distrax.utils.transport import CommandResult
+
+
+@pytest.fixture()
+def host(monkeypatch, canned_transport):
+    """
+    Replaces the host commands and answers the monitor commands for new OSDs
+    """
+    ids = itertools.count()
+    started = []
+    canned_transport.responses = {
+        "config set": "",
+        "osd new": lambda cmd: CommandResult(0, f'{{"osdid": {next(ids)}}}', ""),
+        "auth get-or-create": "[osd.0]\n\tkey = AQ==\n",
+    }
+    monkeypatch.setattr(memstore_osd.system, "available_memory", lambda: 4 * 1024**2)
+    monkeypatch.setattr(memstore_osd.system, "start_service", started.append)
+    for name in ["create_dir", "copy_file", "recursive_change_ownership"]:
+        monkeypatch.setattr(memstore_osd.fileio, name, lambda *a, **k: True)
+    monkeypatch.setattr(
+        memstore_osd.subprocess,
+        "run",
+        lambda args, **kwargs: subprocess.CompletedProcess(args, 0, b"", b""),
+    )
+    canned_transport.started = started
+    yield canned_transport
+
+
+class TestMemstoreOSD:
+    """
+    Tests the creation of memstore OSDs without block devices
+    """
+
+    def test_create_osds(self, host, tmp_path):
+        osd = memstore_osd.MemstoreOSD(folder=str(tmp_path), size=1)
+        osd.create_osds(osd.get_names(2), workers=2)
+        assert sorted(host.started) == ["ceph-osd@0", "ceph-osd@1"]
+        assert all(result.returncode == 0 for result in osd.results)
+        settings = {
+            cmd["name"]: cmd["value"]
+            for cmd in host.commands
+            if cmd["prefix"] == "config set"
+        }
+        assert settings == {
+            "osd_objectstore": "memstore",
+            "memstore_device_bytes": str(1024**3),
+        }
+
+    def test_create_osds_checks_free_memory(self, host, tmp_path):
+        osd = memstore_osd.MemstoreOSD(folder=str(tmp_path), size=3)
+        with pytest.raises(NotEnoughMemoryError):
+            osd.create_osds(osd.get_names(2))
+        assert host.started == []
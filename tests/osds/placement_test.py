@@ -0,0 +1,113 @@
+import json
+import subprocess
+
+import pytest
+
+import distrax.osds.ceph_osd as ceph_osd
+from distrax.osds import placement
+from distrax.utils.resources import NUMANode
+
+
+def write(root, path, content):
+    file = root / path
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_text(content)
+
+
+@pytest.fixture()
+def sysfs(tmp_path):
+    """
+    A fake sysfs of a dual socket host
+    """
+    for node, cpus in [(0, "0-3"), (1, "4-7")]:
+        folder = f"sys/devices/system/node/node{node}"
+        write(tmp_path, f"{folder}/cpulist", f"{cpus}\n")
+        write(tmp_path, f"{folder}/meminfo", f"Node {node} MemTotal: 1024 kB\n")
+    yield tmp_path
+
+
+@pytest.fixture()
+def bound(monkeypatch):
+    """
+    Replaces ceph-volume and systemd, recording the OSDs bound to each node
+    """
+    calls = {"bound": {}, "started": [], "restarted": []}
+
+    def run(args, **kwargs):
+        device = next(arg for arg in args if arg.startswith("/dev/"))
+        osd_id = int(device[-1])
+        if args[2:4] == ["raw", "list"]:
+            listing = {"uuid": {"device": device, "osd_id": osd_id}}
+        elif args[2:4] == ["lvm", "list"]:
+            listing = {str(osd_id): [{"devices": [device]}]}
+        else:
+            listing = {}
+        return subprocess.CompletedProcess(args, 0, json.dumps(listing).encode(), b"")
+
+    def bind_osd(osd_id, node):
+        calls["bound"][osd_id] = node.id
+        return True
+
+    monkeypatch.setattr(ceph_osd.subprocess, "run", run)
+    monkeypatch.setattr(ceph_osd.fileio, "create_dir", lambda *a, **k: None)
+    monkeypatch.setattr(ceph_osd.fileio, "copy_file", lambda *a, **k: None)
+    monkeypatch.setattr(ceph_osd.system, "start_service", calls["started"].append)
+    monkeypatch.setattr(ceph_osd.system, "restart_service", calls["restarted"].append)
+    monkeypatch.setattr(ceph_osd.numa, "bind_osd", bind_osd)
+    yield calls
+
+
+class TestPlacement:
+    """
+    Tests the NUMA placement of the OSDs
+    """
+
+    def test_place_devices_contiguous_blocks(self, sysfs):
+        devices = [f"/dev/ram{number}" for number in range(4)]
+        layout = placement.place_devices(devices, root=str(sysfs))
+        assert [layout[device].id for device in devices] == [0, 0, 1, 1]
+        assert layout["/dev/ram3"].cpus == [4, 5, 6, 7]
+
+    def test_place_devices_uneven(self, sysfs):
+        devices = [f"/dev/ram{number}" for number in range(3)]
+        layout = placement.place_devices(devices, root=str(sysfs))
+        assert [layout[device].id for device in devices] == [0, 0, 1]
+
+    def test_place_devices_single_node(self, sysfs):
+        write(sysfs, "sys/devices/system/node/node1/cpulist", "\n")
+        assert placement.place_devices(["/dev/ram0"], root=str(sysfs)) == {}
+
+    def test_place_devices_no_numa(self, tmp_path):
+        assert placement.place_devices(["/dev/ram0"], root=str(tmp_path)) == {}
+
+    def test_drop_in(self):
+        content = placement.drop_in(NUMANode(1, [4, 5, 6, 7], 1024, 1024))
+        assert content.splitlines() == [
+            "[Service]",
+            "CPUAffinity=4 5 6 7",
+            "NUMAPolicy=bind",
+            "NUMAMask=1",
+        ]
+
+    def test_create_osds_raw_binds_before_start(self, sysfs, bound):
+        devices = ["/dev/ram0", "/dev/ram1"]
+        layout = placement.place_devices(devices, root=str(sysfs))
+        osd = ceph_osd.CephOSD(mode="raw")
+        osd.create_osds(devices, workers=2, placement=layout)
+        assert bound["bound"] == {"0": 0, "1": 1}
+        assert sorted(bound["started"]) == ["ceph-osd@0", "ceph-osd@1"]
+        assert bound["restarted"] == []
+
+    def test_create_osds_lvm_restarts_bound(self, sysfs, bound):
+        devices = ["/dev/ram0", "/dev/ram1"]
+        layout = placement.place_devices(devices, root=str(sysfs))
+        osd = ceph_osd.CephOSD()
+        osd.create_osds(devices, workers=2, placement=layout)
+        assert bound["bound"] == {"0": 0, "1": 1}
+        assert sorted(bound["restarted"]) == ["ceph-osd@0", "ceph-osd@1"]
+
+    def test_create_osds_without_placement(self, bound):
+        osd = ceph_osd.CephOSD()
+        osd.create_osds(["/dev/ram0"])
+        assert bound["bound"] == {}
+        assert bound["restarted"] == []
@@ -0,0 +1,60 @@
+import configparser
+
+import pytest
+
+from distrax.mons.ceph_mon import CephMON
+from distrax.osds import tuning
+
+GiB_IN_KiB = 1024**2
+
+
+class TestTuning:
+    """
+    Tests the OSD tuning profiles
+    """
+
+    def test_default_profile_has_no_options(self):
+        resources = tuning.HostResources(1, 1, 8 * GiB_IN_KiB)
+        assert tuning.profile_options("default", resources) == {}
+
+    def test_ram_profile_memory_target(self):
+        # 64GiB host with 4 OSDs of 4GiB leaves 48GiB, half shared by 4 OSDs
+        options = tuning.ram_profile(tuning.HostResources(4, 4, 64 * GiB_IN_KiB))
+        assert options["osd memory target"] == str(tuning.MAX_OSD_MEMORY_TARGET)
+        options = tuning.ram_profile(tuning.HostResources(2, 4, 16 * GiB_IN_KiB))
+        assert options["osd memory target"] == str(1024**3)
+        # A host full of devices is floored at the ceph minimum
+        options = tuning.ram_profile(tuning.HostResources(8, 2, 16 * GiB_IN_KiB))
+        assert options["osd memory target"] == str(tuning.MIN_OSD_MEMORY_TARGET)
+        assert options["bluestore csum type"] == "none"
+        assert options["bdev enable discard"] == "true"
+        assert options["debug bluestore"] == "0/0"
+
+    def test_overrides(self):
+        options = tuning.profile_options(
+            "ram",
+            tuning.HostResources(1, 1, 8 * GiB_IN_KiB),
+            {"debug_osd": "1/5", "osd op num shards": "2"},
+        )
+        assert options["debug osd"] == "1/5"
+        assert "debug_osd" not in options
+        assert options["osd op num shards"] == "2"
+
+    def test_osd_memory_target(self):
+        resources = tuning.HostResources(3, 8, 64 * GiB_IN_KiB)
+        assert tuning.osd_memory_target("default", resources) == 4 * 1024**3
+        assert tuning.osd_memory_target("ram", resources) == 2.5 * 1024**3
+        overrides = {"osd_memory_target": str(1024**3)}
+        assert tuning.osd_memory_target("default", resources, overrides) == 1024**3
+
+    def test_unknown_profile(self):
+        with pytest.raises(ValueError):
+            tuning.profile_options("hdd", tuning.HostResources(1, 1, GiB_IN_KiB))
+
+    def test_options_written_to_config(self, tmp_path):
+        mon = CephMON(folder=str(tmp_path), osd_options={"debug osd": "0/0"})
+        mon._write_config_file()
+        config = configparser.ConfigParser()
+        config.read(tmp_path / "ceph.conf")
+        assert config["osd"]["debug osd"] == "0/0"
+        assert config["global"]["osd pool default size"] == "1"
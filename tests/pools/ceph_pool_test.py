@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+import distrax.pools.ceph_pool as ceph_pool
+from distrax.exceptions.exceptions import PoolCreationError
+from distrax.pools.abstract_pool import PoolSpec
+from distrax.pools.ceph_pool import CephPool
+from distrax.utils.transport import CommandResult
+
+
+def status(clean_pgs, num_pgs, num_pools):
+    return {
+        "osdmap": {"num_osds": 4, "num_up_osds": 4, "num_in_osds": 4},
+        "pgmap": {
+            "pgs_by_state": [{"state_name": "active+clean", "count": clean_pgs}],
+            "num_pgs": num_pgs,
+            "num_pools": num_pools,
+            "num_objects": 0,
+            "data_bytes": 0,
+            "bytes_used": 0,
+            "bytes_avail": 0,
+            "bytes_total": 0,
+        },
+    }
+
+
+class TestCephPool:
+    """
+    Tests the creation of Ceph Pools against a canned cluster
+    """
+
+    def test_create_pools_submits_all_before_waiting(self, canned_transport):
+        created = []
+
+        def create(cmd):
+            created.append(cmd["pg_num"])
+            total = 1 + sum(created)
+            canned_transport.responses["status"] = status(total, total, 1)
+            return CommandResult(0, "", "")
+
+        canned_transport.responses = {
+            "status": status(1, 1, 1),
+            "osd pool create": create,
+        }
+        CephPool.create_pools(
+            [PoolSpec("cephfs_data", 0.9), PoolSpec("cephfs_metadata", 0.1)],
+            timeout=5,
+        )
+        prefixes = canned_transport.prefixes()
+        assert prefixes.count("osd pool create") == 2
+        # Both pools are submitted before the cluster is checked again
+        assert prefixes[1:3] == ["osd pool create", "osd pool create"]
+        assert prefixes.count("status") == 2
+
+    def test_create_pools_reports_failures(self, canned_transport):
+        canned_transport.responses = {
+            "status": status(1, 1, 1),
+            "osd pool create": lambda cmd: CommandResult(1, "", "EEXIST"),
+        }
+        with pytest.raises(PoolCreationError, match="distrax: EEXIST"):
+            CephPool.create_pools([PoolSpec("distrax", 1.0)], timeout=1)
+
+    def test_remove_pools_concurrently_without_purge(
+        self, canned_transport, monkeypatch
+    ):
+        lock = threading.Lock()
+        running = {"now": 0, "peak": 0}
+
+        def delete(cmd):
+            with lock:
+                running["now"] += 1
+                running["peak"] = max(running["peak"], running["now"])
+            time.sleep(0.05)
+            with lock:
+                running["now"] -= 1
+            if cmd["pool"] == "busy":
+                return CommandResult(16, "", "EBUSY\n")
+            return CommandResult(0, "", "")
+
+        purged = []
+        monkeypatch.setattr(
+            ceph_pool.subprocess, "run", lambda args, **kwargs: purged.append(args)
+        )
+        names = [".mgr", "cephfs_data", "cephfs_metadata", "busy"]
+        canned_transport.responses = {
+            "osd lspools": [
+                {"poolnum": number, "poolname": name}
+                for number, name in enumerate(names)
+            ],
+            "osd pool delete": delete,
+        }
+        results = CephPool.remove_pools(workers=4)
+        assert running["peak"] == 4
+        assert purged == []
+        assert [result.name for result in results] == names
+        assert [result.returncode for result in results] == [0, 0, 0, 16]
+        assert results[3].error == "EBUSY"
+        assert all(result.duration > 0 for result in results)
+
+    def test_remove_pools_purge(self, canned_transport, monkeypatch):
+        purged = []
+        monkeypatch.setattr(
+            ceph_pool.subprocess, "run", lambda args, **kwargs: purged.append(args[2])
+        )
+        canned_transport.responses = {
+            "osd lspools": [{"poolnum": 1, "poolname": "distrax"}],
+            "osd pool delete": "",
+        }
+        CephPool.remove_pools(purge=True)
+        assert purged == ["distrax"]
@@ -0,0 +1,61 @@
+import pytest
+
+from distrax.exceptions.exceptions import PoolCreationError
+from distrax.pools import pg_planner
+from distrax.pools.abstract_pool import PoolSpec
+
+GATEWAY_POOLS = [
+    PoolSpec(".rgw.root", 0.05),
+    PoolSpec("default.rgw.control", 0.02),
+    PoolSpec("default.rgw.meta", 0.02),
+    PoolSpec("default.rgw.log", 0.02),
+    PoolSpec("default.rgw.buckets.index", 0.05),
+    PoolSpec("default.rgw.buckets.data", 0.84),
+]
+
+
+def is_power_of_two(value):
+    return value > 0 and value & (value - 1) == 0
+
+
+class TestPGPlanner:
+    """
+    Tests the placement group planner
+    """
+
+    def test_nearest_power_of_two(self):
+        assert pg_planner.nearest_power_of_two(0.2) == 1
+        assert pg_planner.nearest_power_of_two(100) == 128
+        assert pg_planner.nearest_power_of_two(70) == 64
+        assert pg_planner.nearest_power_of_two(64) == 64
+
+    def test_plan_shares_budget(self):
+        plan = pg_planner.plan_pgs(
+            [PoolSpec("cephfs_data", 0.9), PoolSpec("cephfs_metadata", 0.1)], 3
+        )
+        assert plan.pools == {"cephfs_data": 256, "cephfs_metadata": 32}
+        assert plan.total_pgs <= 3 * pg_planner.TARGET_PGS_PER_OSD
+
+    @pytest.mark.parametrize("num_osds", [1, 2, 3, 8, 16, 100])
+    def test_plan_respects_budget(self, num_osds):
+        plan = pg_planner.plan_pgs(GATEWAY_POOLS, num_osds, existing_pgs=1)
+        assert all(is_power_of_two(pgs) for pgs in plan.pools.values())
+        assert sum(plan.pools.values()) <= max(
+            num_osds * pg_planner.TARGET_PGS_PER_OSD - 1, len(GATEWAY_POOLS)
+        )
+        assert plan.pgs_per_osd <= pg_planner.MON_MAX_PG_PER_OSD
+        assert set(plan.pools) == {spec.name for spec in GATEWAY_POOLS}
+
+    def test_plan_respects_mon_limit(self):
+        plan = pg_planner.plan_pgs(
+            [PoolSpec("distrax", 1.0)], 2, existing_pgs=400, target_pgs_per_osd=500
+        )
+        assert plan.pgs_per_osd <= pg_planner.MON_MAX_PG_PER_OSD
+
+    def test_plan_refuses_full_cluster(self):
+        with pytest.raises(PoolCreationError):
+            pg_planner.plan_pgs(GATEWAY_POOLS, 1, existing_pgs=250)
+
+    def test_describe(self):
+        plan = pg_planner.plan_pgs([PoolSpec("distrax", 1.0)], 1, existing_pgs=1)
+        assert plan.describe() == "distrax: 64 PGs\n65 PGs across 1 OSDs, 65.0 per OSD"
@@ -1,3 +1,5 @@
+import errno
+import json
 import os
 import shutil
 
@@ -39,3 +41,133 @@ class TestCeph:
             assert key.readline() == "[mon.]\n"
             assert key.readline()  # Key-line which is unknown
             assert key.readline() == "caps mon = allow *\n"
+
+    def test_cluster_files(self, folder_resource, tmp_path):
+        ceph.create_admin_key(TEST_FOLDER)
+        ceph.create_osd_key(TEST_FOLDER)
+        with open(f"{TEST_FOLDER}/{ceph.CONFIG_FILE}", "w") as config:
+            config.write("[global]\n")
+        files = ceph.read_cluster_files(TEST_FOLDER)
+        assert sorted(files) == sorted(ceph.CLUSTER_FILES)
+        staging = tmp_path / "staging"
+        # An existing link is replaced rather than written through
+        staging.mkdir()
+        (staging / ceph.CONFIG_FILE).symlink_to(tmp_path / "target")
+        ceph.write_cluster_files(str(staging), files)
+        assert ceph.read_cluster_files(str(staging)) == files
+        assert not (tmp_path / "target").exists()
+        assert (staging / ceph.ADMIN_KEYRING).stat().st_mode & 0o777 == 0o600
+        with pytest.raises(ValueError):
+            ceph.write_cluster_files(str(staging), {"../ceph.conf": ""})
+
+
+STATUS = {
+    "osdmap": {"epoch": 5, "num_osds": 2, "num_up_osds": 2, "num_in_osds": 2},
+    "pgmap": {
+        "pgs_by_state": [{"state_name": "active+clean", "count": 33}],
+        "num_pgs": 33,
+        "num_pools": 2,
+        "num_objects": 0,
+        "data_bytes": 0,
+        "bytes_used": 0,
+        "bytes_avail": 0,
+        "bytes_total": 0,
+    },
+    "servicemap": {"services": {"rgw": {}}},
+    "fsmap": {"up": 1, "in": 1, "by_rank": [{"status": "up:active"}]},
+}
+
+
+@pytest.fixture()
+def status_resource(canned_transport):
+    """
+    Answers the cluster queries with a canned status and records the commands
+    """
+    canned_transport.responses = {
+        "status": STATUS,
+        "osd lspools": [{"poolnum": 1, "poolname": ".mgr"}],
+    }
+    yield canned_transport.commands
+
+
+class TestClusterStatus:
+    """
+    Tests the shared cluster status snapshot
+    """
+
+    def test_helpers_share_snapshot(self, status_resource):
+        assert ceph.osd_status()["num_osds"] == 2
+        assert ceph.pool_status()["num_pgs"] == 33
+        assert ceph.get_current_pg() == 33
+        assert ceph.rgw_status() is True
+        assert ceph.mds_status() is True
+        assert len(status_resource) == 1
+
+    def test_refresh_and_invalidate(self, status_resource):
+        ceph.pool_status()
+        ceph.pool_status(refresh=True)
+        assert len(status_resource) == 2
+        ceph.invalidate_status()
+        ceph.pool_status()
+        assert len(status_resource) == 3
+
+    def test_snapshot_expires(self, status_resource):
+        status = ceph.ClusterStatus(ttl=0.0)
+        status.get()
+        status.get()
+        assert len(status_resource) == 2
+
+    def test_unreachable_cluster_is_not_cached(self, canned_transport):
+        status = ceph.ClusterStatus(ttl=60.0)
+        assert status.get() == {}
+        assert status.is_stale() is True
+        assert ceph.cluster_exists() is False
+        assert ceph.lspools() == []
+
+    def test_commands_use_transport(self, status_resource):
+        assert ceph.lspools() == [{"poolnum": 1, "poolname": ".mgr"}]
+        assert ceph.cluster_exists() is True
+        assert status_resource[0] == {"prefix": "osd lspools", "format": "json"}
+
+
+class TestAdminSocket:
+    """
+    Tests the admin socket client against a stand-in daemon
+    """
+
+    def test_admin_command(self, admin_sockets):
+        server = admin_sockets("osd.0", {"status": {"state": "active"}})
+        result = ceph.admin_command("osd.0", {"prefix": "status"})
+        assert result.returncode == 0
+        assert json.loads(result.output) == {"state": "active"}
+        assert server.commands == [{"prefix": "status"}]
+
+    def test_admin_command_large_output(self, admin_sockets):
+        config = {f"option_{number}": "x" * 64 for number in range(2000)}
+        admin_sockets("osd.0", {"config show": config})
+        assert ceph.daemon_config("osd.0") == config
+
+    def test_admin_command_no_socket(self, admin_sockets):
+        result = ceph.admin_command("osd.9", {"prefix": "status"})
+        assert result.returncode == errno.ENOENT
+        assert ceph.daemon_status("osd.9") == {}
+
+    def test_admin_socket_folder_not_searchable(self, admin_sockets, monkeypatch):
+        admin_sockets("osd.0", {"status": {"state": "active"}})
+        # The folder of the sockets is only open to ceph, as /run/ceph is
+        monkeypatch.setattr(ceph.os, "access", lambda path, mode: False)
+        with pytest.raises(PermissionError):
+            ceph.admin_socket("osd.0")
+        result = ceph.admin_command("osd.0", {"prefix": "status"})
+        assert result.returncode == errno.EACCES
+
+    def test_admin_socket_of_client(self, admin_sockets, tmp_path):
+        server = admin_sockets(
+            "client.radosgw.host.123.456", {"perf dump": {"rgw": {}}}
+        )
+        assert ceph.admin_socket("client.radosgw.host") == server.path
+        assert ceph.daemon_perf_dump("client.radosgw.host") == {"rgw": {}}
+
+    def test_daemon_status_invalid_output(self, admin_sockets):
+        admin_sockets("mds.host", {"status": "not json"})
+        assert ceph.daemon_status("mds.host") == {}
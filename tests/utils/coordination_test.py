@@ -0,0 +1,273 @@
+import functools
+import operator
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from distrax.utils.coordination import Coordinator, Phase
+
+
+class FakeComm:
+    """
+    A communicator whose ranks are threads, counting the collectives called
+    """
+
+    def __init__(self, rank, size, barrier, slots):
+        self.rank = rank
+        self.size = size
+        self.barrier = barrier
+        self.slots = slots
+        self.collectives = 0
+
+    def Get_rank(self):
+        return self.rank
+
+    def Get_size(self):
+        return self.size
+
+    def _exchange(self, value):
+        self.collectives += 1
+        self.slots[self.rank] = value
+        self.barrier.wait()
+        values = list(self.slots)
+        self.barrier.wait()
+        return values
+
+    def allgather(self, sendobj):
+        return self._exchange(sendobj)
+
+    def allreduce(self, sendobj, op):
+        return functools.reduce(op, self._exchange(sendobj))
+
+    def bcast(self, obj, root):
+        return self._exchange(obj)[root]
+
+
+def run_ranks(size, target):
+    """
+    Run target(coordinator) on each of size ranks, returning the results and comms
+    """
+    # A mismatch in the collectives of the ranks breaks the barrier not the test run
+    barrier = threading.Barrier(size, timeout=5)
+    slots = [None] * size
+    comms = [FakeComm(rank, size, barrier, slots) for rank in range(size)]
+    coordinators = [Coordinator(comm, operator.or_, min) for comm in comms]
+    with ThreadPoolExecutor(max_workers=size) as executor:
+        results = list(executor.map(target, coordinators))
+    return results, comms
+
+
+class Recorder:
+    """
+    Records the actions that ran on each rank
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def action(self, name, rank, fail_on=()):
+        def run():
+            with self.lock:
+                self.calls.append((name, rank))
+            if rank in fail_on:
+                raise RuntimeError(f"{name} failed")
+
+        return run
+
+    def ran(self, name):
+        return sorted(rank for called, rank in self.calls if called == name)
+
+
+def deployment(recorder, rank, fail=None, fail_on=(0,)):
+    """
+    The phases of a deployment with rank-only and all-rank phases
+    """
+
+    def phase(name, everywhere=False):
+        on = fail_on if name == fail else ()
+        return Phase(
+            name,
+            recorder.action(name, rank, on),
+            recorder.action(f"undo {name}", rank),
+            everywhere=everywhere,
+        )
+
+    return [
+        phase("mon"),
+        phase("mgr"),
+        phase("devices", everywhere=True),
+        phase("osds", everywhere=True),
+        Phase("osd readiness", recorder.action("osd readiness", rank)),
+        phase("pools"),
+    ]
+
+
+class TestCoordinator:
+    """
+    Tests the coordination of the phases across ranks
+    """
+
+    def test_any_failed_and_minimum(self):
+        results, _ = run_ranks(
+            4,
+            lambda c: (
+                c.any_failed(c.rank == 2),
+                c.any_failed(False),
+                c.minimum(c.rank + 3),
+            ),
+        )
+        assert results == [(True, False, 3)] * 4
+
+    @pytest.mark.parametrize(
+        "hosts, different", [(["a", "b", "c"], True), (["a", "b", "a"], False)]
+    )
+    def test_hosts_are_different(self, hosts, different):
+        results, comms = run_ranks(
+            len(hosts), lambda c: c.hosts_are_different(hosts[c.rank])
+        )
+        assert results == [different] * len(hosts)
+        assert all(comm.collectives == 1 for comm in comms)
+
+    def test_run(self):
+        recorder = Recorder()
+        results, comms = run_ranks(3, lambda c: c.run(deployment(recorder, c.rank)))
+        assert results == [True] * 3
+        assert recorder.ran("mon") == [0]
+        assert recorder.ran("osds") == [0, 1, 2]
+        assert recorder.ran("pools") == [0]
+        assert not [call for call in recorder.calls if call[0].startswith("undo")]
+        # One collective per run of phases on the same ranks, rather than per phase
+        assert all(comm.collectives == 3 for comm in comms)
+
+    def test_run_failure_on_one_rank_rolls_back(self):
+        recorder = Recorder()
+        results, comms = run_ranks(
+            3,
+            lambda c: c.run(deployment(recorder, c.rank, fail="devices", fail_on=(2,))),
+        )
+        assert results == [False] * 3
+        # The phases after the failed run are not started
+        assert recorder.ran("osd readiness") == []
+        # Every rank undoes the run that failed as far as it got, then the leader
+        # the runs before it
+        assert recorder.ran("undo osds") == [0, 1]
+        assert recorder.ran("undo devices") == [0, 1, 2]
+        assert recorder.ran("undo mgr") == [0]
+        assert recorder.ran("undo mon") == [0]
+        assert recorder.calls.index(("undo devices", 0)) < recorder.calls.index(
+            ("undo mgr", 0)
+        )
+        assert recorder.ran("undo pools") == []
+        assert all(comm.collectives == 4 for comm in comms)
+
+    def test_run_shares_leader_values(self):
+        def target(coordinator):
+            files = {"ceph.conf": "[global]"} if coordinator.leader else None
+            coordinator.run(
+                [
+                    Phase("mon", lambda: None),
+                    Phase("cluster files", lambda: files),
+                    Phase(
+                        "osds",
+                        lambda: coordinator.shared["cluster files"],
+                        everywhere=True,
+                    ),
+                ]
+            )
+            return coordinator.shared
+
+        results, comms = run_ranks(3, target)
+        assert results == [{"cluster files": {"ceph.conf": "[global]"}}] * 3
+        # The values are sent with the outcome of the run on the leader
+        assert all(comm.collectives == 2 for comm in comms)
+
+    def test_run_keep_on(self):
+        recorder = Recorder()
+
+        def target(coordinator):
+            def create_mon():
+                if coordinator.leader:
+                    raise FileExistsError("Cluster exists")
+
+            return coordinator.run(
+                [
+                    Phase(
+                        "mon",
+                        create_mon,
+                        recorder.action("undo mon", coordinator.rank),
+                        keep_on=(FileExistsError,),
+                    ),
+                    Phase("mgr", None, recorder.action("undo mgr", coordinator.rank)),
+                ]
+            )
+
+        results, _ = run_ranks(2, target)
+        assert results == [False, False]
+        # The manager of the existing cluster was never started so is not removed
+        assert recorder.ran("undo mgr") == []
+        assert recorder.ran("undo mon") == []
+
+    def test_rollback_only_undoes_phases_started(self):
+        recorder = Recorder()
+
+        def target(coordinator):
+            def check_cluster():
+                raise FileExistsError("Cluster exists")
+
+            return coordinator.run(
+                [
+                    Phase("cluster check", check_cluster, keep_on=(FileExistsError,)),
+                    Phase(
+                        "mon",
+                        recorder.action("mon", coordinator.rank),
+                        recorder.action("undo mon", coordinator.rank),
+                    ),
+                    Phase(
+                        "mgr",
+                        recorder.action("mgr", coordinator.rank),
+                        recorder.action("undo mgr", coordinator.rank),
+                    ),
+                    Phase(
+                        "osds",
+                        recorder.action("osds", coordinator.rank),
+                        recorder.action("undo osds", coordinator.rank),
+                        everywhere=True,
+                    ),
+                ]
+            )
+
+        results, comms = run_ranks(1, target)
+        assert results == [False]
+        assert recorder.calls == []
+        # The collectives of the run reached still match across ranks
+        assert comms[0].collectives == 2
+
+    def test_rollback(self):
+        recorder = Recorder()
+
+        def target(coordinator):
+            phases = deployment(recorder, coordinator.rank)
+            phases[1] = phases[1]._replace(
+                undo=recorder.action("undo mgr", coordinator.rank, fail_on=(0,))
+            )
+            return coordinator.rollback(phases)
+
+        results, comms = run_ranks(3, target)
+        assert results == [False] * 3
+        # A failed undo does not stop the others
+        assert recorder.ran("undo mon") == [0]
+        assert recorder.ran("undo devices") == [0, 1, 2]
+        assert not [call for call in recorder.calls if not call[0].startswith("undo")]
+        assert all(comm.collectives == 3 for comm in comms)
+
+    def test_rollback_skips_runs_with_nothing_to_undo(self):
+        results, comms = run_ranks(
+            2,
+            lambda c: c.rollback(
+                [Phase("mon", undo=lambda: None), Phase("osds", everywhere=True)]
+            ),
+        )
+        assert results == [True, True]
+        assert all(comm.collectives == 1 for comm in comms)
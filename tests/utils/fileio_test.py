@@ -3,6 +3,7 @@ import os
 import pwd
 import shutil
 import stat
+import subprocess
 from pathlib import Path
 
 import pytest
@@ -198,3 +199,72 @@ class TestFileIO:
         with open(TEST_FOLDER + "/" + TEST_FILE) as f:
             assert f.readline() == "hi\n"
             assert f.readline() == "hi"
+
+
+class FakeHelper:
+    """
+    Records the requests sent to the privileged helper
+    """
+
+    def __init__(self):
+        self.batches = []
+
+    def run(self, requests):
+        self.batches.append(list(requests))
+        return [fileio.privileged.Response(True, "") for _ in requests]
+
+
+class TestPrivilegedFileIO:
+    """
+    Tests how FileIO runs operations that need privileges when not privileged
+    """
+
+    @pytest.fixture()
+    def unprivileged(self, monkeypatch):
+        helper = FakeHelper()
+        monkeypatch.setattr(fileio.os, "geteuid", lambda: 1000)
+        monkeypatch.setattr(fileio.privileged, "get_helper", lambda: helper)
+        yield helper
+
+    def test_helper(self, unprivileged):
+        assert fileio.copy_file("ceph.conf", "/etc/ceph/ceph.conf", admin=True)
+        assert unprivileged.batches == [
+            [
+                fileio.privileged.Request(
+                    "copy_file", ["ceph.conf", "/etc/ceph/ceph.conf"]
+                )
+            ]
+        ]
+
+    def test_batch(self, unprivileged):
+        with fileio.batch() as responses:
+            fileio.create_dir("/var/lib/ceph/mgr/ceph-host", 755, admin=True)
+            fileio.recursive_change_ownership(
+                "/var/lib/ceph/mgr/ceph-host", "ceph", "ceph", admin=True
+            )
+            assert unprivileged.batches == []
+        assert len(unprivileged.batches) == 1
+        assert [request.operation for request in unprivileged.batches[0]] == [
+            "create_dir",
+            "recursive_change_ownership",
+        ]
+        assert all(response.ok for response in responses)
+
+    def test_not_admin_runs_in_process(self, unprivileged, file_resource):
+        assert fileio.remove_file(TEST_FILE)
+        assert unprivileged.batches == []
+        assert not os.path.exists(TEST_FILE)
+
+    def test_sudo_without_helper(self, monkeypatch):
+        commands = []
+
+        def run(args, **kwargs):
+            commands.append(args)
+            return subprocess.CompletedProcess(args, 0, b"", b"")
+
+        monkeypatch.setattr(fileio.os, "geteuid", lambda: 1000)
+        monkeypatch.setattr(fileio.privileged, "get_helper", lambda: None)
+        monkeypatch.setattr(fileio.subprocess, "run", run)
+        with fileio.batch():
+            assert fileio.create_dir("/var/lib/ceph/osd", 755, admin=True)
+        assert commands == [["sudo", "mkdir", "-p", "-m", "755", "/var/lib/ceph/osd"]]
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+from distrax.exceptions.exceptions import ClusterExistsError
+from distrax.utils.orchestrator import Orchestrator
+
+
+class Recorder:
+    """
+    Records the order that steps and their undo actions are called
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, name, error=None):
+        def call():
+            with self.lock:
+                self.calls.append(name)
+            if error is not None:
+                raise error
+
+        return call
+
+
+class TestOrchestrator:
+    """
+    Tests the dependency graph orchestrator
+    """
+
+    def test_runs_in_dependency_order(self):
+        record = Recorder()
+        plan = Orchestrator()
+        plan.add("mon", record("mon"))
+        plan.add("mgr", record("mgr"), depends=["mon"])
+        plan.add("devices", record("devices"))
+        plan.add("osds", record("osds"), depends=["mgr", "devices"])
+        assert plan.run() is True
+        assert record.calls.index("mon") < record.calls.index("mgr")
+        assert record.calls[-1] == "osds"
+
+    def test_independent_steps_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        plan = Orchestrator(workers=2)
+        # Each step waits for the other, so would time out if run in sequence
+        plan.add("mon", barrier.wait)
+        plan.add("devices", barrier.wait)
+        assert plan.run() is True
+
+    def test_rollback_in_reverse_order(self):
+        record = Recorder()
+        plan = Orchestrator()
+        plan.add("mon", record("mon"), record("undo mon"))
+        plan.add("devices", record("devices"), record("undo devices"))
+        plan.add("mgr", record("mgr"), record("undo mgr"), depends=["mon"])
+        plan.add(
+            "osds",
+            record("osds", RuntimeError("osds")),
+            record("undo osds"),
+            depends=["mgr", "devices"],
+        )
+        plan.add("pool", record("pool"), record("undo pool"), depends=["osds"])
+        assert plan.run() is False
+        assert "pool" not in record.calls
+        assert "undo pool" not in record.calls
+        assert record.calls.index("undo osds") < record.calls.index("undo mgr")
+        assert record.calls.index("undo osds") < record.calls.index("undo devices")
+        assert record.calls.index("undo mgr") < record.calls.index("undo mon")
+        assert list(plan.errors) == ["osds"]
+
+    def test_keep_on_skips_undo_of_failed_step(self):
+        record = Recorder()
+        plan = Orchestrator()
+        plan.add(
+            "mon",
+            record("mon", ClusterExistsError("Cluster exists")),
+            record("undo mon"),
+            keep_on=(ClusterExistsError,),
+        )
+        plan.add("devices", record("devices"), record("undo devices"))
+        assert plan.run() is False
+        assert "undo mon" not in record.calls
+        assert "undo devices" in record.calls
+
+    def test_existing_cluster_check_runs_nothing(self):
+        record = Recorder()
+        plan = Orchestrator()
+        plan.add(
+            "cluster check",
+            record("cluster check", ClusterExistsError("Cluster exists")),
+            keep_on=(ClusterExistsError,),
+        )
+        plan.add("mon", record("mon"), record("undo mon"), depends=["cluster check"])
+        plan.add(
+            "devices",
+            record("devices"),
+            record("undo devices"),
+            depends=["cluster check"],
+        )
+        assert plan.run() is False
+        # The devices of the existing cluster are neither created nor undone
+        assert record.calls == ["cluster check"]
+
+    def test_run_without_rollback(self):
+        record = Recorder()
+        plan = Orchestrator()
+        plan.add("pools", record("pools", PermissionError()), record("undo"))
+        plan.add("osds", record("osds"), depends=["pools"])
+        assert plan.run(rollback=False) is False
+        assert record.calls == ["pools"]
+        assert isinstance(plan.errors["pools"], PermissionError)
+
+    def test_add_rejects_unknown_dependency(self):
+        plan = Orchestrator()
+        with pytest.raises(ValueError):
+            plan.add("mgr", lambda: None, depends=["mon"])
+        plan.add("mon", lambda: None)
+        with pytest.raises(ValueError):
+            plan.add("mon", lambda: None)
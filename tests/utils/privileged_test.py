@@ -0,0 +1,251 @@
+import io
+import json
+import os
+import pwd
+import sys
+
+import pytest
+
+import distrax.utils.privileged as privileged
+from distrax.utils.privileged import Request, Response, Rule
+
+
+@pytest.fixture()
+def rules(tmp_path):
+    """
+    Rules that allow operations within a temporary folder only
+    """
+    owner = pwd.getpwuid(os.getuid()).pw_name
+    yield [
+        Rule("create_dir", f"{tmp_path}/ceph-*"),
+        Rule("copy_file", f"{tmp_path}/ceph-*/keyring", "ceph.*.keyring"),
+        Rule("recursive_change_ownership", f"{tmp_path}/ceph-*", f"{owner}:*"),
+        Rule("remove", f"{tmp_path}/ceph-*"),
+    ]
+
+
+class TestPrivileged:
+    """
+    Tests the privileged file operations and the helper that runs them
+    """
+
+    def test_allowed(self):
+        assert privileged.allowed(
+            Request("create_dir", ["/var/lib/ceph/mon/ceph-host", 755])
+        )
+        assert privileged.allowed(
+            Request(
+                "copy_file",
+                [
+                    "/tmp/distrax/ceph.mgr.keyring",
+                    "/var/lib/ceph/mgr/ceph-host/keyring",
+                ],
+            )
+        )
+
+    def test_allowed_owner_is_caller(self, monkeypatch):
+        user = next(user for user in pwd.getpwall() if user.pw_uid != 0)
+        monkeypatch.setenv("SUDO_UID", str(user.pw_uid))
+        assert privileged.allowed(
+            Request(
+                "recursive_change_ownership",
+                ["/mnt/distrax", user.pw_name, user.pw_name],
+            )
+        )
+        assert not privileged.allowed(
+            Request("change_ownership", ["/mnt/distrax", "root", "root"])
+        )
+
+    def test_not_allowed(self):
+        # Outside of the paths
+        assert not privileged.allowed(Request("remove", ["/etc/passwd"]))
+        # Escaping the paths
+        assert not privileged.allowed(
+            Request("remove", ["/var/lib/ceph/mon/ceph-host/../../../../etc"])
+        )
+        assert not privileged.allowed(Request("remove", ["var/log/ceph"]))
+        # A * does not match more than one component
+        assert not privileged.allowed(
+            Request("create_dir", ["/var/lib/ceph/mon/ceph-host/etc", 755])
+        )
+        # The wrong source of a copy
+        assert not privileged.allowed(
+            Request("copy_file", ["/etc/shadow", "/etc/ceph/ceph.conf"])
+        )
+        # The wrong owner
+        assert not privileged.allowed(
+            Request("change_ownership", ["/var/lib/ceph/mon/ceph-host", "root", "root"])
+        )
+        # The drop-in of a unit that is not an OSD
+        assert not privileged.allowed(Request("bind_osd", ["../ceph-mon@a", [0], 0]))
+        # Missing arguments and unknown operations
+        assert not privileged.allowed(Request("copy_file", ["/etc/ceph/ceph.conf"]))
+        assert not privileged.allowed(Request("chmod", ["/etc/ceph"]))
+
+    def test_apply(self, tmp_path):
+        owner = pwd.getpwuid(os.getuid()).pw_name
+        folder = tmp_path / "ceph-host"
+        source = tmp_path / "ceph.mgr.keyring"
+        source.write_text("key")
+        old_umask = os.umask(0o077)
+        try:
+            assert privileged.apply(Request("create_dir", [str(folder), 755])).ok
+        finally:
+            os.umask(old_umask)
+        assert folder.stat().st_mode & 0o777 == 0o755
+        assert privileged.apply(
+            Request("copy_file", [str(source), str(folder / "keyring")])
+        ).ok
+        assert (folder / "keyring").read_text() == "key"
+        assert privileged.apply(
+            Request("recursive_change_ownership", [str(folder), owner, owner])
+        ).ok
+        assert privileged.apply(Request("remove", [str(folder)])).ok
+        assert not folder.exists()
+        response = privileged.apply(Request("remove", [str(folder)]))
+        assert response == Response(False, f"{folder} does not exist")
+        assert not privileged.apply(Request("chmod", [str(source)])).ok
+
+    def test_apply_does_not_copy_through_links(self, tmp_path):
+        target = tmp_path / "target"
+        target.write_text("kept")
+        (tmp_path / "link").symlink_to(target)
+        source = tmp_path / "source"
+        source.write_text("key")
+        response = privileged.apply(
+            Request("copy_file", [str(source), str(tmp_path / "link")])
+        )
+        assert not response.ok
+        assert target.read_text() == "kept"
+
+    def test_apply_does_not_follow_links(self, tmp_path):
+        outside = tmp_path / "outside"
+        outside.mkdir(mode=0o700)
+        (tmp_path / "ceph-host").symlink_to(outside)
+        owner = pwd.getpwuid(os.getuid()).pw_name
+        # An existing directory is never changed, nor a link in its place
+        for request in [
+            Request("create_dir", [str(tmp_path / "ceph-host"), 777]),
+            Request("create_dir", [str(tmp_path / "ceph-host" / "sub"), 777]),
+            Request("change_ownership", [str(tmp_path / "ceph-host"), owner, owner]),
+        ]:
+            privileged._apply(request)
+        assert outside.stat().st_mode & 0o777 == 0o700
+        assert not (outside / "sub").exists()
+        assert privileged.apply(Request("remove", [str(tmp_path / "ceph-host")])).ok
+        assert outside.is_dir()
+
+    def test_serve_resolves_links(self, tmp_path, rules):
+        outside = tmp_path / "outside"
+        outside.mkdir()
+        (tmp_path / "ceph-host").symlink_to(outside)
+        request = {"operation": "create_dir", "args": [f"{tmp_path}/ceph-host/x", 777]}
+        writer = io.StringIO()
+        privileged.serve(io.StringIO(json.dumps(request) + "\n"), writer, rules)
+        assert json.loads(writer.getvalue())["error"].startswith("Not allowed")
+        assert not (outside / "x").exists()
+
+    def test_bind_osd(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(
+            privileged, "DROP_IN_DIR", f"{tmp_path}/ceph-osd@{{osd_id}}.service.d"
+        )
+        assert privileged.apply(Request("bind_osd", ["3", [4, 5], 1])).ok
+        drop_in = tmp_path / "ceph-osd@3.service.d" / privileged.DROP_IN
+        assert drop_in.read_text() == privileged.numa_drop_in([4, 5], 1)
+        # Only the values are sent, never the contents of the drop-in
+        for args in [
+            ["3/../x", [4], 1],
+            ["3", ["4\nExecStartPre=/bin/sh"], 1],
+            ["3", [4], "1\nExecStartPre=/bin/sh"],
+            ["3", [], 1],
+        ]:
+            assert not privileged.apply(Request("bind_osd", args)).ok
+        assert drop_in.read_text() == privileged.numa_drop_in([4, 5], 1)
+
+    def test_write_setting(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(privileged, "SYS_BLOCK", str(tmp_path))
+        (tmp_path / "ram0" / "queue").mkdir(parents=True)
+        request = Request("write_setting", ["ram0", "queue/nomerges", "2"])
+        assert privileged.apply(request).ok
+        assert (tmp_path / "ram0" / "queue" / "nomerges").read_text() == "2"
+        # Only the settings of the devices distrax creates, with valid values
+        for args in [
+            ["sda", "queue/nomerges", "2"],
+            ["ram0", "queue/../../sda/queue/nomerges", "2"],
+            ["ram0", "queue/nomerges", "2\n0"],
+            ["zram1", "hot_remove", "0"],
+        ]:
+            assert not privileged.apply(Request("write_setting", args)).ok
+        assert privileged.allowed(
+            Request("write_setting", ["zram1", "hot_remove", "1"])
+        )
+        assert not privileged.allowed(Request("write_setting", ["ram0", "reset", "1"]))
+
+    def test_prefault_command(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(privileged, "SYS_BLOCK", str(tmp_path))
+        for name, backing in [("ram0", None), ("loop0", "/dev/shm/distrax-loop0.img")]:
+            (tmp_path / name / "loop").mkdir(parents=True)
+            (tmp_path / name / "size").write_text("2097152\n")
+            if backing:
+                (tmp_path / name / "loop" / "backing_file").write_text(backing)
+        command = privileged.prefault_command("ram0", "1")
+        assert command[:3] == ["numactl", "--cpunodebind=1", "--membind=1"]
+        assert command[3:] == [
+            "dd",
+            "if=/dev/zero",
+            "of=/dev/ram0",
+            "bs=4M",
+            "oflag=direct",
+            "iflag=count_bytes",
+            f"count={1024**3}",
+        ]
+        assert privileged.prefault_command("loop0")[0] == "dd"
+        (tmp_path / "loop0" / "loop" / "backing_file").write_text("/home/user/disk")
+        for args in [("loop0",), ("sda",), ("ram0", "1 count=1"), ("ram0 of=x",)]:
+            with pytest.raises(ValueError):
+                privileged.prefault_command(*args)
+
+    def test_serve(self, tmp_path, rules):
+        requests = [
+            {"operation": "create_dir", "args": [f"{tmp_path}/ceph-host", 755]},
+            {"operation": "create_dir", "args": [f"{tmp_path}/other", 755]},
+            {"operation": "unknown"},
+        ]
+        reader = io.StringIO("".join(json.dumps(r) + "\n" for r in requests))
+        writer = io.StringIO()
+        privileged.serve(reader, writer, rules)
+        responses = [json.loads(line) for line in writer.getvalue().splitlines()]
+        assert [response["ok"] for response in responses] == [True, False, False]
+        assert responses[1]["error"].startswith("Not allowed")
+        assert responses[2]["error"].startswith("Invalid request")
+        assert (tmp_path / "ceph-host").is_dir()
+        assert not (tmp_path / "other").exists()
+
+    def test_helper(self, tmp_path, rules):
+        source = tmp_path / "ceph.mgr.keyring"
+        source.write_text("key")
+        script = (
+            "import sys\n"
+            "from distrax.utils.privileged import Rule, serve\n"
+            f"serve(sys.stdin, sys.stdout, [Rule(*rule) for rule in {rules!r}])\n"
+        )
+        helper = privileged.Helper([sys.executable, "-c", script])
+        try:
+            responses = helper.run(
+                [
+                    Request("create_dir", [f"{tmp_path}/ceph-host", 755]),
+                    Request(
+                        "copy_file", [str(source), f"{tmp_path}/ceph-host/keyring"]
+                    ),
+                    Request("remove", [str(source)]),
+                ]
+            )
+        finally:
+            helper.close()
+        assert [response.ok for response in responses] == [True, True, False]
+        assert (tmp_path / "ceph-host" / "keyring").read_text() == "key"
+        assert helper.process.returncode == 0
+
+    def test_helper_not_started(self):
+        with pytest.raises(OSError):
+            privileged.Helper([sys.executable, "-c", "pass"])
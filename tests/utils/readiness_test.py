@@ -0,0 +1,120 @@
+import errno
+import threading
+import time
+
+import pytest
+
+import distrax.utils.readiness as readiness
+from distrax.utils.transport import AbstractTransport, CommandResult
+
+
+def status(clean_pgs, rgw=False, fs_state="up:standby", osds=1):
+    return {
+        "osdmap": {"num_osds": osds, "num_up_osds": osds, "num_in_osds": osds},
+        "pgmap": {"pgs_by_state": [{"state_name": "active+clean", "count": clean_pgs}]},
+        "servicemap": {"services": {"rgw": {}} if rgw else {}},
+        "fsmap": {"by_rank": [{"rank": 0, "status": fs_state}]},
+    }
+
+
+@pytest.fixture()
+def events(canned_transport):
+    """
+    Starts the cluster with a single clean placement group
+    """
+    canned_transport.responses["status"] = status(1)
+    yield canned_transport
+
+
+class TestReadiness:
+    """
+    Tests the readiness engine and predicates
+    """
+
+    def test_event_transport_is_a_transport(self, events):
+        assert isinstance(events, AbstractTransport)
+
+    def test_predicates(self):
+        ready = status(33, rgw=True, fs_state="up:active", osds=2)
+        assert readiness.pgs_active_clean(33).check(ready) is True
+        assert readiness.pgs_active_clean(34).check(ready) is False
+        assert readiness.rgw_in_servicemap().check(ready) is True
+        assert readiness.fs_rank_active(0).check(ready) is True
+        assert readiness.fs_rank_active(1).check(ready) is False
+        assert readiness.osds_up_and_in(2).check(ready) is True
+        assert readiness.rgw_in_servicemap().check(status(1)) is False
+
+    def test_wait_returns_on_event(self, events):
+        engine = readiness.ReadinessEngine(timeout=10, backstop=10)
+
+        def announce():
+            time.sleep(0.05)
+            events.announce("status", status(33, rgw=True))
+
+        threading.Thread(target=announce).start()
+        start = time.monotonic()
+        engine.wait_for([readiness.pgs_active_clean(33), readiness.rgw_in_servicemap()])
+        # Woken by the event rather than the 10 second backstop
+        assert time.monotonic() - start < 5
+        assert events.stopped is True
+
+    def test_wait_rechecks_when_log_is_quiet(self, events):
+        engine = readiness.ReadinessEngine(timeout=10, backstop=0.1)
+        # The status changes without an event in the cluster log
+        timer = threading.Timer(0.05, events.responses.update, [{"status": status(33)}])
+        timer.start()
+        start = time.monotonic()
+        engine.wait_for([readiness.pgs_active_clean(33)])
+        assert time.monotonic() - start < 0.05 + 2 * 0.1 + 0.1
+        timer.join()
+
+    def test_wait_times_out(self, events):
+        engine = readiness.ReadinessEngine(timeout=0.2, backstop=0.05)
+        with pytest.raises(TimeoutError, match="rgw in servicemap"):
+            engine.wait_for([readiness.rgw_in_servicemap()])
+
+    def test_context_shares_subscription(self, events):
+        events.responses["status"] = status(33, rgw=True)
+        with readiness.ReadinessEngine(timeout=1) as engine:
+            engine.wait_for([readiness.pgs_active_clean(33)])
+            engine.wait_for([readiness.rgw_in_servicemap()])
+            assert events.stopped is False
+        assert events.stopped is True
+
+    def test_wait_for_daemons(self, admin_sockets):
+        osd = admin_sockets("osd.0", {"status": {"state": "booting"}})
+        admin_sockets("mds.host", {"status": {"state": "up:standby"}})
+        admin_sockets("client.radosgw.host.1.2", {"perf dump": {"rgw": {"req": 0}}})
+        timer = threading.Timer(
+            0.3, osd.responses.update, [{"status": {"state": "active"}}]
+        )
+        timer.start()
+        start = time.monotonic()
+        readiness.wait_for_daemons(
+            ["osd.0", "mds.host", "client.radosgw.host"], timeout=5, interval=0.05
+        )
+        assert 0.3 <= time.monotonic() - start < 2
+        timer.join()
+
+    def test_wait_for_daemons_timeout(self, admin_sockets):
+        admin_sockets("osd.0", {"status": {"state": "active"}})
+        admin_sockets("mds.host", {"status": {"state": "up:boot"}})
+        with pytest.raises(TimeoutError, match="mds.host, osd.1"):
+            readiness.wait_for_daemons(
+                ["osd.0", "mds.host", "osd.1"], timeout=0.2, interval=0.05
+            )
+
+    def test_wait_for_daemons_permission(self, monkeypatch):
+        monkeypatch.setattr(
+            readiness.ceph,
+            "admin_command",
+            lambda name, cmd: CommandResult(errno.EACCES, "", "Permission denied"),
+        )
+        with pytest.raises(PermissionError):
+            readiness.wait_for_daemons(["osd.0"], timeout=1)
+
+    def test_wait_for_daemons_folder_not_searchable(self, admin_sockets, monkeypatch):
+        admin_sockets("osd.0", {"status": {"state": "active"}})
+        monkeypatch.setattr(readiness.ceph.os, "access", lambda path, mode: False)
+        with pytest.raises(PermissionError):
+            readiness.wait_for_daemons(["osd.0", "osd.1"], timeout=1)
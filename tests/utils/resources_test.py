@@ -0,0 +1,98 @@
+import pytest
+
+from distrax.utils import resources
+
+MEMINFO = """MemTotal:       65536000 kB
+MemFree:         1024000 kB
+MemAvailable:   60000000 kB
+"""
+
+
+def write(root, path, content):
+    file = root / path
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_text(content)
+
+
+@pytest.fixture()
+def sysfs(tmp_path):
+    """
+    A fake procfs and sysfs of a dual socket host without a cgroup limit
+    """
+    write(tmp_path, "proc/meminfo", MEMINFO)
+    write(tmp_path, "proc/self/cgroup", "0::/user.slice\n")
+    write(tmp_path, "sys/fs/cgroup/user.slice/memory.max", "max\n")
+    write(tmp_path, "sys/fs/cgroup/user.slice/memory.current", "1048576\n")
+    write(tmp_path, "sys/devices/system/cpu/online", "0-15\n")
+    for node, cpus in [(0, "0-7"), (1, "8-15")]:
+        folder = f"sys/devices/system/node/node{node}"
+        write(tmp_path, f"{folder}/cpulist", f"{cpus}\n")
+        write(
+            tmp_path,
+            f"{folder}/meminfo",
+            f"Node {node} MemTotal:       32768000 kB\n"
+            f"Node {node} MemFree:        30000000 kB\n",
+        )
+    yield tmp_path
+
+
+class TestResources:
+    """
+    Tests reading the host resources from a fake procfs and sysfs
+    """
+
+    def test_parse_cpulist(self):
+        assert resources.parse_cpulist("0-2,8,10-11\n") == [0, 1, 2, 8, 10, 11]
+        assert resources.parse_cpulist("") == []
+
+    def test_host_resources(self, sysfs):
+        host = resources.host_resources(str(sysfs))
+        assert host.memory == 65536000
+        # MemAvailable is used rather than MemFree
+        assert host.usable == 60000000
+        assert host.cgroup_limit is None
+        assert host.cgroup_usage == 1024
+        assert len(host.cpus) == 16
+        assert [node.id for node in host.numa_nodes] == [0, 1]
+        assert host.numa_nodes[1].cpus == list(range(8, 16))
+        assert host.numa_nodes[0].free == 30000000
+
+    def test_cgroup_v2_limit(self, sysfs):
+        write(sysfs, "sys/fs/cgroup/user.slice/memory.max", f"{8 * 1024**3}\n")
+        host = resources.host_resources(str(sysfs))
+        assert host.cgroup_limit == 8 * 1024**2
+        assert host.usable == 8 * 1024**2 - 1024
+
+    def test_cgroup_v2_limit_of_ancestor(self, sysfs):
+        write(sysfs, "proc/self/cgroup", "0::/job.slice/step.scope\n")
+        write(sysfs, "sys/fs/cgroup/job.slice/memory.max", f"{4 * 1024**3}\n")
+        write(sysfs, "sys/fs/cgroup/job.slice/step.scope/memory.max", "max\n")
+        write(sysfs, "sys/fs/cgroup/job.slice/step.scope/memory.current", "0\n")
+        assert resources.cgroup_memory(str(sysfs)) == (4 * 1024**2, 0)
+        write(sysfs, "sys/fs/cgroup/job.slice/step.scope/memory.max", f"{1024**3}\n")
+        assert resources.cgroup_memory(str(sysfs)) == (1024**2, 0)
+
+    def test_cgroup_v1_limit(self, sysfs):
+        write(sysfs, "proc/self/cgroup", "4:memory:/job\n3:cpu,cpuacct:/job\n")
+        write(
+            sysfs,
+            "sys/fs/cgroup/memory/job/memory.limit_in_bytes",
+            "9223372036854771712",
+        )
+        write(sysfs, "sys/fs/cgroup/memory/job/memory.usage_in_bytes", "0")
+        assert resources.cgroup_memory(str(sysfs)) == (None, 0)
+        write(sysfs, "sys/fs/cgroup/memory/job/memory.limit_in_bytes", f"{1024**3}")
+        assert resources.cgroup_memory(str(sysfs)) == (1024**2, 0)
+        write(sysfs, "proc/self/cgroup", "4:memory:/job/step\n")
+        write(
+            sysfs,
+            "sys/fs/cgroup/memory/job/step/memory.limit_in_bytes",
+            "9223372036854771712",
+        )
+        assert resources.cgroup_memory(str(sysfs)) == (1024**2, 0)
+
+    def test_missing_numa(self, tmp_path):
+        write(tmp_path, "proc/meminfo", MEMINFO)
+        host = resources.host_resources(str(tmp_path))
+        assert host.numa_nodes == []
+        assert host.cgroup_limit is None
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+import distrax.utils.state as state
+
+
+class TestState:
+    """
+    Tests the files of state of the user
+    """
+
+    def test_write_and_read(self, tmp_path):
+        path = str(tmp_path / "distrax" / "zram")
+        state.write_state(path, "1\n2\n")
+        assert state.read_state(path) == "1\n2\n"
+        assert os.stat(tmp_path / "distrax").st_mode & 0o777 == 0o700
+        assert os.stat(path).st_mode & 0o777 == 0o600
+        state.write_state(path, "1\n")
+        assert state.read_state(path) == "1\n"
+        state.remove_state(path)
+        state.remove_state(path)
+        with pytest.raises(FileNotFoundError):
+            state.read_state(path)
+
+    def test_refuses_links(self, tmp_path):
+        target = tmp_path / "target"
+        target.write_text("/etc/passwd\n")
+        (tmp_path / "loop").symlink_to(target)
+        with pytest.raises(OSError):
+            state.read_state(str(tmp_path / "loop"))
+        with pytest.raises(OSError):
+            state.write_state(str(tmp_path / "loop"), "")
+        assert target.read_text() == "/etc/passwd\n"
+
+    def test_refuses_shared_folder(self, tmp_path):
+        folder = tmp_path / "shared"
+        folder.mkdir()
+        (folder / "loop").write_text("/etc/passwd\n")
+        folder.chmod(0o777)
+        with pytest.raises(PermissionError):
+            state.read_state(str(folder / "loop"))
+        with pytest.raises(PermissionError):
+            state.write_state(str(folder / "loop"), "")
+
+    def test_refuses_file_of_another_user(self, tmp_path):
+        if os.geteuid() != 0:
+            pytest.skip("Changing the owner of a file needs root")
+        path = tmp_path / "loop"
+        path.write_text("/etc/passwd\n")
+        os.chown(path, 65534, 65534)
+        with pytest.raises(PermissionError):
+            state.read_state(str(path))
@@ -0,0 +1,85 @@
+import subprocess
+
+import pytest
+
+import distrax.utils.system as system
+
+
+@pytest.fixture()
+def systemctl(monkeypatch):
+    """
+    A fake systemctl whose units take a number of checks to finish starting
+    """
+    calls = {"commands": [], "states": {}}
+
+    def run(args, **kwargs):
+        calls["commands"].append(args)
+        if args[1] == "show":
+            lines = []
+            for unit in args[3:]:
+                states = calls["states"].get(unit, ["inactive"])
+                state = states.pop(0) if len(states) > 1 else states[0]
+                lines.append(f"ActiveState={state}\n")
+            return subprocess.CompletedProcess(args, 0, "\n".join(lines).encode(), b"")
+        return subprocess.CompletedProcess(args, 0, b"", b"")
+
+    monkeypatch.setattr(system.subprocess, "run", run)
+    monkeypatch.setattr(system.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(system, "_systemd", True)
+    yield calls
+
+
+class TestSystem:
+    """
+    Tests the systemd helpers
+    """
+
+    def test_is_systemd_is_cached(self, monkeypatch):
+        monkeypatch.setattr(system, "_systemd", None)
+        first = system.is_systemd()
+        monkeypatch.setattr(system, "open", lambda *a: pytest.fail(), raising=False)
+        assert system.is_systemd() is first
+
+    def test_start_services_waits(self, systemctl):
+        systemctl["states"] = {
+            "ceph-mon@host": ["activating", "activating", "active"],
+            "ceph-mgr@host": ["active"],
+        }
+        assert system.start_services(["ceph-mon@host", "ceph-mgr@host"]) is True
+        starts = [command for command in systemctl["commands"] if "start" in command]
+        assert starts == [
+            ["sudo", "systemctl", "start", "ceph-mon@host", "ceph-mgr@host"]
+        ]
+        shows = [command for command in systemctl["commands"] if "show" in command]
+        assert len(shows) == 3
+
+    def test_start_services_failed(self, systemctl):
+        systemctl["states"] = {"ceph-mon@host": ["activating", "failed"]}
+        assert system.start_services(["ceph-mon@host"]) is False
+
+    def test_wait_for_services_timeout(self, systemctl, monkeypatch):
+        systemctl["states"] = {"ceph-mon@host": ["activating"]}
+        states = system.wait_for_services(["ceph-mon@host"], timeout=0)
+        assert states == {"ceph-mon@host": "activating"}
+
+    def test_service_states_unreadable(self, monkeypatch):
+        monkeypatch.setattr(
+            system.subprocess,
+            "run",
+            lambda args, **kwargs: subprocess.CompletedProcess(args, 1, b"", b""),
+        )
+        assert system.service_states(["ceph-mon@host"]) == {"ceph-mon@host": ""}
+
+    def test_stop_and_disable_services_batch(self, systemctl):
+        system.stop_services(["ceph-mgr.target", "system-ceph\\x2dmgr.slice"])
+        system.disable_services(["ceph-mgr.target"])
+        assert systemctl["commands"] == [
+            [
+                "sudo",
+                "systemctl",
+                "stop",
+                "ceph-mgr.target",
+                "system-ceph\\x2dmgr.slice",
+            ],
+            ["sudo", "systemctl", "disable", "ceph-mgr.target"],
+        ]
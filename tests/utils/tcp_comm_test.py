@@ -0,0 +1,180 @@
+import multiprocessing
+import socket
+
+import pytest
+
+from distrax.exceptions.exceptions import CoordinationError
+from distrax.utils.coordination import Coordinator, Phase
+from distrax.utils.tcp_comm import LOR, MIN, TCPComm
+
+TOKEN = "secret"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def deployment(coordinator, calls, fail_on=None):
+    """
+    The phases of a deployment recording where each ran, the OSDs of the rank
+    named fail_on fail
+    """
+
+    def record(name):
+        def action():
+            calls.append(name)
+            if name == "osds" and coordinator.comm.hostname == fail_on:
+                raise RuntimeError("osds failed")
+            if name == "cluster files":
+                return {"ceph.conf": "[global]"}
+
+        return action
+
+    return [
+        Phase(name, record(name), record(f"undo {name}"), everywhere=everywhere)
+        for name, everywhere in [
+            ("mon", False),
+            ("mgr", False),
+            ("cluster files", False),
+            ("osds", True),
+            ("pools", False),
+        ]
+    ]
+
+
+def run_worker(port, hostname, queue, fail_on=None, token=TOKEN):
+    """
+    Join the leader as a worker and run the deployment
+    """
+    try:
+        comm = TCPComm("127.0.0.1", port, token=token, hostname=hostname, timeout=10)
+        try:
+            comm.join()
+            coordinator = Coordinator(comm, lor=LOR, minimum=MIN)
+            calls = []
+            ok = coordinator.run(deployment(coordinator, calls, fail_on))
+            queue.put(
+                (
+                    hostname,
+                    comm.Get_rank(),
+                    ok,
+                    calls,
+                    coordinator.shared,
+                    coordinator.hosts_are_different(hostname),
+                    coordinator.minimum(comm.Get_rank() + 5),
+                )
+            )
+        finally:
+            comm.close()
+    except CoordinationError as error:
+        queue.put((hostname, "error", str(error)))
+
+
+@pytest.fixture()
+def workers():
+    """
+    Start worker processes with simulated hostnames
+    """
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    processes = []
+
+    def start(port, hostnames, **kwargs):
+        for hostname in hostnames:
+            process = context.Process(
+                target=run_worker, args=(port, hostname, queue), kwargs=kwargs
+            )
+            process.start()
+            processes.append(process)
+        return queue
+
+    yield start
+    for process in processes:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.kill()
+
+
+def lead(port, size, fail_on=None, hostname="host-a"):
+    comm = TCPComm(
+        "127.0.0.1", port, size, TOKEN, leader=True, hostname=hostname, timeout=10
+    )
+    try:
+        comm.join()
+        coordinator = Coordinator(comm, lor=LOR, minimum=MIN)
+        calls = []
+        ok = coordinator.run(deployment(coordinator, calls, fail_on))
+        different = coordinator.hosts_are_different(hostname)
+        minimum = coordinator.minimum(5)
+        return comm, ok, calls, different, minimum
+    finally:
+        comm.close()
+
+
+class TestTCPComm:
+    """
+    Tests the leader and workers on localhost
+    """
+
+    def test_deployment(self, workers):
+        port = free_port()
+        queue = workers(port, ["host-d", "host-b", "host-c"])
+        comm, ok, calls, different, minimum = lead(port, 4)
+        results = sorted(queue.get(timeout=10) for _ in range(3))
+        assert comm.hosts == ["host-a", "host-b", "host-c", "host-d"]
+        assert ok and different and minimum == 5
+        assert calls == ["mon", "mgr", "cluster files", "osds", "pools"]
+        for rank, result in enumerate(results, start=1):
+            hostname, worker_rank, ok, calls, shared, different, minimum = result
+            # Ranks follow the hostnames
+            assert (hostname, worker_rank) == (comm.hosts[rank], rank)
+            assert ok and different and minimum == 5
+            # Workers only run the phases on every rank, and receive the files
+            assert calls == ["osds"]
+            assert shared == {"cluster files": {"ceph.conf": "[global]"}}
+
+    def test_failure_on_a_worker_rolls_back(self, workers):
+        port = free_port()
+        queue = workers(port, ["host-b", "host-c"], fail_on="host-c")
+        _, ok, calls, _, _ = lead(port, 3, fail_on="host-c")
+        results = [queue.get(timeout=10) for _ in range(2)]
+        assert not ok
+        assert calls == [
+            "mon",
+            "mgr",
+            "cluster files",
+            "osds",
+            "undo osds",
+            "undo cluster files",
+            "undo mgr",
+            "undo mon",
+        ]
+        for result in results:
+            assert result[2] is False
+            assert result[3] == ["osds", "undo osds"]
+
+    def test_duplicate_hostnames(self, workers):
+        port = free_port()
+        queue = workers(port, ["host-a", "host-b"])
+        _, ok, _, different, _ = lead(port, 3)
+        results = [queue.get(timeout=10) for _ in range(2)]
+        assert ok and not different
+        assert all(result[5] is False for result in results)
+
+    def test_invalid_token(self, workers):
+        port = free_port()
+        queue = workers(port, ["host-b"], token="wrong")
+        comm = TCPComm("127.0.0.1", port, 2, TOKEN, leader=True, timeout=1)
+        try:
+            hostname, status, error = queue.get(timeout=10)
+            assert status == "error" and "Invalid token" in error
+            with pytest.raises(CoordinationError, match="1 of 2 hosts joined"):
+                comm.join()
+        finally:
+            comm.close()
+
+    def test_requires_token(self):
+        with pytest.raises(ValueError):
+            TCPComm("127.0.0.1", leader=True)
@@ -0,0 +1,78 @@
+import io
+
+import pytest
+
+import distrax.utils.transport as transport
+from distrax.utils.transport import AbstractTransport, CLITransport
+
+
+class TestTransport:
+    """
+    Tests the command transports
+    """
+
+    def test_transports_are_instances_of_abstract_transport(self):
+        assert isinstance(CLITransport(), AbstractTransport)
+        assert isinstance(transport.RadosTransport(), AbstractTransport)
+
+    def test_to_argv(self):
+        argv = CLITransport.to_argv(
+            {
+                "prefix": "osd pool delete",
+                "pool": "distrax",
+                "pool2": "distrax",
+                "yes_i_really_really_mean_it": True,
+            }
+        )
+        assert argv == [
+            "ceph",
+            "osd",
+            "pool",
+            "delete",
+            "distrax",
+            "distrax",
+            "--yes-i-really-really-mean-it",
+            "--connect-timeout",
+            "5",
+        ]
+
+    def test_to_argv_format_and_lists(self):
+        argv = CLITransport.to_argv(
+            {"prefix": "osd out", "ids": ["0", "1"], "format": "json"}, timeout=3
+        )
+        assert argv == [
+            "ceph",
+            "osd",
+            "out",
+            "0",
+            "1",
+            "--format",
+            "json",
+            "--connect-timeout",
+            "3",
+        ]
+
+    def test_set_transport(self):
+        transport.set_transport("cli")
+        assert isinstance(transport.get_transport(), CLITransport)
+        with pytest.raises(Exception):
+            transport.set_transport("carrier-pigeon")
+
+    def test_cli_watch_at_debug_level(self, monkeypatch):
+        commands = []
+
+        class Process:
+            def __init__(self, args, **kwargs):
+                commands.append(args)
+                self.stdout = io.BytesIO(b'{"channel": "cluster"}\n')
+
+            def terminate(self):
+                pass
+
+            def wait(self):
+                pass
+
+        monkeypatch.setattr(transport.subprocess, "Popen", Process)
+        CLITransport.watch(lambda line: None)()
+        # The pgmap and service changes are only logged at debug level
+        assert "--watch-debug" in commands[0]